@@ -30,6 +30,7 @@ You may delegate tasks to the smart contract writer agent if needed. Never try t
 NEVER EVER reach the end of the plan. Keep iterating until you have completed the task.
 NEVER EVER write smart contract code yourself.
 Your role is to execute tools only. Nothing else. Once tools are executed, you may call the reflector agent for reflection.
+When several transactions go to the same contract, send them together with the batch transaction tool. It reports a txn_hash or an error for every transaction; check each one, since the transactions after a rejected one may not have been sent.
 If you write any smart contract code, you will be penalized.
 """
 
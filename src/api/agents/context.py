@@ -0,0 +1,130 @@
+import hashlib
+import os
+import threading
+from collections import OrderedDict
+
+from langchain_core.messages import AIMessage, HumanMessage, ToolMessage
+
+
+class ArtifactStore:
+    """
+    Keeps large tool outputs (source code, ABIs, bytecode) out of the prompt.
+
+    Content is stored under a reference derived from its hash, so the same
+    output always gets the same reference. The least recently used entries are
+    dropped once `max_entries` are stored.
+    """
+
+    def __init__(self, max_entries=512):
+        self.max_entries = max_entries
+        self._lock = threading.Lock()
+        self._entries = OrderedDict()
+
+    def put(self, content):
+        reference = "artifact:" + hashlib.sha256(content.encode()).hexdigest()[:16]
+        with self._lock:
+            self._entries[reference] = content
+            self._entries.move_to_end(reference)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+        return reference
+
+    def get(self, reference):
+        with self._lock:
+            content = self._entries.get(reference)
+            if content is not None:
+                self._entries.move_to_end(reference)
+            return content
+
+
+artifact_store = ArtifactStore()
+
+# Sizes are in characters, roughly 4 per token
+MAX_PROMPT_CHARS = int(os.getenv("CONTEXT_MAX_PROMPT_CHARS", 60000))
+# Older tool outputs are cut to this size, the latest ones to MAX_RECENT_TOOL_CHARS
+MAX_TOOL_CHARS = int(os.getenv("CONTEXT_MAX_TOOL_CHARS", 1500))
+MAX_RECENT_TOOL_CHARS = int(os.getenv("CONTEXT_MAX_RECENT_TOOL_CHARS", 20000))
+
+
+def _content_text(message):
+    if isinstance(message.content, str):
+        return message.content
+    return str(message.content)
+
+
+def _message_size(message):
+    size = len(_content_text(message))
+    for tool_call in getattr(message, "tool_calls", None) or []:
+        size += len(str(tool_call.get("args", "")))
+    return size
+
+
+def truncate_tool_message(message, max_chars, store=None):
+    """Replaces a long tool output with its beginning and a reference to the full output."""
+    store = artifact_store if store is None else store
+    content = _content_text(message)
+    if len(content) <= max_chars:
+        return message
+    reference = store.put(content)
+    excerpt = content[:max_chars]
+    note = (
+        f"\n[... {len(content) - max_chars} more characters. The full output is stored as {reference},"
+        f" call get_artifact_tool with this reference to read it.]"
+    )
+    return message.model_copy(update={"content": excerpt + note})
+
+
+def _turns(messages):
+    """Groups messages so an AI message with tool calls stays with its tool results."""
+    turns = []
+    for message in messages:
+        if isinstance(message, ToolMessage) and turns:
+            turns[-1].append(message)
+        else:
+            turns.append([message])
+    return turns
+
+
+def compact_messages(messages, max_prompt_chars=None, max_tool_chars=None, max_recent_tool_chars=None, store=None):
+    """
+    Returns the messages to send to the LLM for one agent step.
+
+    Tool outputs from before the latest tool call are cut to `max_tool_chars`
+    and the latest ones to `max_recent_tool_chars`, with the full output kept in
+    the artifact store. If the result is still over `max_prompt_chars`, the
+    oldest turns after the task message are left out, never separating a tool
+    call from its results. The graph state keeps the full history.
+    """
+    max_prompt_chars = MAX_PROMPT_CHARS if max_prompt_chars is None else max_prompt_chars
+    max_tool_chars = MAX_TOOL_CHARS if max_tool_chars is None else max_tool_chars
+    max_recent_tool_chars = MAX_RECENT_TOOL_CHARS if max_recent_tool_chars is None else max_recent_tool_chars
+
+    last_tool_call = max(
+        (index for index, message in enumerate(messages) if isinstance(message, AIMessage) and message.tool_calls),
+        default=-1,
+    )
+    compacted = []
+    for index, message in enumerate(messages):
+        if isinstance(message, ToolMessage):
+            limit = max_recent_tool_chars if index > last_tool_call else max_tool_chars
+            message = truncate_tool_message(message, limit, store=store)
+        compacted.append(message)
+
+    if sum(_message_size(message) for message in compacted) <= max_prompt_chars or len(compacted) < 3:
+        return compacted
+
+    # Keep the task message, then as many of the latest turns as fit
+    task, turns = compacted[:1], _turns(compacted[1:])
+    budget = max_prompt_chars - sum(_message_size(message) for message in task)
+    kept = []
+    for turn in reversed(turns):
+        size = sum(_message_size(message) for message in turn)
+        if kept and size > budget:
+            break
+        kept.insert(0, turn)
+        budget -= size
+    omitted = sum(len(turn) for turn in turns) - sum(len(turn) for turn in kept)
+    if not omitted:
+        return compacted
+    note = HumanMessage(content=f"[{omitted} earlier messages were left out to keep the context short.]")
+    return task + [note] + [message for turn in kept for message in turn]
@@ -1,10 +1,13 @@
 from langchain_core.tools import tool
 import os
+from api.agents.context import artifact_store
 from api.agents.llms import create_gpt_4, create_wrn
-from api.agents.tools import compile_solidity_contract, deploy_malicious_contract, get_abi_from_etherscan, get_source_code_from_etherscan, send_transaction, trigger_reentrancy_attack
+from api.agents.tools import batch_read, compile_solidity_contract, deploy_malicious_contract, get_abi_from_etherscan, get_source_code_from_etherscan, send_transaction, submit_batch_transactions, trigger_reentrancy_attack, wait_for_receipts
+from api.sandbox import exploit_sandbox
 from api.web3_connection import get_web3_connection
 from schema import get_uploaded_malicious_contract_abi, insert_malicious_contract
 from pydantic import Field
+import json
 from typing import Annotated
 from langchain.prompts import ChatPromptTemplate
 
@@ -67,6 +70,39 @@ def send_transaction_to_malicious_contract_tool(
     return txn_hash
 
 
+@tool
+def send_batch_transactions_tool(
+    contract_address: Annotated[str, Field(description="The address of the smart contract to interact with")],
+    calls: Annotated[list, Field(description="The calls to send in order, each a dict with function_name and optional function_args")],
+    wait: Annotated[bool, Field(description="Whether to wait until the sent transactions are mined")] = False
+) -> str:
+    """
+    Send several transactions to a smart contract at once, in the given order.
+
+    Args:
+        contract_address (str): The address of the smart contract to interact with.
+        calls (list): The calls to send, each a dict with function_name and optional function_args.
+        wait (bool, optional): Whether to wait until the sent transactions are mined. Defaults to False.
+    Returns:
+        str: JSON with, per call, its function_name, the txn_hash (null if it was not sent)
+             and the node's error (null if it was sent), plus its status (1 for success,
+             0 for reverted) when waiting. Calls after a rejected one may not have been sent.
+    """
+    w3 = get_web3_connection()
+    pk = os.getenv("WALLET_PRIVATE_KEY") # agent's private key in wallet
+    abi = get_abi_from_etherscan(contract_address)
+    results = submit_batch_transactions(
+        w3, pk, contract_address, abi,
+        [(call["function_name"], call.get("function_args", [])) for call in calls],
+        wait=wait,
+    )
+    for result in results:
+        if "receipt" in result:
+            receipt = result.pop("receipt")
+            result["status"] = receipt.status if receipt else None
+    return json.dumps(results)
+
+
 @tool
 def trigger_reentrancy_attack_tool(contract_address: Annotated[str, Field(description="The address of the smart contract to interact with")]) -> str:
     """
@@ -120,6 +156,102 @@ def deploy_malicious_contract_tool(
     return addr
 
 
+@tool
+def read_contract_state_tool(
+    contract_address: Annotated[str, Field(description="The address of the smart contract to read from")],
+    reads: Annotated[list, Field(description="The view functions to call, each a dict with function_name and optional function_args")] = [],
+    balances: Annotated[list, Field(description="Addresses whose Ether balance to read, in wei")] = []
+) -> str:
+    """
+    Read several values of a smart contract and account balances in one request.
+
+    All values are read from the same block, so they are consistent with each
+    other. Use it to check the state before and after an exploit.
+
+    Args:
+        contract_address (str): The address of the smart contract to read from.
+        reads (list, optional): The view functions to call. Defaults to [].
+        balances (list, optional): Addresses whose Ether balance to read. Defaults to [].
+    Returns:
+        str: JSON with the block number, each read's result and the balances in wei.
+    """
+    w3 = get_web3_connection()
+    abi = get_abi_from_etherscan(contract_address)
+    state = batch_read(
+        w3,
+        reads=[(contract_address, abi, read["function_name"], read.get("function_args", [])) for read in reads],
+        balances=balances,
+    )
+    return json.dumps(state, default=str)
+
+
+@tool
+def test_exploit_attempts_tool(
+    contract_address: Annotated[str, Field(description="The address of the target smart contract")],
+    attempts: Annotated[list, Field(description="A list of attempts, each a list of steps. A step is a dict with function_name, optional function_args, value (in wei) and contract_address (to call a deployed malicious contract instead of the target)")]
+) -> str:
+    """
+    Try several exploit attempts, each starting from the current chain state.
+
+    Every attempt runs on a snapshot of the chain that is reverted afterwards,
+    so attempts do not affect each other or the chain, and they run in
+    parallel when sandbox workers are configured. Only works on a local chain.
+
+    Args:
+        contract_address (str): The address of the target smart contract.
+        attempts (list): The attempts to run, each a list of steps.
+    Returns:
+        str: JSON with, per attempt, whether all steps succeeded, each step's result
+             and the balance change in wei of the sender and the contracts called.
+    """
+    pk = os.getenv("WALLET_PRIVATE_KEY")
+    abi = get_abi_from_etherscan(contract_address)
+    resolved = []
+    for steps in attempts:
+        resolved.append([
+            {**step, "abi": get_uploaded_malicious_contract_abi(step["contract_address"])}
+            if step.get("contract_address") and step["contract_address"].lower() != contract_address.lower() else step
+            for step in steps
+        ])
+    try:
+        results = exploit_sandbox.run(private_key=pk, contract_address=contract_address, abi=abi, attempts=resolved)
+    except RuntimeError as e:
+        return str(e)
+    return json.dumps(results)
+
+
+@tool
+def wait_for_transactions_tool(
+    txn_hashes: Annotated[list, Field(description="The hashes of the transactions to wait for")],
+    timeout: Annotated[int, Field(description="The maximum number of seconds to wait")] = 120
+) -> str:
+    """
+    Wait until transactions are mined and report whether they succeeded.
+
+    Args:
+        txn_hashes (list): The hashes of the transactions to wait for.
+        timeout (int, optional): The maximum number of seconds to wait. Defaults to 120.
+    Returns:
+        str: JSON with, per transaction, its status (1 for success, 0 for reverted),
+             block number, gas used and the address of a deployed contract, if any.
+    """
+    w3 = get_web3_connection()
+    try:
+        receipts = wait_for_receipts(w3, txn_hashes, timeout=timeout)
+    except Exception as e:
+        return f"Not all transactions were mined: {e}"
+    return json.dumps([
+        {
+            "txn_hash": txn_hash,
+            "status": receipt.status,
+            "block_number": receipt.blockNumber,
+            "gas_used": receipt.gasUsed,
+            "contract_address": receipt.contractAddress,
+        }
+        for txn_hash, receipt in zip(txn_hashes, receipts)
+    ])
+
+
 @tool
 def get_uploaded_source_code_tool(contract_address: Annotated[str, Field(description="The address of the smart contract to interact with")]) -> str:
     """
@@ -146,6 +278,30 @@ def get_uploaded_abi_tool(contract_address: Annotated[str, Field(description="Th
     """
     return get_abi_from_etherscan(contract_address)
 
+@tool
+def get_artifact_tool(
+    reference: Annotated[str, Field(description="The artifact reference from a shortened tool output, e.g. artifact:1a2b3c4d5e6f7a8b")],
+    start: Annotated[int, Field(description="The character offset to start reading from")] = 0,
+    length: Annotated[int, Field(description="The number of characters to read")] = 8000
+) -> str:
+    """
+    Read the full output of an earlier tool call that was shortened in the conversation.
+
+    Args:
+        reference (str): The artifact reference given in the shortened output.
+        start (int, optional): The character offset to start reading from. Defaults to 0.
+        length (int, optional): The number of characters to read. Defaults to 8000.
+
+    Returns:
+        str: The requested part of the stored output.
+    """
+    content = artifact_store.get(reference.strip())
+    if content is None:
+        return f"Artifact {reference} was not found, call the original tool again."
+    end = start + length
+    remaining = max(len(content) - end, 0)
+    return content[start:end] + (f"\n[{remaining} more characters, read on from start={end}.]" if remaining else "")
+
 @tool
 def generate_smart_contract_tool(query: Annotated[str, Field(description="A description of the smart contract to be generated")]) -> str:
     """
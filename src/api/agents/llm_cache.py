@@ -0,0 +1,203 @@
+import hashlib
+import json
+import os
+import re
+import sqlite3
+import threading
+import time
+import warnings
+
+from langchain_core.caches import BaseCache
+from langchain_core.load import dumps, loads
+
+ADDRESS_PATTERN = re.compile(r"0x[0-9a-fA-F]{40}(?![0-9a-fA-F])")
+# Message fields that differ between otherwise identical conversations
+VOLATILE_MESSAGE_FIELDS = ("id", "response_metadata", "usage_metadata")
+
+
+def _normalize_messages(value, call_ids):
+    if isinstance(value, list):
+        return [_normalize_messages(item, call_ids) for item in value]
+    if not isinstance(value, dict):
+        return value
+    if value.get("lc") == 1 and isinstance(value.get("kwargs"), dict):
+        # A serialized message: drop its run id and metadata, keep the class path
+        kwargs = {key: item for key, item in value["kwargs"].items() if key not in VOLATILE_MESSAGE_FIELDS}
+        additional_kwargs = kwargs.get("additional_kwargs")
+        if isinstance(additional_kwargs, dict):
+            # Duplicates `tool_calls` in the provider's raw format
+            kwargs["additional_kwargs"] = {key: item for key, item in additional_kwargs.items() if key != "tool_calls"}
+        return {**value, "kwargs": _normalize_messages(kwargs, call_ids)}
+    normalized = {}
+    for key, item in value.items():
+        if key == "tool_call_id" or (key == "id" and value.get("type") == "tool_call"):
+            # Tool call ids are random, number them in order of appearance instead
+            normalized[key] = call_ids.setdefault(item, f"call_{len(call_ids)}")
+        else:
+            normalized[key] = _normalize_messages(item, call_ids)
+    return normalized
+
+
+def normalize_prompt(prompt):
+    """
+    Returns a canonical form of a serialized prompt for cache keys.
+
+    Chat prompts arrive as the JSON of their messages. Message ids, provider
+    metadata and tool call ids change on every run, so they are removed or
+    renumbered; other prompts only have their whitespace normalized.
+    """
+    try:
+        messages = json.loads(prompt)
+    except ValueError:
+        return " ".join(prompt.split())
+    return json.dumps(_normalize_messages(messages, {}), sort_keys=True, separators=(",", ":"))
+
+
+def address_placeholders(text):
+    """Maps each distinct address in `text`, in order of appearance, to a placeholder."""
+    placeholders = {}
+    for match in ADDRESS_PATTERN.finditer(text):
+        placeholders.setdefault(match.group(0).lower(), f"0xADDRESS{len(placeholders)}")
+    return placeholders
+
+
+def replace_addresses(text, placeholders):
+    return ADDRESS_PATTERN.sub(lambda match: placeholders.get(match.group(0).lower(), match.group(0)), text)
+
+
+class SQLiteLLMCache(BaseCache):
+    """
+    Exact-match LLM response cache stored in SQLite.
+
+    Keys are a hash of the model settings LangChain passes as `llm_string` (model,
+    parameters and the bound tool schemas) and the normalized prompt. Entries
+    expire after `ttl` seconds, and the least recently used ones are removed
+    once the stored responses exceed `max_bytes`.
+
+    With `normalize_addresses`, contract addresses are replaced by placeholders
+    in the key and in the stored response, so auditing the same code at another
+    address reuses the responses with the new addresses filled back in.
+    """
+
+    def __init__(self, path, ttl=7 * 24 * 3600, max_bytes=256 * 1024 * 1024, normalize_addresses=False):
+        self.path = path
+        self.ttl = ttl
+        self.max_bytes = max_bytes
+        self.normalize_addresses = normalize_addresses
+        self._lock = threading.Lock()
+        self._connection = None
+        self._metrics = {"hits": 0, "misses": 0, "evictions": 0}
+
+    def _connect(self):
+        if self._connection is None:
+            directory = os.path.dirname(self.path)
+            if directory:
+                os.makedirs(directory, exist_ok=True)
+            self._connection = sqlite3.connect(self.path, check_same_thread=False)
+            self._connection.execute(
+                "CREATE TABLE IF NOT EXISTS llm_cache ("
+                "key TEXT PRIMARY KEY, response TEXT NOT NULL, size INTEGER NOT NULL,"
+                " created_at REAL NOT NULL, accessed_at REAL NOT NULL)"
+            )
+            self._connection.execute("CREATE INDEX IF NOT EXISTS llm_cache_accessed_at ON llm_cache (accessed_at)")
+            self._connection.commit()
+        return self._connection
+
+    def _key(self, prompt, llm_string):
+        prompt = normalize_prompt(prompt)
+        placeholders = {}
+        if self.normalize_addresses:
+            placeholders = address_placeholders(prompt)
+            prompt = replace_addresses(prompt, placeholders)
+        key = hashlib.sha256(f"{llm_string}\n{prompt}".encode()).hexdigest()
+        return key, placeholders
+
+    def lookup(self, prompt, llm_string):
+        key, placeholders = self._key(prompt, llm_string)
+        now = time.time()
+        with self._lock:
+            connection = self._connect()
+            row = connection.execute(
+                "SELECT response FROM llm_cache WHERE key = ? AND created_at > ?", (key, now - self.ttl)
+            ).fetchone()
+            if row is None:
+                self._metrics["misses"] += 1
+                return None
+            connection.execute("UPDATE llm_cache SET accessed_at = ? WHERE key = ?", (now, key))
+            connection.commit()
+            self._metrics["hits"] += 1
+        response = row[0]
+        if placeholders:
+            # Fill in this prompt's addresses, spelled as they first appear in it
+            addresses = {}
+            for match in ADDRESS_PATTERN.finditer(normalize_prompt(prompt)):
+                addresses.setdefault(placeholders[match.group(0).lower()], match.group(0))
+            response = re.sub(r"0xADDRESS\d+", lambda match: addresses.get(match.group(0), match.group(0)), response)
+        with warnings.catch_warnings():
+            # langchain_core.load.loads warns that it is in beta
+            warnings.simplefilter("ignore")
+            return loads(response)
+
+    def update(self, prompt, llm_string, return_val):
+        key, placeholders = self._key(prompt, llm_string)
+        response = dumps(list(return_val))
+        if placeholders:
+            response = replace_addresses(response, placeholders)
+        now = time.time()
+        with self._lock:
+            connection = self._connect()
+            connection.execute(
+                "INSERT OR REPLACE INTO llm_cache (key, response, size, created_at, accessed_at) VALUES (?, ?, ?, ?, ?)",
+                (key, response, len(response), now, now),
+            )
+            self._evict(connection, now)
+            connection.commit()
+
+    def _evict(self, connection, now):
+        expired = connection.execute("DELETE FROM llm_cache WHERE created_at <= ?", (now - self.ttl,)).rowcount
+        self._metrics["evictions"] += expired
+        total = connection.execute("SELECT COALESCE(SUM(size), 0) FROM llm_cache").fetchone()[0]
+        if total <= self.max_bytes:
+            return
+        for key, size in connection.execute("SELECT key, size FROM llm_cache ORDER BY accessed_at").fetchall():
+            if total <= self.max_bytes:
+                break
+            connection.execute("DELETE FROM llm_cache WHERE key = ?", (key,))
+            total -= size
+            self._metrics["evictions"] += 1
+
+    def clear(self, **kwargs):
+        with self._lock:
+            connection = self._connect()
+            connection.execute("DELETE FROM llm_cache")
+            connection.commit()
+
+    def metrics(self):
+        with self._lock:
+            return dict(self._metrics)
+
+
+_llm_cache = None
+_llm_cache_lock = threading.Lock()
+
+
+def get_llm_cache():
+    """
+    Returns the process-wide LLM cache, or None unless LLM_CACHE is "1".
+
+    Opt-in, since cached planner and reporter answers are reused for days.
+    Configured with LLM_CACHE_PATH, LLM_CACHE_TTL, LLM_CACHE_MAX_BYTES and
+    LLM_CACHE_NORMALIZE_ADDRESSES (opt-in, "1" to enable).
+    """
+    global _llm_cache
+    if os.getenv("LLM_CACHE") != "1":
+        return None
+    with _llm_cache_lock:
+        if _llm_cache is None:
+            _llm_cache = SQLiteLLMCache(
+                os.getenv("LLM_CACHE_PATH", os.path.join(os.path.expanduser("~"), ".cache", "blackrabbit", "llm_cache.sqlite3")),
+                ttl=float(os.getenv("LLM_CACHE_TTL", 7 * 24 * 3600)),
+                max_bytes=int(os.getenv("LLM_CACHE_MAX_BYTES", 256 * 1024 * 1024)),
+                normalize_addresses=os.getenv("LLM_CACHE_NORMALIZE_ADDRESSES") == "1",
+            )
+        return _llm_cache
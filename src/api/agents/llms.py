@@ -4,19 +4,21 @@ import os
 from dotenv import load_dotenv
 load_dotenv()
 
+# Responses are only cached when a LangChain BaseCache is passed in, e.g. get_llm_cache()
 
-def create_wrn():
+def create_wrn(cache=None):
     wrn_llm = ChatOpenAI(
         model="/models/WhiteRabbitNeo-33B-DeepSeekCoder",
         default_headers={"api-key":os.getenv("KINDO_API_KEY")},
         api_key=os.getenv("KINDO_API_KEY"),
         # temperature=0.8,
         base_url="https://llm.kindo.ai/v1",
+        cache=cache,
     )
     return wrn_llm
 
 
-def create_gpt_4():
+def create_gpt_4(cache=None):
     llm = ChatOpenAI(
         model="gpt-4o",
         # temperature=0.8,
@@ -25,10 +27,11 @@ def create_gpt_4():
         # api_key=os.getenv("KINDO_API_KEY"),
         api_key=os.getenv("OPENAI_API_KEY"),
         # base_url="https://llm.kindo.ai/v1",
+        cache=cache,
     )
     return llm
 
-def create_claude():
+def create_claude(cache=None):
     llm = ChatAnthropic(
         model="claude-3-5-sonnet-20240620",
         temperature=0.8,
@@ -37,5 +40,6 @@ def create_claude():
         # api_key=os.getenv("KINDO_API_KEY"),
         api_key=os.getenv("CLAUDE_API_KEY"),
         # base_url="https://llm.kindo.ai/v1",
+        cache=cache,
     )
     return llm
\ No newline at end of file
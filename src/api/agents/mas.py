@@ -1,9 +1,16 @@
 import functools
+import os
+import threading
+import time
+import uuid
+from concurrent.futures import ThreadPoolExecutor
 from typing import Annotated
 from typing_extensions import TypedDict
 from langgraph.checkpoint.memory import MemorySaver
 from langgraph.graph import StateGraph, START, END
-from api.agents.lc_tools import deploy_malicious_contract_tool, generate_smart_contract_tool, get_uploaded_abi_tool, get_uploaded_source_code_tool, send_transaction_to_malicious_contract_tool, send_transaction_tool, trigger_reentrancy_attack_tool
+from api.agents.context import compact_messages
+from api.agents.lc_tools import deploy_malicious_contract_tool, generate_smart_contract_tool, get_artifact_tool, get_uploaded_abi_tool, get_uploaded_source_code_tool, read_contract_state_tool, send_batch_transactions_tool, send_transaction_to_malicious_contract_tool, send_transaction_tool, test_exploit_attempts_tool, trigger_reentrancy_attack_tool, wait_for_transactions_tool
+from api.agents.llm_cache import get_llm_cache
 from api.agents.llms import create_claude, create_gpt_4, create_wrn
 from langchain_core.messages import AIMessage, ToolMessage, BaseMessage, HumanMessage
 from langchain_core.prompts import ChatPromptTemplate, MessagesPlaceholder
@@ -13,8 +20,10 @@ from langchain.schema import HumanMessage
 from api.agents.constants import planner_system_prompt, executor_system_prompt, reflector_system_prompt, reporter_system_prompt
 
 from langgraph.prebuilt import ToolNode
+from api.agents.tools import get_abi_from_etherscan, get_source_code_from_etherscan
+from api.solc_manager import solc_manager
 
-from schema import insert_event, update_report
+from event_sink import create_event_sink
 
 class State(TypedDict):
     messages: Annotated[Sequence[BaseMessage], operator.add]
@@ -51,7 +60,8 @@ def create_agent(llm, tools=None, system_message: str = ""):
 
 # Helper function to create a node for a given agent
 def agent_node(state, agent, name, msg_role = "ai"):
-    result = agent.invoke(state)
+    # Send a compacted history so the prompt size per step stays flat
+    result = agent.invoke({**state, "messages": compact_messages(state["messages"])})
     # We convert the agent output into a format that is suitable to append to the global state
     if isinstance(result, ToolMessage):
         pass
@@ -84,6 +94,8 @@ def create_graph():
     planner_tools = [
         get_uploaded_source_code_tool,
         get_uploaded_abi_tool,
+        get_artifact_tool,
+        read_contract_state_tool,
         deploy_malicious_contract_tool,
         send_transaction_tool,
         send_transaction_to_malicious_contract_tool
@@ -92,22 +104,29 @@ def create_graph():
         deploy_malicious_contract_tool,
         get_uploaded_source_code_tool,
         get_uploaded_abi_tool,
+        get_artifact_tool,
+        read_contract_state_tool,
         generate_smart_contract_tool,
         send_transaction_tool,
-        send_transaction_to_malicious_contract_tool
+        send_transaction_to_malicious_contract_tool,
+        send_batch_transactions_tool,
+        test_exploit_attempts_tool,
+        wait_for_transactions_tool
     ]
     
     # Replace the set operation with a list comprehension
     tools = list({tool.name: tool for tool in planner_tools + executor_tools}.values())
     gpt4 = create_gpt_4()
+    # Only planning and reporting reuse cached responses, the executor and reflector act on live chain state
+    cached_gpt4 = create_gpt_4(cache=get_llm_cache())
     wrn = create_wrn()
     claude = create_claude()
 
-    planner_agent = create_agent(llm=gpt4, tools=planner_tools, system_message=planner_system_prompt)
+    planner_agent = create_agent(llm=cached_gpt4, tools=planner_tools, system_message=planner_system_prompt)
     executor_agent = create_agent(llm=gpt4, tools=executor_tools, system_message=executor_system_prompt)
     # smart_contract_writer_agent = create_agent(llm=wrn, tools=smart_contract_writer_tools, system_message=smart_contract_writer_system_prompt)
     reflector_agent = create_agent(llm=gpt4, tools=planner_tools, system_message=reflector_system_prompt)
-    reporter_agent = create_agent(llm=gpt4, tools=planner_tools, system_message=reporter_system_prompt)
+    reporter_agent = create_agent(llm=cached_gpt4, tools=planner_tools, system_message=reporter_system_prompt)
 
     planner_node = functools.partial(agent_node, agent=planner_agent, name="planner", msg_role="ai")
     executor_node = functools.partial(agent_node, agent=executor_agent, name="executor", msg_role="ai")
@@ -171,46 +190,218 @@ def create_graph():
     graph = graph_builder.compile(checkpointer=memory)
     return graph
 
-def run(graph):
-    print("Analysis Started")
-    addr = "0x8d4255bf30Ad54BAdcc672fAE977b9D3f15C3f18, 0xBf7446A56F00f88FF72A7C57Db945EE2132F421d, 0xD1A5c53E7F930248083597Ba88C84c1b087ED89e"
-    user_input = f"Create a plan to find problems in this smart contract at these addresses: {addr}"
-    config = {"configurable": {"thread_id": "3"}, "recursion_limit": 20}
-    # The config is the **second positional argument** to stream() or invoke()!
-    events = graph.stream({"messages": [HumanMessage(content=user_input)]}, config, stream_mode="values")
-    for event in events:
-        if "messages" in event:
-            event["messages"][-1].pretty_print()
-    
+_graph = None
+_graph_lock = threading.Lock()
+_graph_stats = {"build_seconds": None, "built_by": None, "audits": 0, "last_audit_setup_seconds": None}
+
+def get_graph(built_by="audit"):
+    """
+    Returns the process-wide compiled graph, building it on first use.
+
+    The LLM clients, prompts, tool bindings and StateGraph are built once and shared
+    by every audit; runs are isolated by their own thread_id in the config.
+    """
+    global _graph
+    if _graph is None:
+        with _graph_lock:
+            if _graph is None:
+                start = time.perf_counter()
+                graph = create_graph()
+                _graph_stats["build_seconds"] = time.perf_counter() - start
+                _graph_stats["built_by"] = built_by
+                _graph = graph
+    return _graph
+
+def warm_up_graph():
+    """Builds the shared graph in a background thread so the first audit does not pay for it."""
+    thread = threading.Thread(target=get_graph, kwargs={"built_by": "warm_up"}, daemon=True)
+    thread.start()
+    return thread
+
+def graph_stats():
+    return dict(_graph_stats, ready=_graph is not None)
+
+def release_thread(graph, thread_id):
+    # Drop a finished run's checkpoints so the shared MemorySaver does not grow forever
+    checkpointer = graph.checkpointer
+    if hasattr(checkpointer, "delete_thread"):
+        checkpointer.delete_thread(thread_id)
+        return
+    checkpointer.storage.pop(thread_id, None)
+    for key in [key for key in list(checkpointer.writes) if key[0] == thread_id]:
+        checkpointer.writes.pop(key, None)
+
+def message_agent(message):
+    if isinstance(message, AIMessage):
+        return message.name
+    if isinstance(message, HumanMessage):
+        return "user"
+    return "tool"
+
+def audit_address(graph, address, thread_id, on_message=None, should_cancel=None, recursion_limit=30):
+    """
+    Runs one graph thread that audits a single contract address.
 
-def run_mas_workflow(contract_id, address):
-    graph = create_graph()
+    Parameters:
+        graph: The compiled graph, see get_graph.
+        address (str): The contract address to audit.
+        thread_id (str): Checkpointer thread of this run, released when it ends.
+        on_message (callable): Called with each new message as the graph streams.
+        should_cancel (callable): Checked between agent steps, stops the run when it returns True.
+
+    Returns:
+        dict: {"address", "report", "cancelled"} where report is the reporter's
+        last message, or the last agent message if the reporter did not answer.
+    """
     user_input = f"Create a plan to find problems in this smart contract at this address: {address}"
-    config = {"configurable": {"thread_id": contract_id}, "recursion_limit": 30}
-    events = graph.stream({"messages": [HumanMessage(content=user_input)]}, config, stream_mode="values")
-    # Process all the messages in the result and update the report
-    final_result = ""
+    config = {"configurable": {"thread_id": thread_id}, "recursion_limit": recursion_limit}
+    report_by, report = None, ""
+    cancelled = False
     try:
-        for event in events:
-        # insert into events table
+        for event in graph.stream({"messages": [HumanMessage(content=user_input)]}, config, stream_mode="values"):
+            # Stop between agent steps when the audit was cancelled
+            if should_cancel is not None and should_cancel():
+                cancelled = True
+                break
             if 'messages' in event:
                 message = event['messages'][-1]
-                if isinstance(message, AIMessage):
-                    agent_name = message.name
-                elif isinstance(message, HumanMessage):
-                    agent_name = "user"
-                else:
-                    agent_name = "tool"
-                    
-                insert_event(contract_id=contract_id, agent=agent_name, action=message.content)
-                final_result += message.content + "\n"  # Append each message's content
-        update_report(contract_id, final_result) 
-    except:
-        # Update the report with the entire result
-        update_report(contract_id, final_result)
+                if on_message is not None:
+                    on_message(message)
+                # Keep the reporter's answer once there is one
+                if isinstance(message, AIMessage) and message.content and (report_by != "reporter" or message.name == "reporter"):
+                    report_by, report = message.name, message.content
+    finally:
+        release_thread(graph, thread_id)
+    return {"address": address, "report": report, "cancelled": cancelled}
+
+def prefetch_contract_data(addresses):
+    """
+    Loads every target's ABI and source code into the shared caches before the runs
+    start, and compiles the sources together on the solc worker pool, so parallel
+    runs do not each go to Etherscan, install the same compiler or recompile a target.
+    """
+    source_codes = []
+    for address in addresses:
+        try:
+            get_abi_from_etherscan(address)
+            source_code = get_source_code_from_etherscan(address)
+            if source_code:
+                source_codes.append((address, source_code))
+        except Exception as e:
+            # The agents' tools report the error during the run
+            print(f"Failed to prefetch contract data for {address}: {e}")
+
+    compiled = solc_manager.compile_many([source_code for _, source_code in source_codes])
+    for (address, _), result in zip(source_codes, compiled):
+        if isinstance(result, Exception):
+            # e.g. multi-file sources, the agents compile what they need themselves
+            print(f"Failed to precompile the source of {address}: {result}")
+
+def merge_reports(results):
+    """Merges per-address audit results into one markdown summary."""
+    sections = []
+    for result in results:
+        if result.get("error"):
+            body = f"Audit failed: {result['error']}"
+        elif result["cancelled"]:
+            body = "Audit cancelled."
+        else:
+            body = result["report"].replace("FINAL ANSWER", "").strip() or "No findings reported."
+        sections.append(f"## {result['address']}\n\n{body}")
+    failed = sum(1 for result in results if result.get("error"))
+    header = f"# Audit summary\n\n{len(results)} contracts audited, {failed} failed."
+    return "\n\n".join([header] + sections) + "\n"
+
+def audit_addresses(addresses, graph=None, thread_prefix=None, max_workers=None, on_message=None, should_cancel=None):
+    """
+    Audits several addresses, each in its own graph run, at most `max_workers` at a time.
+
+    The runs share the compiled graph and the ABI, source code and compiler
+    artifact caches.
+
+    Parameters:
+        addresses (list): Contract addresses to audit.
+        graph: The compiled graph, the shared one from get_graph if not given.
+        thread_prefix (str): Prefix of the per-address checkpointer thread ids, unique per call if not given.
+        max_workers (int): Concurrent runs, AUDIT_FANOUT_WORKERS (default 3) if not given.
+        on_message (callable): Called with (address, message) for each new message.
+        should_cancel (callable): Checked between agent steps of every run.
+
+    Returns:
+        dict: {"results": per-address results in input order, "summary": merged markdown report}
+    """
+    addresses = list(dict.fromkeys(address.strip() for address in addresses if address.strip()))
+    max_workers = max_workers or int(os.getenv("AUDIT_FANOUT_WORKERS", 3))
+    graph = graph or get_graph()
+    # Concurrent calls auditing the same address must not share a checkpointer thread
+    thread_prefix = thread_prefix or f"multi:{uuid.uuid4().hex}"
+    prefetch_contract_data(addresses)
+
+    def audit(address):
+        callback = None if on_message is None else functools.partial(on_message, address)
+        try:
+            return audit_address(graph, address, f"{thread_prefix}:{address}", on_message=callback, should_cancel=should_cancel)
+        except Exception as e:
+            return {"address": address, "report": "", "cancelled": False, "error": str(e)}
+
+    with ThreadPoolExecutor(max_workers=max(1, min(max_workers, len(addresses) or 1))) as executor:
+        results = list(executor.map(audit, addresses))
+    return {"results": results, "summary": merge_reports(results)}
+
+def run(graph=None):
+    print("Analysis Started")
+    addresses = ["0x8d4255bf30Ad54BAdcc672fAE977b9D3f15C3f18", "0xBf7446A56F00f88FF72A7C57Db945EE2132F421d", "0xD1A5c53E7F930248083597Ba88C84c1b087ED89e"]
+
+    def print_message(address, message):
+        print(f"[{address}]")
+        message.pretty_print()
+
+    audit = audit_addresses(addresses, graph=graph, on_message=print_message)
+    print(audit["summary"])
+    
+
+def run_mas_workflow(contract_id, address, should_cancel=None):
+    start = time.perf_counter()
+    graph = get_graph()
+    with _graph_lock:
+        _graph_stats["audits"] += 1
+        _graph_stats["last_audit_setup_seconds"] = time.perf_counter() - start
+    # Events and report progress are written to Mongo in the background
+    sink = create_event_sink(contract_id)
+
+    def emit(message):
+        # insert into events table
+        sink.emit(agent=message_agent(message), action=message.content)
+
+    try:
+        # Contract ids only have one-second resolution, the shared checkpointer needs a thread per run
+        thread_id = f"{contract_id}:{uuid.uuid4().hex}"
+        result = audit_address(graph, address, thread_id, on_message=emit, should_cancel=should_cancel)
+        if result["cancelled"]:
+            sink.append_report("Audit cancelled.\n")
+    finally:
+        # Flushes the remaining events and the full report
+        sink.close()
+
+def run_mas_fanout_workflow(contract_id, addresses, should_cancel=None):
+    """
+    Audits several addresses as one job, see audit_addresses.
+
+    Every run's messages are recorded as events of `contract_id`, prefixed with
+    the audited address, and the merged summary ends the report.
+    """
+    sink = create_event_sink(contract_id)
+
+    def emit(address, message):
+        sink.emit(agent=message_agent(message), action=f"[{address}] {message.content}")
+
+    try:
+        audit = audit_addresses(addresses, on_message=emit, should_cancel=should_cancel)
+        sink.append_report("\n" + audit["summary"])
+    finally:
+        sink.close()
         
         
 
 if __name__ == "__main__":
-    graph = create_graph()
-    run(graph)
+    run()
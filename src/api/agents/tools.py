@@ -1,10 +1,20 @@
-import requests
 from web3 import Web3
+from web3.exceptions import Web3TypeError
+from web3.providers import JSONBaseProvider
+from hexbytes import HexBytes
+from concurrent.futures import ThreadPoolExecutor
 import json
 import os
-import solcx
-from solcx import compile_standard
-from api.constants import ETHERSCAN_API_KEY, ETHERSCAN_BASE_URL
+from api.chain_backend import chain_state_guard, get_chain_backend
+from api.constants import CHAIN_ID
+from api.contract_cache import ContractDataCache
+from api.contract_registry import contract_registry, decode_output
+from api.etherscan import UNVERIFIED_ABI, etherscan_client
+from api.fee_oracle import fee_oracle
+from api.nonce_manager import is_nonce_error, nonce_manager
+from api.receipt_tracker import get_receipt_tracker
+from api.solc_manager import solc_manager
+from schema import get_uploaded_contract_address_abi, get_uploaded_contract_source_code
 
 # Load the contract ABI from a file
 def load_abi(abi_path):
@@ -13,42 +23,90 @@ def load_abi(abi_path):
 
 # Call a read-only function on a smart contract (does not cost gas)
 def call_function(w3, contract_address, abi, function_name, *args, from_address=None):
-    contract = w3.eth.contract(address=Web3.to_checksum_address(contract_address), abi=abi)
-    function = getattr(contract.functions, function_name)
+    function = contract_registry.function(w3, contract_address, abi, function_name)
 
     # Include 'from' address if provided
     call_params = {'from': from_address} if from_address else {}
     result = function(*args).call(call_params)
     return result
 
-def send_transaction(w3: Web3, private_key, contract_address, abi, function_name, value=0, gas_price=None, function_args=[]):
-    account = w3.eth.account.from_key(private_key)
-    contract = w3.eth.contract(address=Web3.to_checksum_address(contract_address), abi=abi)
-    function = getattr(contract.functions, function_name)
-
-    # Use the default gas price if not provided
-    if gas_price is None:
-        gas_price = w3.eth.gas_price
-
-    # Get the correct nonce
-    nonce = w3.eth.get_transaction_count(account.address)
-
-    # Build the transaction
-    txn = function(*function_args).build_transaction({
-        'from': account.address,
-        'value': value,  # Sending ether if needed (0 by default)
-        'gas': 2000000,
-        'gasPrice': gas_price,  # Using provided or default gas price
+# Build a contract transaction with cached fees and a memoized gas estimate
+def build_contract_transaction(w3, contract_call, from_address, nonce, value=0, gas_price=None, fee_params=None, chain_id=None):
+    """
+    Builds a transaction for a bound contract function call or constructor.
+
+    Parameters:
+        contract_call: A bound ContractFunction or ContractConstructor.
+        gas_price (int, optional): Forces a legacy transaction with this gas price.
+        fee_params (dict, optional): Fee fields to use instead of asking the fee oracle.
+        chain_id (int, optional): Defaults to the chain ID of the active chain backend.
+
+    Returns:
+        dict: The transaction, ready to be signed.
+    """
+    txn = {
+        'chainId': chain_id if chain_id is not None else get_chain_backend().chain_id,
+        'from': from_address,
         'nonce': nonce,
-        'chainId': 11155111  # Sepolia chain ID
-    })
+        'value': value,
+    }
+    if gas_price is not None:
+        txn['gasPrice'] = gas_price
+    else:
+        txn.update(fee_params or fee_oracle.fee_params(w3))
+    txn['gas'] = fee_oracle.estimate_gas(w3, contract_call, txn)
+    return contract_call.build_transaction(txn)
+
+# Sign and send a transaction with a nonce from the shared nonce manager
+def sign_and_send(w3, private_key, build_txn, retries=1):
+    """
+    Allocates a nonce, builds, signs and sends a transaction.
 
-    # Sign the transaction
-    signed_txn = w3.eth.account.sign_transaction(txn, private_key)
-    
-    # Send the transaction
-    txn_hash = w3.eth.send_raw_transaction(signed_txn.raw_transaction)
-    
+    Parameters:
+        w3 (Web3): Web3 instance connected to the blockchain.
+        private_key (str): Private key of the sending account.
+        build_txn (callable): Called with (from_address, nonce), returns the transaction dict.
+        retries (int): How many times to retry after the node rejects the nonce.
+
+    Returns:
+        HexBytes: The transaction hash.
+    """
+    account = w3.eth.account.from_key(private_key)
+    for attempt in range(retries + 1):
+        # Not while the exploit sandbox has a snapshot of this node open
+        with chain_state_guard(w3):
+            nonce = nonce_manager.allocate(w3, account.address)
+            try:
+                txn = build_txn(account.address, nonce)
+                signed_txn = w3.eth.account.sign_transaction(txn, private_key)
+            except Exception:
+                # Nothing was sent, the nonce is free again
+                nonce_manager.rewind(w3, account.address, nonce)
+                raise
+            try:
+                txn_hash = w3.eth.send_raw_transaction(signed_txn.raw_transaction)
+            except Exception as e:
+                if not is_nonce_error(e):
+                    # The node did not take the transaction, so it did not take the nonce either
+                    nonce_manager.rewind(w3, account.address, nonce)
+                    raise
+                # Our nonce is out of sync with the node, reload it
+                nonce_manager.resync(w3, account.address)
+                if attempt < retries:
+                    continue
+                raise
+        # Start resolving the receipt now, so waiting for it later is usually instant
+        get_receipt_tracker(w3).track(txn_hash)
+        return txn_hash
+
+def send_transaction(w3: Web3, private_key, contract_address, abi, function_name, value=0, gas_price=None, function_args=[]):
+    function = contract_registry.function(w3, contract_address, abi, function_name)
+
+    # Build the transaction, fees come from the fee oracle unless a gas price is provided
+    def build_txn(from_address, nonce):
+        return build_contract_transaction(w3, function(*function_args), from_address, nonce, value=value, gas_price=gas_price)
+
+    txn_hash = sign_and_send(w3, private_key, build_txn)
     return txn_hash.hex()
 
 
@@ -56,23 +114,14 @@ def send_transaction(w3: Web3, private_key, contract_address, abi, function_name
 
 # Send a payable transaction (used when sending Ether along with a function call)
 def send_payable_transaction(w3, private_key, contract_address, abi, function_name, *args, value=0):
-    account = w3.eth.account.from_key(private_key)
-    contract = w3.eth.contract(address=Web3.to_checksum_address(contract_address), abi=abi)
-    function = getattr(contract.functions, function_name)
+    function = contract_registry.function(w3, contract_address, abi, function_name)
 
     # Build the transaction for payable functions
-    txn = function(*args).build_transaction({
-        'from': account.address,
-        'value': value,  # Ether to send
-        'gas': 2000000,
-        'gasPrice': w3.eth.gas_price,
-        'nonce': w3.eth.get_transaction_count(account.address),
-        'chainId': 11155111  # Sepolia chain ID
-    })
+    def build_txn(from_address, nonce):
+        return build_contract_transaction(w3, function(*args), from_address, nonce, value=value)
 
     # Sign and send the transaction
-    signed_txn = w3.eth.account.sign_transaction(txn, private_key)
-    txn_hash = w3.eth.send_raw_transaction(signed_txn.raw_transaction)
+    txn_hash = sign_and_send(w3, private_key, build_txn)
     return txn_hash.hex()
 
 # Check the balance of an address in Ether
@@ -82,14 +131,135 @@ def check_balance(w3, address):
 
 # Retrieve multiple pieces of data from a contract
 def retrieve_contract_data(w3, contract_address, abi, function_name, *args):
-    contract = w3.eth.contract(address=Web3.to_checksum_address(contract_address), abi=abi)
-    function = getattr(contract.functions, function_name)
+    function = contract_registry.function(w3, contract_address, abi, function_name)
     data = function(*args).call()
     return data
 
+# Multicall3 is deployed at the same address on mainnet, Sepolia and most other chains
+MULTICALL3_ADDRESS = "0xcA11bde05977b3631167028862bE2a173976CA11"
+MULTICALL3_ABI = [
+    {
+        "type": "function", "name": "aggregate3", "stateMutability": "payable",
+        "inputs": [{"name": "calls", "type": "tuple[]", "components": [
+            {"name": "target", "type": "address"},
+            {"name": "allowFailure", "type": "bool"},
+            {"name": "callData", "type": "bytes"},
+        ]}],
+        "outputs": [{"name": "returnData", "type": "tuple[]", "components": [
+            {"name": "success", "type": "bool"},
+            {"name": "returnData", "type": "bytes"},
+        ]}],
+    },
+    {
+        "type": "function", "name": "getEthBalance", "stateMutability": "view",
+        "inputs": [{"name": "addr", "type": "address"}],
+        "outputs": [{"name": "balance", "type": "uint256"}],
+    },
+]
+# Provider -> whether Multicall3 has code there
+_multicall_available = {}
+
+def _encode_read(w3, contract_address, abi, function_name, args):
+    prepared = contract_registry.get(w3, contract_address, abi)
+    data, output_types = prepared.encode(function_name, args)
+    return prepared.address, data, output_types
+
+def _has_multicall(w3):
+    key = str(w3.provider)
+    if key not in _multicall_available:
+        _multicall_available[key] = len(w3.eth.get_code(MULTICALL3_ADDRESS)) > 0
+    return _multicall_available[key]
+
+def _multicall_reads(w3, encoded_reads, balances, block_number, batch_size):
+    multicall = contract_registry.get(w3, MULTICALL3_ADDRESS, MULTICALL3_ABI)
+    calls = [(target, True, data) for target, data, _ in encoded_reads]
+    calls += [(MULTICALL3_ADDRESS, True, multicall.encode("getEthBalance", [address])[0]) for address in balances]
+    responses = []
+    # Split very large batches so each eth_call stays under the node's gas cap
+    for start in range(0, len(calls), batch_size):
+        responses += multicall.function("aggregate3")(calls[start:start + batch_size]).call(block_identifier=block_number)
+    return [(success, bytes(data)) for success, data in responses]
+
+def _rpc_reads(w3, encoded_reads, balances, block_number, max_workers):
+    requests = [(w3.eth.call, {"to": target, "data": data}) for target, data, _ in encoded_reads]
+    requests += [(w3.eth.get_balance, address) for address in balances]
+    try:
+        batch = w3.batch_requests()
+    except Web3TypeError:
+        # The provider does not support JSON-RPC batches
+        batch = None
+
+    if batch is not None:
+        try:
+            with batch:
+                for method, params in requests:
+                    batch.add(method(params, block_number))
+                responses = batch.execute()
+            return [(True, response) for response in responses]
+        except Exception as e:
+            # A reverted read fails the whole batch, send them one by one instead
+            print(f"Batched reads failed, retrying individually: {e}")
+
+    def send(request):
+        method, params = request
+        try:
+            return True, method(params, block_number)
+        except Exception:
+            return False, b""
+
+    with ThreadPoolExecutor(max_workers=max(1, min(max_workers, len(requests)))) as executor:
+        return list(executor.map(send, requests))
+
+# Read several contract values and balances at once, all from the same block
+def batch_read(w3, reads=(), balances=(), block_identifier=None, use_multicall=True, batch_size=200, max_workers=8):
+    """
+    Runs many read-only calls and balance lookups against one block.
+
+    The reads go out as a single Multicall3 aggregate3 call when Multicall3 is
+    deployed on the chain, otherwise as one JSON-RPC batch, or from a bounded
+    thread pool when the provider has no batch support.
+
+    Parameters:
+        w3 (Web3): Web3 instance connected to the blockchain.
+        reads (list): (contract_address, abi, function_name, args) tuples.
+        balances (list): Addresses whose native balance to read, in wei.
+        block_identifier (optional): Block to read at, defaults to the latest block number.
+        use_multicall (bool): Set to False to skip Multicall3.
+
+    Returns:
+        dict: {"block_number": int, "results": one {"success", "value"} per read,
+               "balances": {checksum address: wei}}. A reverted read has success False.
+    """
+    encoded_reads = [_encode_read(w3, *read) for read in reads]
+    balances = [Web3.to_checksum_address(address) for address in balances]
+    if block_identifier is None or isinstance(block_identifier, str):
+        block_number = w3.eth.get_block(block_identifier or "latest")["number"]
+    else:
+        block_number = block_identifier
+
+    if use_multicall and _has_multicall(w3):
+        responses = _multicall_reads(w3, encoded_reads, balances, block_number, batch_size)
+        balance_values = [int.from_bytes(data, "big") if success else None for success, data in responses[len(encoded_reads):]]
+    else:
+        responses = _rpc_reads(w3, encoded_reads, balances, block_number, max_workers)
+        balance_values = [value if success else None for success, value in responses[len(encoded_reads):]]
+
+    results = []
+    for (_, _, output_types), (success, data) in zip(encoded_reads, responses):
+        try:
+            results.append({"success": True, "value": decode_output(w3, output_types, data)} if success else {"success": False, "value": None})
+        except Exception:
+            # e.g. empty return data from an address without code
+            results.append({"success": False, "value": None})
+    return {
+        "block_number": block_number,
+        "results": results,
+        "balances": dict(zip(balances, balance_values)),
+    }
+
 # Monitor contract events (useful for reflection agent)
 def monitor_events(w3, contract_address, abi, event_name, from_block='latest'):
-    contract = w3.eth.contract(address=Web3.to_checksum_address(contract_address), abi=abi)
+    contract = contract_registry.contract(w3, contract_address, abi)
     event_filter = contract.events.__dict__[event_name].createFilter(fromBlock=from_block)
     
     # Retrieve all past events
@@ -107,30 +277,113 @@ def retry_transaction(w3, private_key, contract_address, abi, function_name, *ar
             continue
     raise RuntimeError("All retry attempts failed")
 
+# Send signed raw transactions in nonce order, in one JSON-RPC batch when possible
+def send_raw_transactions(w3, raw_txns):
+    """
+    Sends signed transactions, which must be sorted by nonce.
+
+    With JSON-RPC batch support they go out in one request, and the node
+    reports on each one. Otherwise they are sent one after another, and the
+    first rejected transaction stops the rest, since their nonces could not be
+    mined anyway.
+
+    Returns:
+        list: One (txn_hash, error) pair per transaction, in order. txn_hash is
+              None and error the node's message when it was not accepted.
+    """
+    # The same check web3 makes before it accepts a JSON-RPC batch
+    if isinstance(w3.provider, JSONBaseProvider):
+        # Through the provider directly, since a batch fails as a whole once formatted by web3
+        responses = w3.provider.make_batch_request(
+            [("eth_sendRawTransaction", [HexBytes(raw_txn).to_0x_hex()]) for raw_txn in raw_txns]
+        )
+        return [
+            (HexBytes(response["result"]), None) if response.get("result") else (None, str(response.get("error")))
+            for response in responses
+        ]
+
+    results = []
+    for raw_txn in raw_txns:
+        if results and results[-1][1] is not None:
+            results.append((None, "Not sent, an earlier transaction of the batch was rejected"))
+            continue
+        try:
+            results.append((w3.eth.send_raw_transaction(raw_txn), None))
+        except Exception as e:
+            results.append((None, str(e)))
+    return results
+
+# Wait for several transactions through the shared receipt tracker
+def wait_for_receipts(w3, txn_hashes, timeout=120):
+    """
+    Waits until every transaction in `txn_hashes` is mined.
+
+    Returns:
+        list: The receipts, in the same order as `txn_hashes`.
+    """
+    return get_receipt_tracker(w3).wait(txn_hashes, timeout=timeout)
+
 # Submit multiple transactions in a single batch
-def submit_batch_transactions(w3, private_key, contract_address, abi, function_names_and_args):
-    try:
-        account = w3.eth.account.from_key(private_key)
-        txns = []
-        for function_name, args in function_names_and_args:
-            contract = w3.eth.contract(address=Web3.to_checksum_address(contract_address), abi=abi)
-            function = getattr(contract.functions, function_name)
-            txn = function(*args).build_transaction({
-                'chainId': 11155111,
-                'from': account.address,
-                'nonce': w3.eth.get_transaction_count(account.address),
-                'gas': 2000000,
-                'gasPrice': w3.eth.gas_price,
-            })
-            signed_txn = w3.eth.account.sign_transaction(txn, private_key=private_key)
-            txns.append(signed_txn)
-
-        # Send transactions in parallel
-        txn_hashes = [w3.eth.send_raw_transaction(txn.raw_transaction) for txn in txns]
-        return [txn_hash.hex() for txn_hash in txn_hashes]
-    except Exception as e:
-        print(f"Error in batch transaction: {str(e)}")
-        raise
+def submit_batch_transactions(w3, private_key, contract_address, abi, function_names_and_args, wait=False, timeout=120):
+    """
+    Builds, signs and sends several contract calls as one pipelined batch.
+
+    Fees and chain ID are fetched once, nonces are reserved as one consecutive
+    block, and every transaction is signed before the first one is sent.
+
+    Parameters:
+        function_names_and_args (list): (function_name, args) pairs, sent in this order.
+        wait (bool): Wait for the receipts of the sent transactions before returning.
+        timeout (int): Seconds to wait for the receipts when `wait` is set.
+
+    Returns:
+        list: One {"function_name", "txn_hash", "error"} dict per call, in order, with
+              a "receipt" (None for unsent transactions) when `wait` is set.
+    """
+    account = w3.eth.account.from_key(private_key)
+    prepared = contract_registry.get(w3, contract_address, abi)
+    fee_params = fee_oracle.fee_params(w3)
+    chain_id = w3.eth.chain_id
+    with chain_state_guard(w3):
+        first_nonce = nonce_manager.allocate(w3, account.address, count=len(function_names_and_args))
+
+        try:
+            signed_txns = []
+            for offset, (function_name, args) in enumerate(function_names_and_args):
+                function = prepared.function(function_name)
+                txn = build_contract_transaction(
+                    w3, function(*args), account.address, first_nonce + offset,
+                    fee_params=fee_params, chain_id=chain_id,
+                )
+                signed_txns.append(w3.eth.account.sign_transaction(txn, private_key=private_key))
+        except Exception as e:
+            # Nothing was sent, all the reserved nonces are free again
+            nonce_manager.rewind(w3, account.address, first_nonce)
+            print(f"Error in batch transaction: {str(e)}")
+            raise
+
+        sent = send_raw_transactions(w3, [signed_txn.raw_transaction for signed_txn in signed_txns])
+        unsent = [offset for offset, (txn_hash, error) in enumerate(sent) if error is not None]
+        if unsent:
+            if any(error is None for _, error in sent[unsent[0] + 1:]):
+                # A JSON-RPC batch is not stopped by a rejection, so later nonces are
+                # taken and the gaps have to be found from the node's pending count
+                nonce_manager.resync(w3, account.address)
+            else:
+                # Reuse the nonces from the first transaction that did not land
+                nonce_manager.rewind(w3, account.address, first_nonce + unsent[0])
+            print(f"{len(unsent)} of {len(sent)} batch transactions were not sent: {sent[unsent[0]][1]}")
+
+    results = [
+        {"function_name": function_name, "txn_hash": txn_hash.hex() if txn_hash else None, "error": error}
+        for (function_name, _), (txn_hash, error) in zip(function_names_and_args, sent)
+    ]
+    if wait:
+        txn_hashes = [txn_hash for txn_hash, error in sent if error is None]
+        receipts = dict(zip(txn_hashes, wait_for_receipts(w3, txn_hashes, timeout=timeout)))
+        for result, (txn_hash, _) in zip(results, sent):
+            result["receipt"] = receipts.get(txn_hash)
+    return results
 
 # Trigger self-destruct vulnerability
 def trigger_self_destruct(w3, private_key, contract_address, abi):
@@ -155,48 +408,28 @@ def monitor_account_activity(w3, address, from_block='latest'):
 
 # Orchestrate multi-step exploit
 def orchestrate_exploit(w3, private_key, contract_address, abi, steps):
-    account = w3.eth.account.from_key(private_key)
-
     for step in steps:
         function_name, args = step
-        contract = w3.eth.contract(address=Web3.to_checksum_address(contract_address), abi=abi)
-        function = getattr(contract.functions, function_name)
-
-        txn = function(*args).build_transaction({
-            'chainId': 11155111,
-            'from': account.address,
-            'nonce': w3.eth.get_transaction_count(account.address),
-            'gas': 2000000,
-            'gasPrice': w3.eth.gas_price,
-        })
-
-        signed_txn = w3.eth.account.sign_transaction(txn, private_key=private_key)
-        txn_hash = w3.eth.send_raw_transaction(signed_txn.raw_transaction)
+        function = contract_registry.function(w3, contract_address, abi, function_name)
+
+        def build_txn(from_address, nonce):
+            return build_contract_transaction(w3, function(*args), from_address, nonce)
+
+        txn_hash = sign_and_send(w3, private_key, build_txn)
         print(f"Executed step: {function_name}, Txn hash: {txn_hash.hex()}")
 
 # Generic smart contract function call
 def call_contract_function(w3, private_key, contract_address, abi, function_name, *args, value=0):
-    account = w3.eth.account.from_key(private_key)
-    contract = w3.eth.contract(address=Web3.to_checksum_address(contract_address), abi=abi)
-    function = getattr(contract.functions, function_name)
-
-    txn = function(*args).build_transaction({
-        'chainId': 11155111,  # Sepolia Chain ID
-        'from': account.address,
-        'nonce': w3.eth.get_transaction_count(account.address),
-        'gas': 2000000,
-        'gasPrice': w3.eth.gas_price,
-        'value': value,  # If ETH is required
-    })
+    function = contract_registry.function(w3, contract_address, abi, function_name)
 
-    signed_txn = w3.eth.account.sign_transaction(txn, private_key=private_key)
-    txn_hash = w3.eth.send_raw_transaction(signed_txn.raw_transaction)
+    def build_txn(from_address, nonce):
+        return build_contract_transaction(w3, function(*args), from_address, nonce, value=value)  # value if ETH is required
 
+    txn_hash = sign_and_send(w3, private_key, build_txn)
     return txn_hash.hex()
 
 def read_contract_function(w3, contract_address, abi, function_name, *args):
-    contract = w3.eth.contract(address=Web3.to_checksum_address(contract_address), abi=abi)
-    function = getattr(contract.functions, function_name)
+    function = contract_registry.function(w3, contract_address, abi, function_name)
     result = function(*args).call()
     return result
 
@@ -212,31 +445,28 @@ def retry_transaction(w3, private_key, contract_address, abi, function_name, *ar
 
 def deploy_malicious_contract(w3: Web3, private_key: str, bytecode: str, abi: list, target_contract_address: str):
     try:
-        account = w3.eth.account.from_key(private_key)
         contract = w3.eth.contract(abi=abi, bytecode=bytecode)
 
         # Pass the target address to the constructor
-        tx = contract.constructor(target_contract_address).build_transaction({
-            'chainId': 11155111,  # Sepolia chain ID
-            'from': account.address,
-            'nonce': w3.eth.get_transaction_count(account.address),
-            'gas': 2000000,
-            'gasPrice': w3.eth.gas_price
-        })
-
-        signed_tx = w3.eth.account.sign_transaction(tx, private_key)
-        tx_hash = w3.eth.send_raw_transaction(signed_tx.raw_transaction)
-        tx_receipt = w3.eth.wait_for_transaction_receipt(tx_hash)
+        def build_txn(from_address, nonce):
+            return build_contract_transaction(w3, contract.constructor(target_contract_address), from_address, nonce)
+
+        tx_hash = sign_and_send(w3, private_key, build_txn)
+        tx_receipt = wait_for_receipts(w3, [tx_hash])[0]
 
         return tx_receipt.contractAddress
     except Exception as e:
         print(f"Error deploying malicious contract: {e}")
         return None
 
-    
+
 def compile_solidity_contract(source_code: str, contract_name: str):
     """
     Compiles a Solidity contract and returns its bytecode and ABI.
+
+    The solc version is picked from the source's pragma. Compiled artifacts are cached
+    on disk by source, compiler version and settings, so recompiling the same source
+    skips solc entirely.
     
     Parameters:
         source_code (str): Solidity source code of the contract.
@@ -245,32 +475,8 @@ def compile_solidity_contract(source_code: str, contract_name: str):
         dict: A dictionary containing the compiled bytecode and ABI.
     """
     try:
-        # Set the Solidity version to be used (you can adjust the version accordingly)
-        solcx.install_solc("0.8.0")
-        solcx.set_solc_version("0.8.0")
-
-        compiled_sol = compile_standard({
-            "language": "Solidity",
-            "sources": {
-                "Contract.sol": {
-                    "content": source_code
-                }
-            },
-            "settings": {
-                "outputSelection": {
-                    "*": {
-                        "*": ["abi", "evm.bytecode"]
-                    }
-                }
-            }
-        })
-        
-        bytecode = compiled_sol['contracts']['Contract.sol'][contract_name]['evm']['bytecode']['object']
-        abi = compiled_sol['contracts']['Contract.sol'][contract_name]['abi']
-        return {
-            "bytecode": bytecode,
-            "abi": abi
-        }
+        contracts = solc_manager.compile(source_code)
+        return dict(contracts[contract_name])
     except Exception as e:
         print(f"Error during compilation: {e}")
         return None 
@@ -288,24 +494,18 @@ def trigger_reentrancy_attack(w3: Web3, private_key: str, contract_abi: list, co
     Returns:
         str: Transaction hash of the attack transaction.
     """
-    account = w3.eth.account.from_key(private_key)
-    contract = w3.eth.contract(address=Web3.to_checksum_address(contract_address), abi=contract_abi)
+    contract = contract_registry.contract(w3, contract_address, contract_abi)
 
     # Call the attack function from the malicious contract
-    tx = contract.functions.attack().build_transaction({
-        'chainId': 11155111,  # Sepolia chain ID
-        'from': account.address,
-        'nonce': w3.eth.get_transaction_count(account.address),
-        'gas': 2000000,
-        'gasPrice': w3.eth.gas_price
-    })
-    signed_tx = w3.eth.account.sign_transaction(tx, private_key)
-    tx_hash = w3.eth.send_raw_transaction(signed_tx.raw_transaction)
+    def build_txn(from_address, nonce):
+        return build_contract_transaction(w3, contract.functions.attack(), from_address, nonce)
+
+    tx_hash = sign_and_send(w3, private_key, build_txn)
     return tx_hash.hex()
 
 def get_abi_from_etherscan(address: str):
     """
-    Fetches the ABI of a contract from Etherscan.
+    Returns the ABI of a contract, from the cache or Mongo when possible, else from Etherscan.
 
     Parameters:
         address (str): The address of the contract to fetch.
@@ -313,34 +513,55 @@ def get_abi_from_etherscan(address: str):
     Returns:
         list: The parsed ABI of the contract.
     """
-    abi_response = requests.get(f"{ETHERSCAN_BASE_URL}?module=contract&action=getabi&address={address}&apikey={ETHERSCAN_API_KEY}")
-    abi_data = abi_response.json()
+    return abi_cache.get(CHAIN_ID, address)
 
-    if abi_data.get("status") != "1":
-        raise Exception(f"Unable to fetch ABI: {abi_data.get('result')}")
+def get_source_code_from_etherscan(address: str):
+    """
+    Returns the source code of a contract, from the cache or Mongo when possible, else from Etherscan.
 
-    try:
-        abi_parsed = json.loads(abi_data.get("result"))
-    except json.JSONDecodeError:
-        raise Exception(f"Failed to parse ABI: {abi_data.get('result')}")
+    Parameters:
+        address (str): The address of the contract to fetch.
 
-    return abi_parsed
+    Returns:
+        str: The source code of the contract.
+    """
+    return source_code_cache.get(CHAIN_ID, address)
 
-def get_source_code_from_etherscan(address: str):
+def fetch_abi_from_etherscan(address: str):
     """
-    Fetches the source code of a contract from Etherscan.
+    Fetches the ABI of a contract from Etherscan.
+
+    Uses the combined getsourcecode call, so the source code is cached as well.
 
     Parameters:
         address (str): The address of the contract to fetch.
 
     Returns:
-        str: The source code of the contract.
+        list: The parsed ABI of the contract.
     """
-    sourcecode_response = requests.get(f"{ETHERSCAN_BASE_URL}?module=contract&action=getsourcecode&address={address}&apikey={ETHERSCAN_API_KEY}")
-    sourcecode_data = sourcecode_response.json()
+    contract = etherscan_client.get_contract(address)
+    source_code_cache.put(CHAIN_ID, address, contract["source_code"])
+    if contract["abi"] is None:
+        raise Exception(f"Unable to fetch ABI: {UNVERIFIED_ABI}")
+    return contract["abi"]
+
+def fetch_source_code_from_etherscan(address: str):
+    """
+    Fetches the source code of a contract from Etherscan.
 
-    if sourcecode_data.get("status") != "1":
-        raise Exception(f"Unable to fetch source code: {sourcecode_data.get('result')}")
+    Uses the combined getsourcecode call, so the ABI is cached as well.
 
-    source_code_result = sourcecode_data.get("result", [{}])[0].get("SourceCode", "")
-    return source_code_result
\ No newline at end of file
+    Parameters:
+        address (str): The address of the contract to fetch.
+
+    Returns:
+        str: The source code of the contract.
+    """
+    contract = etherscan_client.get_contract(address)
+    if contract["abi"] is not None:
+        abi_cache.put(CHAIN_ID, address, contract["abi"])
+    return contract["source_code"]
+
+# Shared by the agents' tools and POST /contracts, keyed by (chain, address)
+abi_cache = ContractDataCache(fetch=fetch_abi_from_etherscan, store_lookup=get_uploaded_contract_address_abi)
+source_code_cache = ContractDataCache(fetch=fetch_source_code_from_etherscan, store_lookup=get_uploaded_contract_source_code)
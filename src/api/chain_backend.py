@@ -0,0 +1,270 @@
+import atexit
+import os
+import shutil
+import signal
+import subprocess
+import threading
+import time
+from contextlib import nullcontext
+
+from web3 import Web3
+
+from api.constants import CHAIN_ID
+from api.web3_connection import get_rpc_endpoints, get_web3_pool
+
+# Held by the exploit sandbox while it snapshots and reverts the in-process eth-tester
+# node, and while a transaction is sent to that node (see chain_state_guard), so a
+# revert never erases other audits' transactions
+chain_state_lock = threading.RLock()
+
+
+def chain_state_guard(w3):
+    """
+    Returns chain_state_lock when `w3` is an in-process eth-tester node, the only
+    kind the exploit sandbox shares with the tools. Remote and anvil nodes are
+    never reverted under them, so sends to those get a no-op context instead.
+    """
+    from web3 import EthereumTesterProvider
+    if isinstance(w3.provider, EthereumTesterProvider):
+        return chain_state_lock
+    return nullcontext()
+
+class ChainBackend:
+    """
+    The chain the agents' tools send transactions to.
+
+    Tools get their Web3 connection and chain ID from the active backend (see
+    get_chain_backend), so audits can run against the real network or a local
+    EVM without changing the tools.
+    """
+
+    name = "base"
+
+    def web3(self):
+        raise NotImplementedError
+
+    @property
+    def chain_id(self):
+        return self.web3().eth.chain_id
+
+    @property
+    def endpoint(self):
+        return None
+
+    def fund(self, address, wei):
+        """Gives `address` a balance of `wei`, only supported by local backends."""
+        raise NotImplementedError(f"The {self.name} backend cannot fund accounts")
+
+    def stop(self):
+        pass
+
+    def metrics(self):
+        return {"backend": self.name, "endpoint": self.endpoint}
+
+
+class RemoteBackend(ChainBackend):
+    """Public RPC endpoints through the shared Web3ConnectionPool (Sepolia by default)."""
+
+    name = "remote"
+
+    def __init__(self, chain_id=CHAIN_ID):
+        self._chain_id = chain_id
+
+    def web3(self):
+        return get_web3_pool().get()
+
+    @property
+    def chain_id(self):
+        return self._chain_id
+
+    @property
+    def endpoint(self):
+        pool = get_web3_pool()
+        return pool.endpoints[pool.metrics()["active_endpoint"]]
+
+
+class AnvilForkBackend(ChainBackend):
+    """
+    Local anvil node forked from the target chain, mining each transaction instantly.
+
+    Pinning `fork_block` makes runs deterministic and lets anvil reuse its RPC
+    cache for that block. With `state_path`, the chain state is saved when the
+    node stops and loaded on the next start; once that snapshot exists the node
+    starts from it without a fork URL, so audits can run offline.
+    """
+
+    name = "anvil"
+
+    def __init__(self, fork_url=None, fork_block=None, port=8545, chain_id=None, state_path=None, anvil_bin="anvil", startup_timeout=30):
+        self.fork_url = fork_url
+        self.fork_block = fork_block
+        self.port = port
+        self._chain_id = chain_id
+        self.state_path = state_path
+        self.anvil_bin = anvil_bin
+        self.startup_timeout = startup_timeout
+        self._lock = threading.Lock()
+        self._process = None
+        self._w3 = None
+
+    @property
+    def endpoint(self):
+        return f"http://127.0.0.1:{self.port}"
+
+    def _command(self):
+        command = [self.anvil_bin, "--port", str(self.port), "--silent"]
+        offline = self.state_path and os.path.exists(self.state_path)
+        if self.fork_url and not offline:
+            command += ["--fork-url", self.fork_url]
+            if self.fork_block is not None:
+                command += ["--fork-block-number", str(self.fork_block)]
+        if self._chain_id is not None:
+            command += ["--chain-id", str(self._chain_id)]
+        if self.state_path:
+            # Loads the snapshot if it exists and writes it back on exit
+            command += ["--state", self.state_path]
+        return command
+
+    def start(self):
+        with self._lock:
+            if self._process is not None and self._process.poll() is None:
+                return
+            if shutil.which(self.anvil_bin) is None:
+                raise RuntimeError(f"{self.anvil_bin} was not found, install Foundry to use the anvil backend")
+            self._process = subprocess.Popen(self._command(), stdout=subprocess.DEVNULL, stderr=subprocess.PIPE)
+            w3 = Web3(Web3.HTTPProvider(self.endpoint, request_kwargs={"timeout": 30}))
+            deadline = time.monotonic() + self.startup_timeout
+            while not w3.is_connected():
+                if self._process.poll() is not None:
+                    error = self._process.stderr.read().decode(errors="replace")
+                    raise RuntimeError(f"anvil exited during startup: {error}")
+                if time.monotonic() > deadline:
+                    self._process.kill()
+                    raise RuntimeError("anvil did not start in time")
+                time.sleep(0.1)
+            self._w3 = w3
+            print(f"Started anvil at {self.endpoint}")
+
+    def web3(self):
+        if self._w3 is None or self._process is None or self._process.poll() is not None:
+            self.start()
+        return self._w3
+
+    @property
+    def chain_id(self):
+        if self._chain_id is None:
+            self._chain_id = self.web3().eth.chain_id
+        return self._chain_id
+
+    def fund(self, address, wei):
+        self.web3().provider.make_request("anvil_setBalance", [Web3.to_checksum_address(address), hex(wei)])
+
+    def stop(self):
+        with self._lock:
+            if self._process is None or self._process.poll() is not None:
+                return
+            # SIGINT lets anvil write the state snapshot before exiting
+            self._process.send_signal(signal.SIGINT)
+            try:
+                self._process.wait(timeout=10)
+            except subprocess.TimeoutExpired:
+                self._process.kill()
+            self._process = None
+            self._w3 = None
+
+    def metrics(self):
+        return {
+            **super().metrics(),
+            "running": self._process is not None and self._process.poll() is None,
+            "fork_block": self.fork_block,
+            "state_path": self.state_path,
+        }
+
+
+class EthTesterBackend(ChainBackend):
+    """
+    In-process py-evm chain from eth-tester, for tests and CI runs without network access.
+
+    The chain starts empty (no fork), with funded test accounts.
+    """
+
+    name = "eth-tester"
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._w3 = None
+
+    def web3(self):
+        with self._lock:
+            if self._w3 is None:
+                from web3 import EthereumTesterProvider
+                self._w3 = Web3(EthereumTesterProvider())
+            return self._w3
+
+    def fund(self, address, wei):
+        w3 = self.web3()
+        address = Web3.to_checksum_address(address)
+        missing = wei - w3.eth.get_balance(address)
+        if missing > 0:
+            txn_hash = w3.eth.send_transaction({"from": w3.eth.accounts[0], "to": address, "value": missing})
+            w3.eth.wait_for_transaction_receipt(txn_hash)
+
+
+def create_chain_backend(name=None):
+    """
+    Creates the backend named by `name` or CHAIN_BACKEND: "remote" (default), "anvil" or "eth-tester".
+
+    The anvil backend is configured with ANVIL_FORK_URL (defaults to the first RPC
+    endpoint), ANVIL_FORK_BLOCK, ANVIL_PORT, ANVIL_CHAIN_ID, ANVIL_STATE_PATH and ANVIL_BIN.
+    """
+    name = name or os.getenv("CHAIN_BACKEND", "remote")
+    if name == "remote":
+        return RemoteBackend()
+    if name == "anvil":
+        fork_block = os.getenv("ANVIL_FORK_BLOCK")
+        chain_id = os.getenv("ANVIL_CHAIN_ID")
+        return AnvilForkBackend(
+            fork_url=os.getenv("ANVIL_FORK_URL") or get_rpc_endpoints()[0],
+            fork_block=int(fork_block) if fork_block else None,
+            port=int(os.getenv("ANVIL_PORT", 8545)),
+            chain_id=int(chain_id) if chain_id else None,
+            state_path=os.getenv("ANVIL_STATE_PATH"),
+            anvil_bin=os.getenv("ANVIL_BIN", "anvil"),
+        )
+    if name == "eth-tester":
+        return EthTesterBackend()
+    raise ValueError(f"Unknown chain backend: {name}")
+
+
+def fund_wallet(backend):
+    # The agents' wallet starts with LOCAL_WALLET_BALANCE ether on local chains
+    private_key = os.getenv("WALLET_PRIVATE_KEY")
+    if backend.name == "remote" or not private_key:
+        return
+    address = Web3().eth.account.from_key(private_key).address
+    backend.fund(address, Web3.to_wei(float(os.getenv("LOCAL_WALLET_BALANCE", 100)), "ether"))
+
+
+_backend = None
+_backend_lock = threading.Lock()
+
+
+def get_chain_backend():
+    global _backend
+    if _backend is None:
+        with _backend_lock:
+            if _backend is None:
+                backend = create_chain_backend()
+                atexit.register(backend.stop)
+                fund_wallet(backend)
+                _backend = backend
+    return _backend
+
+
+def set_chain_backend(backend):
+    """Replaces the process-wide backend, e.g. with a local one in tests."""
+    global _backend
+    with _backend_lock:
+        if _backend is not None:
+            _backend.stop()
+        _backend = backend
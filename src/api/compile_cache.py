@@ -0,0 +1,91 @@
+import hashlib
+import json
+import os
+import tempfile
+import threading
+
+
+class ArtifactCache:
+    """
+    Content-addressed on-disk cache of compiled contracts.
+
+    Entries are keyed on a hash of the source, the compiler version and the
+    compiler settings, and hold the ABI and bytecode of every contract in the
+    source. When the directory grows past `max_bytes` the least recently used
+    entries are removed.
+    """
+
+    def __init__(self, directory, max_bytes=128 * 1024 * 1024):
+        self.directory = directory
+        self.max_bytes = max_bytes
+        self._lock = threading.Lock()
+        self._metrics = {"hits": 0, "misses": 0, "evictions": 0}
+
+    @staticmethod
+    def key(source_code, compiler_version, settings):
+        payload = json.dumps(
+            {"source": source_code, "version": str(compiler_version), "settings": settings},
+            sort_keys=True,
+        )
+        return hashlib.sha256(payload.encode()).hexdigest()
+
+    def _path(self, key):
+        return os.path.join(self.directory, f"{key}.json")
+
+    def get(self, key):
+        path = self._path(key)
+        try:
+            with open(path, "r") as f:
+                artifact = json.load(f)
+            # Touch the entry so eviction sees it as recently used
+            os.utime(path)
+        except (OSError, ValueError):
+            with self._lock:
+                self._metrics["misses"] += 1
+            return None
+        with self._lock:
+            self._metrics["hits"] += 1
+        return artifact
+
+    def put(self, key, artifact):
+        os.makedirs(self.directory, exist_ok=True)
+        # Write to a temporary file first so readers never see a partial entry
+        fd, tmp_path = tempfile.mkstemp(dir=self.directory, suffix=".tmp")
+        with os.fdopen(fd, "w") as f:
+            json.dump(artifact, f)
+        os.replace(tmp_path, self._path(key))
+        self._evict()
+
+    def _evict(self):
+        with self._lock:
+            entries = []
+            total = 0
+            for name in os.listdir(self.directory):
+                if not name.endswith(".json"):
+                    continue
+                try:
+                    stat = os.stat(os.path.join(self.directory, name))
+                except OSError:
+                    continue
+                entries.append((stat.st_mtime, stat.st_size, name))
+                total += stat.st_size
+
+            for _, size, name in sorted(entries):
+                if total <= self.max_bytes:
+                    break
+                try:
+                    os.remove(os.path.join(self.directory, name))
+                except OSError:
+                    continue
+                total -= size
+                self._metrics["evictions"] += 1
+
+    def metrics(self):
+        with self._lock:
+            return dict(self._metrics)
+
+
+artifact_cache = ArtifactCache(
+    os.getenv("SOLC_ARTIFACT_CACHE_DIR", os.path.join(os.path.expanduser("~"), ".cache", "blackrabbit", "solc-artifacts")),
+    max_bytes=int(os.getenv("SOLC_ARTIFACT_CACHE_MAX_BYTES", 128 * 1024 * 1024)),
+)
@@ -1,4 +1,7 @@
 import os
 
 ETHERSCAN_BASE_URL = "https://api-sepolia.etherscan.io/api"
-ETHERSCAN_API_KEY = os.getenv("ETHERSCAN_API_KEY")
\ No newline at end of file
+ETHERSCAN_API_KEY = os.getenv("ETHERSCAN_API_KEY")
+
+# Chain the agents and Etherscan lookups target (Sepolia)
+CHAIN_ID = int(os.getenv("CHAIN_ID", 11155111))
@@ -0,0 +1,97 @@
+import threading
+from collections import OrderedDict
+from concurrent.futures import Future
+
+
+class ContractDataCache:
+    """
+    Two-tier cache for per-contract data such as ABIs and source code.
+
+    Lookups are keyed by (chain, address). The first tier is an in-process LRU,
+    the second is `store_lookup` (the documents already saved in Mongo), and
+    `fetch` (Etherscan) is only called when both miss. Concurrent lookups for
+    the same key share a single upstream call.
+    """
+
+    def __init__(self, fetch, store_lookup=None, maxsize=256):
+        self.fetch = fetch
+        self.store_lookup = store_lookup
+        self.maxsize = maxsize
+        self._lock = threading.Lock()
+        self._entries = OrderedDict()
+        self._inflight = {}
+        self._metrics = {"hits": 0, "store_hits": 0, "misses": 0, "coalesced": 0}
+
+    @staticmethod
+    def _key(chain, address):
+        return (chain, address.lower())
+
+    def get(self, chain, address):
+        key = self._key(chain, address)
+        with self._lock:
+            if key in self._entries:
+                self._entries.move_to_end(key)
+                self._metrics["hits"] += 1
+                return self._entries[key]
+            waiting = key in self._inflight
+            if waiting:
+                self._metrics["coalesced"] += 1
+                future = self._inflight[key]
+            else:
+                future = self._inflight[key] = Future()
+        if waiting:
+            # Another thread is already loading this key
+            return future.result()
+
+        try:
+            value = self._load(address)
+        except Exception as e:
+            with self._lock:
+                self._inflight.pop(key, None)
+            future.set_exception(e)
+            raise
+
+        with self._lock:
+            self._inflight.pop(key, None)
+            self._put(key, value)
+        future.set_result(value)
+        return value
+
+    def peek(self, chain, address):
+        """Returns the in-process entry for the key, or None without loading it."""
+        key = self._key(chain, address)
+        with self._lock:
+            if key not in self._entries:
+                return None
+            self._entries.move_to_end(key)
+            self._metrics["hits"] += 1
+            return self._entries[key]
+
+    def _load(self, address):
+        if self.store_lookup is not None:
+            value = self.store_lookup(address)
+            if value is not None:
+                with self._lock:
+                    self._metrics["store_hits"] += 1
+                return value
+        with self._lock:
+            self._metrics["misses"] += 1
+        return self.fetch(address)
+
+    def _put(self, key, value):
+        self._entries[key] = value
+        self._entries.move_to_end(key)
+        while len(self._entries) > self.maxsize:
+            self._entries.popitem(last=False)
+
+    def put(self, chain, address, value):
+        with self._lock:
+            self._put(self._key(chain, address), value)
+
+    def invalidate(self, chain, address):
+        with self._lock:
+            self._entries.pop(self._key(chain, address), None)
+
+    def metrics(self):
+        with self._lock:
+            return {**self._metrics, "size": len(self._entries)}
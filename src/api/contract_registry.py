@@ -0,0 +1,157 @@
+import hashlib
+import json
+import threading
+import time
+import weakref
+from collections import Counter, OrderedDict
+
+from eth_utils.abi import function_abi_to_4byte_selector, get_abi_input_types, get_abi_output_types
+from web3 import Web3
+from web3._utils.abi import map_abi_data
+from web3._utils.normalizers import BASE_RETURN_NORMALIZERS
+
+
+def decode_output(w3, output_types, data):
+    """Decodes call return data the way ContractFunction.call does, e.g. with checksummed addresses."""
+    values = map_abi_data(BASE_RETURN_NORMALIZERS, output_types, w3.codec.decode(output_types, data))
+    return values[0] if len(values) == 1 else values
+
+
+class PreparedContract:
+    """
+    A web3 Contract with its ABI processed once.
+
+    Keeps the resolved ContractFunction classes, a selector -> function ABI
+    index and, for functions that are not overloaded, the selector and
+    argument types needed to encode a call without going through web3.
+    """
+
+    def __init__(self, contract):
+        self.contract = contract
+        self.address = contract.address
+        self._functions = {}
+        self.selectors = {}
+        self._encoders = {}  # function name -> (selector, input types, output types)
+        function_abis = [entry for entry in contract.abi if entry.get("type") == "function"]
+        overloads = Counter(entry["name"] for entry in function_abis)
+        for entry in function_abis:
+            selector = function_abi_to_4byte_selector(entry)
+            self.selectors["0x" + selector.hex()] = entry
+            if overloads[entry["name"]] == 1:
+                self._encoders[entry["name"]] = (selector, get_abi_input_types(entry), get_abi_output_types(entry))
+
+    def function(self, function_name):
+        """Returns the ContractFunction for `function_name`, like getattr(contract.functions, name)."""
+        function = self._functions.get(function_name)
+        if function is None:
+            function = self._functions[function_name] = getattr(self.contract.functions, function_name)
+        return function
+
+    def encode(self, function_name, args):
+        """
+        Encodes a call to `function_name`.
+
+        Returns:
+            tuple: (calldata as a hex string, output types for decode_output)
+        """
+        encoder = self._encoders.get(function_name)
+        if encoder is not None:
+            selector, input_types, output_types = encoder
+            try:
+                return "0x" + (selector + self.contract.w3.codec.encode(input_types, list(args))).hex(), output_types
+            except Exception:
+                # Arguments eth_abi does not take as is (hex strings for bytes, ENS names) go through web3's normalizers
+                pass
+        function = self.function(function_name)(*args)
+        return function._encode_transaction_data(), get_abi_output_types(function.abi)
+
+    def decode_input(self, data):
+        """Returns (function name, decoded arguments) of calldata sent to this contract, or None."""
+        data = Web3.to_bytes(hexstr=data) if isinstance(data, str) else bytes(data)
+        entry = self.selectors.get("0x" + data[:4].hex())
+        if entry is None:
+            return None
+        return entry["name"], list(self.contract.w3.codec.decode(get_abi_input_types(entry), data[4:]))
+
+
+class ContractRegistry:
+    """
+    Caches PreparedContract objects per Web3 instance, keyed on (address, ABI hash).
+
+    Building a web3 Contract parses the ABI and creates a class per function,
+    which the tools used to repeat on every call. ABI hashes are memoized by
+    object identity, so passing the same (unmodified) ABI list again costs a
+    dictionary lookup. Contracts of a Web3 instance are dropped with it, and
+    the least recently used ones once `max_entries` are cached per instance.
+    """
+
+    def __init__(self, max_entries=512):
+        self.max_entries = max_entries
+        self._lock = threading.Lock()
+        self._contracts = weakref.WeakKeyDictionary()  # Web3 -> OrderedDict of (address, ABI hash) -> PreparedContract
+        self._abi_hashes = OrderedDict()  # id(abi) -> (abi, hash), the ABI is kept so its id is not reused
+        self._metrics = {"hits": 0, "misses": 0, "build_seconds": 0.0}
+
+    def abi_hash(self, abi):
+        with self._lock:
+            cached = self._abi_hashes.get(id(abi))
+            if cached is not None and cached[0] is abi:
+                return cached[1]
+        abi_hash = hashlib.sha256(json.dumps(abi, sort_keys=True).encode()).hexdigest()
+        with self._lock:
+            self._abi_hashes[id(abi)] = (abi, abi_hash)
+            while len(self._abi_hashes) > self.max_entries:
+                self._abi_hashes.popitem(last=False)
+        return abi_hash
+
+    def get(self, w3, address, abi):
+        """Returns the PreparedContract for `address` and `abi` on `w3`, building it on first use."""
+        key = (address.lower() if address else None, self.abi_hash(abi))
+        with self._lock:
+            contracts = self._contracts.get(w3)
+            if contracts is None:
+                contracts = self._contracts[w3] = OrderedDict()
+            prepared = contracts.get(key)
+            if prepared is not None:
+                contracts.move_to_end(key)
+                self._metrics["hits"] += 1
+                return prepared
+
+        start = time.perf_counter()
+        checksum_address = Web3.to_checksum_address(address) if address else None
+        prepared = PreparedContract(w3.eth.contract(address=checksum_address, abi=abi))
+        elapsed = time.perf_counter() - start
+        with self._lock:
+            self._metrics["misses"] += 1
+            self._metrics["build_seconds"] += elapsed
+            contracts[key] = prepared
+            while len(contracts) > self.max_entries:
+                contracts.popitem(last=False)
+        return prepared
+
+    def contract(self, w3, address, abi):
+        return self.get(w3, address, abi).contract
+
+    def function(self, w3, address, abi, function_name):
+        return self.get(w3, address, abi).function(function_name)
+
+    def clear(self):
+        with self._lock:
+            self._contracts.clear()
+            self._abi_hashes.clear()
+
+    def metrics(self):
+        with self._lock:
+            misses = self._metrics["misses"]
+            # Each hit skipped one build, at the average build time
+            saved = self._metrics["hits"] * self._metrics["build_seconds"] / misses if misses else 0.0
+            return {
+                "hits": self._metrics["hits"],
+                "misses": misses,
+                "entries": sum(len(contracts) for contracts in self._contracts.values()),
+                "build_seconds": round(self._metrics["build_seconds"], 4),
+                "saved_seconds": round(saved, 4),
+            }
+
+
+contract_registry = ContractRegistry()
@@ -0,0 +1,232 @@
+import asyncio
+import json
+import os
+import random
+import threading
+import time
+from concurrent.futures import Future
+
+import requests
+from requests.adapters import HTTPAdapter
+
+from api.constants import ETHERSCAN_BASE_URL
+
+UNVERIFIED_ABI = "Contract source code not verified"
+
+
+class EtherscanRateLimitError(Exception):
+    """Raised when Etherscan still rate limits a request after all retries."""
+
+
+def is_rate_limited(data):
+    # e.g. {"status": "0", "message": "NOTOK", "result": "Max calls per sec rate limit reached (5/sec)"}
+    return data.get("status") != "1" and "rate limit" in str(data.get("result", "")).lower()
+
+
+def parse_abi_response(abi_data):
+    """Returns the parsed ABI from an Etherscan getabi response."""
+    if abi_data.get("status") != "1":
+        raise Exception(f"Unable to fetch ABI: {abi_data.get('result')}")
+
+    try:
+        abi_parsed = json.loads(abi_data.get("result"))
+    except json.JSONDecodeError:
+        raise Exception(f"Failed to parse ABI: {abi_data.get('result')}")
+
+    return abi_parsed
+
+
+def parse_source_code_response(sourcecode_data):
+    """Returns the source code from an Etherscan getsourcecode response."""
+    if sourcecode_data.get("status") != "1":
+        raise Exception(f"Unable to fetch source code: {sourcecode_data.get('result')}")
+
+    source_code_result = sourcecode_data.get("result", [{}])[0].get("SourceCode", "")
+    return source_code_result
+
+
+def parse_contract_response(sourcecode_data):
+    """
+    Returns the ABI and source code from one getsourcecode response.
+
+    Returns:
+        dict: {"abi": parsed ABI, or None if the contract is not verified, "source_code": str}
+    """
+    source_code = parse_source_code_response(sourcecode_data)
+    abi = sourcecode_data["result"][0].get("ABI")
+    if not abi or abi == UNVERIFIED_ABI:
+        return {"abi": None, "source_code": source_code}
+    try:
+        return {"abi": json.loads(abi), "source_code": source_code}
+    except json.JSONDecodeError:
+        raise Exception(f"Failed to parse ABI: {abi}")
+
+
+class TokenBucket:
+    """
+    Token bucket allowing `rate` requests per second with bursts of up to `capacity`.
+
+    `reserve` takes a token and returns how long the caller has to wait before
+    using it, so both threads (time.sleep) and coroutines (asyncio.sleep) can
+    share one bucket.
+    """
+
+    def __init__(self, rate, capacity=None):
+        self.rate = rate
+        self.capacity = capacity or rate
+        self._lock = threading.Lock()
+        self._tokens = self.capacity
+        self._updated = time.monotonic()
+
+    def reserve(self):
+        with self._lock:
+            now = time.monotonic()
+            self._tokens = min(self.capacity, self._tokens + (now - self._updated) * self.rate)
+            self._updated = now
+            self._tokens -= 1
+            if self._tokens >= 0:
+                return 0.0
+            # Negative tokens are reservations of future refills
+            return -self._tokens / self.rate
+
+    def acquire(self):
+        delay = self.reserve()
+        if delay:
+            time.sleep(delay)
+        return delay
+
+
+class EtherscanClient:
+    """
+    Shared Etherscan API client.
+
+    Requests go through one pooled HTTP session and a token bucket sized to the
+    API key tier (`rate_limit` calls per second). Rate-limited responses are
+    retried with exponential backoff, and identical requests that are already
+    in flight are merged into one call.
+    """
+
+    def __init__(self, base_url, api_key=None, rate_limit=5, max_retries=4, backoff=0.5, timeout=10, pool_maxsize=10):
+        self.base_url = base_url
+        self._api_key = api_key
+        self.max_retries = max_retries
+        self.backoff = backoff
+        self.timeout = timeout
+        self.bucket = TokenBucket(rate_limit)
+        self.session = requests.Session()
+        adapter = HTTPAdapter(pool_connections=1, pool_maxsize=pool_maxsize)
+        self.session.mount("https://", adapter)
+        self.session.mount("http://", adapter)
+        self._lock = threading.Lock()
+        self._inflight = {}  # sorted params -> Future
+        self._async_inflight = {}  # sorted params -> asyncio.Task, used on the event loop only
+        self._metrics = {"requests": 0, "coalesced": 0, "rate_limited": 0, "throttled_seconds": 0.0}
+
+    @property
+    def api_key(self):
+        # Read at request time when not given, so a key loaded from .env after import is used
+        return self._api_key or os.getenv("ETHERSCAN_API_KEY")
+
+    def _params(self, params):
+        return {**params, "apikey": self.api_key}
+
+    def _backoff_delay(self, attempt):
+        return self.backoff * (2 ** attempt) * (1 + random.random() / 2)
+
+    def _record(self, throttled=0.0, rate_limited=False):
+        with self._lock:
+            self._metrics["requests"] += 1
+            self._metrics["throttled_seconds"] += throttled
+            if rate_limited:
+                self._metrics["rate_limited"] += 1
+
+    def _send(self, params):
+        for attempt in range(self.max_retries + 1):
+            throttled = self.bucket.acquire()
+            response = self.session.get(self.base_url, params=self._params(params), timeout=self.timeout)
+            data = response.json() if response.status_code != 429 else {"status": "0", "result": "rate limit"}
+            limited = is_rate_limited(data)
+            self._record(throttled, limited)
+            if not limited:
+                return data
+            if attempt < self.max_retries:
+                time.sleep(self._backoff_delay(attempt))
+        raise EtherscanRateLimitError(f"Etherscan rate limit reached for {params.get('action')}")
+
+    def request(self, **params):
+        """Sends a request and returns the decoded JSON response."""
+        key = tuple(sorted(params.items()))
+        with self._lock:
+            waiting = key in self._inflight
+            if waiting:
+                self._metrics["coalesced"] += 1
+                future = self._inflight[key]
+            else:
+                future = self._inflight[key] = Future()
+        if waiting:
+            return future.result()
+
+        try:
+            data = self._send(params)
+        except Exception as e:
+            future.set_exception(e)
+            raise
+        else:
+            future.set_result(data)
+            return data
+        finally:
+            with self._lock:
+                self._inflight.pop(key, None)
+
+    async def _send_async(self, http_client, params):
+        for attempt in range(self.max_retries + 1):
+            throttled = self.bucket.reserve()
+            if throttled:
+                await asyncio.sleep(throttled)
+            response = await http_client.get(self.base_url, params=self._params(params), timeout=self.timeout)
+            data = response.json() if response.status_code != 429 else {"status": "0", "result": "rate limit"}
+            limited = is_rate_limited(data)
+            self._record(throttled, limited)
+            if not limited:
+                return data
+            if attempt < self.max_retries:
+                await asyncio.sleep(self._backoff_delay(attempt))
+        raise EtherscanRateLimitError(f"Etherscan rate limit reached for {params.get('action')}")
+
+    async def request_async(self, http_client, **params):
+        """Async `request` through an httpx.AsyncClient, sharing the same rate limit."""
+        key = tuple(sorted(params.items()))
+        task = self._async_inflight.get(key)
+        if task is not None:
+            with self._lock:
+                self._metrics["coalesced"] += 1
+            return await asyncio.shield(task)
+        task = asyncio.ensure_future(self._send_async(http_client, params))
+        self._async_inflight[key] = task
+        task.add_done_callback(lambda _: self._async_inflight.pop(key, None))
+        return await asyncio.shield(task)
+
+    def get_abi(self, address):
+        return parse_abi_response(self.request(module="contract", action="getabi", address=address))
+
+    def get_source_code(self, address):
+        return parse_source_code_response(self.request(module="contract", action="getsourcecode", address=address))
+
+    def get_contract(self, address):
+        """Returns {"abi", "source_code"} of a contract from a single getsourcecode call."""
+        return parse_contract_response(self.request(module="contract", action="getsourcecode", address=address))
+
+    async def get_contract_async(self, http_client, address):
+        data = await self.request_async(http_client, module="contract", action="getsourcecode", address=address)
+        return parse_contract_response(data)
+
+    def metrics(self):
+        with self._lock:
+            return {**self._metrics, "throttled_seconds": round(self._metrics["throttled_seconds"], 3)}
+
+
+etherscan_client = EtherscanClient(
+    ETHERSCAN_BASE_URL,
+    rate_limit=float(os.getenv("ETHERSCAN_RATE_LIMIT", 5)),
+    pool_maxsize=int(os.getenv("ETHERSCAN_MAX_CONNECTIONS", 10)),
+)
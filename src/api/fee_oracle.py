@@ -0,0 +1,108 @@
+import os
+import threading
+import time
+
+from hexbytes import HexBytes
+from web3 import Web3
+
+# Gas limit used when eth_estimateGas fails (e.g. the call reverts during simulation)
+DEFAULT_GAS_LIMIT = 2000000
+
+
+class FeeOracle:
+    """
+    Caches fee data per block and memoizes gas estimates.
+
+    `fee_params` returns EIP-1559 fee fields (`maxFeePerGas`, `maxPriorityFeePerGas`)
+    when the chain reports a base fee, and a legacy `gasPrice` otherwise. Fees are
+    reused for `ttl` seconds, and the priority fee is only re-fetched when a new
+    block has been produced.
+
+    `estimate_gas` runs eth_estimateGas once per (provider, contract, function
+    selector) and pads the result by `gas_margin`.
+    """
+
+    def __init__(self, ttl=3, gas_margin=1.2, max_estimates=1024):
+        self.ttl = ttl
+        self.gas_margin = gas_margin
+        self.max_estimates = max_estimates
+        self._lock = threading.Lock()
+        self._fees = {}  # provider -> (fetched_at, block_number, fee params)
+        self._estimates = {}  # (provider, address, selector) -> padded gas limit
+
+    def fee_params(self, w3):
+        key = str(w3.provider)
+        with self._lock:
+            cached = self._fees.get(key)
+        if cached and time.monotonic() - cached[0] < self.ttl:
+            return dict(cached[2])
+
+        block = w3.eth.get_block("latest")
+        if cached and cached[1] == block["number"]:
+            params = cached[2]
+        else:
+            base_fee = block.get("baseFeePerGas")
+            if base_fee is None:
+                params = {"gasPrice": w3.eth.gas_price}
+            else:
+                priority_fee = w3.eth.max_priority_fee
+                params = {
+                    # Leaves room for the base fee to double before the transaction is priced out
+                    "maxFeePerGas": 2 * base_fee + priority_fee,
+                    "maxPriorityFeePerGas": priority_fee,
+                }
+
+        with self._lock:
+            self._fees[key] = (time.monotonic(), block["number"], params)
+        return dict(params)
+
+    def estimate_gas(self, w3, contract_call, txn):
+        """
+        Estimates the gas limit for a contract function call or constructor.
+
+        Parameters:
+            w3 (Web3): Web3 instance connected to the blockchain.
+            contract_call: A bound ContractFunction or ContractConstructor.
+            txn (dict): Transaction fields used for the estimate (`from`, `value`).
+
+        Returns:
+            int: The padded gas limit, or DEFAULT_GAS_LIMIT if estimation fails.
+        """
+        key = self._estimate_key(w3, contract_call)
+        with self._lock:
+            if key in self._estimates:
+                return self._estimates[key]
+
+        try:
+            estimate = contract_call.estimate_gas({k: v for k, v in txn.items() if k in ("from", "value")})
+        except Exception as e:
+            print(f"Gas estimation failed, using default gas limit: {e}")
+            return DEFAULT_GAS_LIMIT
+
+        gas = int(estimate * self.gas_margin)
+        with self._lock:
+            if len(self._estimates) >= self.max_estimates:
+                self._estimates.pop(next(iter(self._estimates)))
+            self._estimates[key] = gas
+        return gas
+
+    @staticmethod
+    def _estimate_key(w3, contract_call):
+        # The same address can hold a different contract on another chain
+        provider = str(w3.provider)
+        address = getattr(contract_call, "address", None)
+        if address is None:
+            # Contract deployment, keyed on the bytecode being deployed
+            return (provider, "constructor", Web3.keccak(HexBytes(contract_call.bytecode)).hex())
+        return (provider, address, contract_call.selector)
+
+    def clear(self):
+        with self._lock:
+            self._fees.clear()
+            self._estimates.clear()
+
+
+fee_oracle = FeeOracle(
+    ttl=float(os.getenv("FEE_CACHE_TTL", 3)),
+    gas_margin=float(os.getenv("GAS_ESTIMATE_MARGIN", 1.2)),
+)
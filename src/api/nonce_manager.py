@@ -0,0 +1,95 @@
+import threading
+
+# Node error messages that mean our local nonce is out of sync with the chain
+NONCE_ERROR_MESSAGES = (
+    "nonce too low",
+    "nonce too high",
+    "invalid transaction nonce",
+    "already known",
+    "replacement transaction underpriced",
+)
+
+
+def is_nonce_error(error):
+    message = str(error).lower()
+    return any(fragment in message for fragment in NONCE_ERROR_MESSAGES)
+
+
+class NonceManager:
+    """
+    Hands out transaction nonces per chain and account from memory.
+
+    The pending transaction count is fetched from the node once per
+    (chain ID, account), after that nonces are allocated atomically without a
+    round trip. Callers must `rewind` the nonces of transactions that were
+    never sent, and `resync` when the node rejected a nonce, so a failed or
+    replaced transaction does not leave a gap or a duplicate.
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._account_locks = {}
+        self._next_nonce = {}
+        self._chain_ids = {}  # provider -> chain ID
+
+    def _key(self, w3, address):
+        # The same account has an independent nonce on every chain
+        provider = str(w3.provider)
+        with self._lock:
+            chain_id = self._chain_ids.get(provider)
+        if chain_id is None:
+            chain_id = w3.eth.chain_id
+            with self._lock:
+                self._chain_ids[provider] = chain_id
+        return (chain_id, address)
+
+    def _account_lock(self, key):
+        with self._lock:
+            if key not in self._account_locks:
+                self._account_locks[key] = threading.Lock()
+            return self._account_locks[key]
+
+    def allocate(self, w3, address, count=1):
+        """
+        Reserves `count` consecutive nonces for `address` on the chain of `w3`.
+
+        Returns:
+            int: The first reserved nonce.
+        """
+        key = self._key(w3, address)
+        with self._account_lock(key):
+            nonce = self._next_nonce.get(key)
+            if nonce is None:
+                nonce = w3.eth.get_transaction_count(address, "pending")
+            self._next_nonce[key] = nonce + count
+            return nonce
+
+    def resync(self, w3, address):
+        """Reloads the next nonce of `address` from the node's pending count."""
+        key = self._key(w3, address)
+        with self._account_lock(key):
+            self._next_nonce[key] = w3.eth.get_transaction_count(address, "pending")
+
+    def rewind(self, w3, address, nonce):
+        """
+        Hands out `nonce` again next, after the transactions reserved from it were not sent.
+
+        Unlike `resync` this does not ask the node, so transactions that were
+        sent but are not pending yet cannot be given out twice.
+        """
+        key = self._key(w3, address)
+        with self._account_lock(key):
+            if self._next_nonce.get(key, nonce) > nonce:
+                self._next_nonce[key] = nonce
+
+    def reset(self, address=None):
+        """Forgets cached nonces (of `address` on every chain) so the next allocation fetches from the node."""
+        with self._lock:
+            if address is None:
+                self._next_nonce.clear()
+            else:
+                for key in [key for key in self._next_nonce if key[1] == address]:
+                    del self._next_nonce[key]
+
+
+nonce_manager = NonceManager()
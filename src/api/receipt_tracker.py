@@ -0,0 +1,202 @@
+import asyncio
+import threading
+import time
+import weakref
+from concurrent.futures import Future, ThreadPoolExecutor, TimeoutError as FutureTimeoutError
+
+from hexbytes import HexBytes
+from web3.exceptions import TimeExhausted, TransactionNotFound, Web3TypeError
+
+
+class ReceiptTracker:
+    """
+    Resolves transaction receipts for every tool sending through one Web3 instance.
+
+    A single background thread polls the block number every `poll_interval`
+    seconds. Each new block is fetched once, and the receipts of the pending
+    transactions it contains are requested together in one JSON-RPC batch, so
+    the number of requests grows with blocks rather than with waiters.
+    Transactions are also checked directly once when first tracked, in case
+    they were mined before. The thread exits when nothing is pending.
+    """
+
+    def __init__(self, w3, poll_interval=1.0, max_block_gap=50, max_workers=8):
+        self._w3 = weakref.ref(w3)
+        self.poll_interval = poll_interval
+        # After a longer stall, pending receipts are requested directly instead of scanning every block
+        self.max_block_gap = max_block_gap
+        self.max_workers = max_workers
+        self._lock = threading.Lock()
+        self._pending = {}  # txn hash -> (Future, deadline)
+        self._unchecked = set()
+        self._thread = None
+        self._last_block = None
+        self._metrics = {"tracked": 0, "mined": 0, "timed_out": 0, "blocks": 0, "receipt_requests": 0}
+
+    def track(self, txn_hash, callback=None, timeout=300):
+        """
+        Starts tracking a transaction.
+
+        Parameters:
+            txn_hash: The transaction hash, as bytes or a hex string.
+            callback (callable, optional): Called with the receipt once the transaction is mined.
+            timeout (float): Seconds before the future fails with TimeExhausted.
+
+        Returns:
+            Future: Resolves to the receipt. Tracking the same hash again returns the same future.
+        """
+        txn_hash = HexBytes(txn_hash)
+        with self._lock:
+            if txn_hash in self._pending:
+                future = self._pending[txn_hash][0]
+            else:
+                future = Future()
+                self._pending[txn_hash] = (future, time.monotonic() + timeout)
+                self._unchecked.add(txn_hash)
+                self._metrics["tracked"] += 1
+            if self._thread is None:
+                self._thread = threading.Thread(target=self._run, name="receipt-tracker", daemon=True)
+                self._thread.start()
+        if callback is not None:
+            def on_done(done):
+                if done.exception() is None:
+                    callback(done.result())
+            future.add_done_callback(on_done)
+        return future
+
+    def wait(self, txn_hashes, timeout=120):
+        """
+        Waits until every transaction in `txn_hashes` is mined.
+
+        Returns:
+            list: The receipts, in the same order as `txn_hashes`.
+        """
+        deadline = time.monotonic() + timeout
+        futures = [self.track(txn_hash, timeout=timeout) for txn_hash in txn_hashes]
+        try:
+            # A hash tracked earlier keeps its own, possibly longer, timeout
+            return [future.result(timeout=max(0, deadline - time.monotonic())) for future in futures]
+        except FutureTimeoutError:
+            raise TimeExhausted(f"Transactions not mined after {timeout} seconds")
+
+    async def wait_async(self, txn_hash, timeout=120):
+        """Awaitable version of `wait` for a single transaction."""
+        return await asyncio.wrap_future(self.track(txn_hash, timeout=timeout))
+
+    def _run(self):
+        while True:
+            w3 = self._w3()
+            with self._lock:
+                if w3 is None or not self._pending:
+                    pending = list(self._pending.values())
+                    self._pending.clear()
+                    self._thread = None
+                    break
+            try:
+                self._poll(w3)
+            except Exception as e:
+                print(f"Receipt tracker poll failed: {e}")
+            self._expire()
+            del w3
+            time.sleep(self.poll_interval)
+        for future, _ in pending:
+            future.set_exception(RuntimeError("The Web3 connection was closed before the transaction was mined"))
+
+    def _poll(self, w3):
+        with self._lock:
+            unchecked, self._unchecked = self._unchecked, set()
+        if unchecked:
+            self._resolve(self._fetch_receipts(w3, unchecked, missing_ok=True))
+
+        block_number = w3.eth.block_number
+        if self._last_block is None or block_number - self._last_block > self.max_block_gap:
+            if self._last_block is not None:
+                with self._lock:
+                    pending = list(self._pending)
+                self._resolve(self._fetch_receipts(w3, pending, missing_ok=True))
+            self._last_block = block_number
+            return
+
+        for number in range(self._last_block + 1, block_number + 1):
+            block = w3.eth.get_block(number)
+            with self._lock:
+                self._metrics["blocks"] += 1
+                mined = [HexBytes(txn_hash) for txn_hash in block["transactions"] if HexBytes(txn_hash) in self._pending]
+            if mined:
+                self._resolve(self._fetch_receipts(w3, mined))
+            self._last_block = number
+
+    def _fetch_receipts(self, w3, txn_hashes, missing_ok=False):
+        txn_hashes = list(txn_hashes)
+        with self._lock:
+            self._metrics["receipt_requests"] += 1
+        if not missing_ok:
+            # Hashes taken from a block are mined, so the batch cannot fail on a missing receipt
+            try:
+                batch = w3.batch_requests()
+            except Web3TypeError:
+                # The provider does not support JSON-RPC batches
+                batch = None
+            if batch is not None:
+                with batch:
+                    for txn_hash in txn_hashes:
+                        batch.add(w3.eth.get_transaction_receipt(txn_hash))
+                    return dict(zip(txn_hashes, batch.execute()))
+
+        def fetch(txn_hash):
+            try:
+                return w3.eth.get_transaction_receipt(txn_hash)
+            except TransactionNotFound:
+                return None
+
+        with ThreadPoolExecutor(max_workers=max(1, min(self.max_workers, len(txn_hashes)))) as executor:
+            return dict(zip(txn_hashes, executor.map(fetch, txn_hashes)))
+
+    def _resolve(self, receipts):
+        resolved = []
+        with self._lock:
+            for txn_hash, receipt in receipts.items():
+                if receipt is not None and txn_hash in self._pending:
+                    resolved.append((self._pending.pop(txn_hash)[0], receipt))
+            self._metrics["mined"] += len(resolved)
+        # Outside the lock, callbacks may track more transactions
+        for future, receipt in resolved:
+            future.set_result(receipt)
+
+    def _expire(self):
+        now = time.monotonic()
+        with self._lock:
+            expired = [(txn_hash, future) for txn_hash, (future, deadline) in self._pending.items() if deadline < now]
+            for txn_hash, _ in expired:
+                del self._pending[txn_hash]
+            self._metrics["timed_out"] += len(expired)
+        for txn_hash, future in expired:
+            future.set_exception(TimeExhausted(f"Transaction {txn_hash.to_0x_hex()} was not mined in time"))
+
+    def metrics(self):
+        with self._lock:
+            return {**self._metrics, "pending": len(self._pending), "last_block": self._last_block}
+
+
+_trackers = weakref.WeakKeyDictionary()
+_trackers_lock = threading.Lock()
+
+
+def get_receipt_tracker(w3):
+    """Returns the receipt tracker shared by everything sending through `w3`."""
+    with _trackers_lock:
+        tracker = _trackers.get(w3)
+        if tracker is None:
+            tracker = _trackers[w3] = ReceiptTracker(w3)
+        return tracker
+
+
+def receipt_tracker_metrics():
+    with _trackers_lock:
+        trackers = list(_trackers.values())
+    totals = {}
+    for tracker in trackers:
+        for key, value in tracker.metrics().items():
+            if key != "last_block":
+                totals[key] = totals.get(key, 0) + value
+    return {**totals, "trackers": len(trackers)}
@@ -0,0 +1,228 @@
+import atexit
+import os
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from contextlib import nullcontext
+
+from web3 import Web3
+
+from api.agents.tools import batch_read, build_contract_transaction
+from api.chain_backend import AnvilForkBackend, chain_state_lock, get_chain_backend
+from api.contract_registry import contract_registry
+from api.nonce_manager import nonce_manager
+
+
+def snapshot(w3):
+    """Takes an EVM snapshot (supported by anvil and eth-tester) and returns its id."""
+    return w3.provider.make_request("evm_snapshot", [])["result"]
+
+
+def revert(w3, snapshot_id):
+    # The snapshot is consumed by the revert, take a new one to revert again
+    response = w3.provider.make_request("evm_revert", [snapshot_id])
+    if "error" in response or response.get("result") is False:
+        raise RuntimeError(f"Could not revert to snapshot {snapshot_id}: {response.get('error')}")
+
+
+def normalize_step(step, contract_address, abi):
+    """
+    Returns a step as a dict with contract_address, abi, function_name, function_args and value.
+
+    Steps are either `orchestrate_exploit` tuples, (function_name, args) or
+    (function_name, args, value) called on the attempt's contract, or dicts with
+    the same keys, where contract_address and abi default to the attempt's.
+    """
+    if isinstance(step, dict):
+        return {
+            "contract_address": step.get("contract_address") or contract_address,
+            "abi": step.get("abi") or abi,
+            "function_name": step["function_name"],
+            "function_args": list(step.get("function_args", [])),
+            "value": int(step.get("value", 0)),
+        }
+    function_name, args, *value = step
+    return {
+        "contract_address": contract_address,
+        "abi": abi,
+        "function_name": function_name,
+        "function_args": list(args),
+        "value": int(value[0]) if value else 0,
+    }
+
+
+def run_steps(w3, private_key, steps, timeout=30):
+    """
+    Sends the steps of one attempt in order, stopping at the first failed step.
+
+    Nonces come straight from the node instead of the shared nonce manager,
+    since reverting a snapshot rewinds them.
+
+    Returns:
+        list: One {"function_name", "txn_hash", "status", "gas_used", "error"} dict per step sent.
+    """
+    account = w3.eth.account.from_key(private_key)
+    chain_id = w3.eth.chain_id
+    results = []
+    for step in steps:
+        result = {"function_name": step["function_name"], "txn_hash": None, "status": 0, "gas_used": 0, "error": None}
+        results.append(result)
+        try:
+            function = contract_registry.function(w3, step["contract_address"], step["abi"], step["function_name"])
+            nonce = w3.eth.get_transaction_count(account.address, "pending")
+            txn = build_contract_transaction(
+                w3, function(*step["function_args"]), account.address, nonce, value=step["value"], chain_id=chain_id
+            )
+            signed_txn = w3.eth.account.sign_transaction(txn, private_key)
+            txn_hash = w3.eth.send_raw_transaction(signed_txn.raw_transaction)
+            receipt = w3.eth.wait_for_transaction_receipt(txn_hash, timeout=timeout)
+            result.update(txn_hash=txn_hash.hex(), status=receipt.status, gas_used=receipt.gasUsed)
+        except Exception as e:
+            result["error"] = str(e)
+        if not result["status"]:
+            break
+    return results
+
+
+class ExploitSandbox:
+    """
+    Runs exploit attempts against the same prepared chain state.
+
+    Each attempt starts from an `evm_snapshot` of the state at the time of the
+    run and is reverted afterwards, so a failed or state-changing attempt does
+    not affect the next one.
+
+    With the anvil backend, attempts never touch the node other audits send
+    to: `workers` dedicated anvil nodes are started on the ports from
+    `base_port`, loaded with the primary node's state
+    (`anvil_dumpState`/`anvil_loadState`) and the attempts are spread over them
+    in parallel. Worker nodes are kept between runs. The in-process eth-tester
+    chain cannot be forked, so attempts run on it while holding
+    chain_state_lock, which keeps other audits from sending until the last
+    revert.
+    """
+
+    def __init__(self, backend=None, workers=1, base_port=None, timeout=30):
+        self._backend = backend
+        self.workers = max(1, workers)
+        self.base_port = base_port
+        self.timeout = timeout
+        self._lock = threading.Lock()
+        # Runs share the worker nodes, so they take turns
+        self._run_lock = threading.Lock()
+        self._worker_backends = []
+        self._metrics = {"runs": 0, "attempts": 0, "successful_attempts": 0}
+
+    @property
+    def backend(self):
+        return self._backend if self._backend is not None else get_chain_backend()
+
+    def _nodes(self, count):
+        """Returns the nodes to run attempts on, and whether that is the node the tools send to."""
+        backend = self.backend
+        if backend.name == "remote":
+            raise RuntimeError("The exploit sandbox needs a local chain backend, set CHAIN_BACKEND to anvil or eth-tester")
+        primary = backend.web3()
+        if not isinstance(backend, AnvilForkBackend):
+            return [primary], True
+
+        base_port = self.base_port or backend.port + 1
+        with self._lock:
+            while len(self._worker_backends) < count:
+                self._worker_backends.append(AnvilForkBackend(
+                    fork_url=backend.fork_url,
+                    fork_block=backend.fork_block,
+                    port=base_port + len(self._worker_backends),
+                    chain_id=backend.chain_id,
+                    anvil_bin=backend.anvil_bin,
+                ))
+            workers = self._worker_backends[:count]
+
+        # Copy the prepared state (deployed contracts, balances) to each worker
+        state = primary.provider.make_request("anvil_dumpState", [])["result"]
+        nodes = []
+        for worker in workers:
+            w3 = worker.web3()
+            w3.provider.make_request("anvil_loadState", [state])
+            nodes.append(w3)
+        return nodes, False
+
+    def _run_on_node(self, w3, private_key, attempts, watch, shared=False):
+        sender = w3.eth.account.from_key(private_key).address
+        results = []
+        for index, steps in attempts:
+            snapshot_id = snapshot(w3)
+            try:
+                before = batch_read(w3, balances=watch)["balances"]
+                step_results = run_steps(w3, private_key, steps, timeout=self.timeout)
+                after = batch_read(w3, balances=watch)["balances"]
+            finally:
+                revert(w3, snapshot_id)
+                if shared:
+                    # The revert rewound the sender's nonce on the node the tools send to
+                    nonce_manager.reset(sender)
+            results.append({
+                "attempt": index,
+                "success": bool(step_results) and all(step["status"] for step in step_results),
+                "steps": step_results,
+                # None when either balance could not be read
+                "balance_deltas": {
+                    address: None if before[address] is None or after[address] is None else after[address] - before[address]
+                    for address in watch
+                },
+            })
+        return results
+
+    def run(self, private_key, contract_address, abi, attempts, watch=None):
+        """
+        Runs each attempt from the same starting state and reports its effect.
+
+        Parameters:
+            private_key (str): Private key of the account sending the steps.
+            contract_address (str): Contract the steps call unless a step names another.
+            abi (list): ABI of `contract_address`.
+            attempts (list): Step lists, see normalize_step.
+            watch (list, optional): Addresses whose balances are compared, defaults
+                to the sender, the contract and every other contract the steps call.
+
+        Returns:
+            list: Per attempt, in order, {"attempt", "success", "steps", "balance_deltas"}
+                with balance deltas in wei.
+        """
+        attempts = [[normalize_step(step, contract_address, abi) for step in steps] for steps in attempts]
+        if watch is None:
+            watch = [Web3().eth.account.from_key(private_key).address, contract_address]
+            watch += [step["contract_address"] for steps in attempts for step in steps]
+        watch = list(dict.fromkeys(Web3.to_checksum_address(address) for address in watch))
+
+        with self._run_lock:
+            nodes, shared = self._nodes(max(1, min(self.workers, len(attempts))))
+            # Deal attempts round-robin, each node runs its share one after another
+            shares = [list(enumerate(attempts))[offset::len(nodes)] for offset in range(len(nodes))]
+            with chain_state_lock if shared else nullcontext():
+                if len(nodes) == 1:
+                    results = self._run_on_node(nodes[0], private_key, shares[0], watch, shared=shared)
+                else:
+                    with ThreadPoolExecutor(max_workers=len(nodes)) as executor:
+                        futures = [executor.submit(self._run_on_node, w3, private_key, share, watch) for w3, share in zip(nodes, shares)]
+                        results = [result for future in futures for result in future.result()]
+        results.sort(key=lambda result: result["attempt"])
+
+        with self._lock:
+            self._metrics["runs"] += 1
+            self._metrics["attempts"] += len(results)
+            self._metrics["successful_attempts"] += sum(result["success"] for result in results)
+        return results
+
+    def stop(self):
+        with self._lock:
+            for worker in self._worker_backends:
+                worker.stop()
+            self._worker_backends = []
+
+    def metrics(self):
+        with self._lock:
+            return {**self._metrics, "workers": self.workers, "running_workers": len(self._worker_backends)}
+
+
+exploit_sandbox = ExploitSandbox(workers=int(os.getenv("SANDBOX_WORKERS", 1)))
+atexit.register(exploit_sandbox.stop)
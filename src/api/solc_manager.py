@@ -0,0 +1,311 @@
+import os
+import re
+import threading
+from concurrent.futures import ProcessPoolExecutor
+import multiprocessing
+
+import solcx
+from solcx import compile_standard
+from solcx.install import get_executable
+
+from api.compile_cache import artifact_cache
+
+DEFAULT_SOLC_VERSION = "0.8.0"
+SOLC_SETTINGS = {
+    "outputSelection": {
+        "*": {
+            "*": ["abi", "evm.bytecode"]
+        }
+    }
+}
+
+PRAGMA_PATTERN = re.compile(r"pragma\s+solidity\s+([^;]+);")
+# String literals are matched first so a "//" or "/*" inside one does not start a comment
+COMMENT_PATTERN = re.compile(r"(\"(?:\\.|[^\"\\\n])*\"|'(?:\\.|[^'\\\n])*')|//[^\n]*|/\*.*?\*/", re.DOTALL)
+COMPARATOR_PATTERN = re.compile(r"(\^|~|>=|<=|>|<|=)?\s*v?(\d+)(?:\.(\d+|x|\*))?(?:\.(\d+|x|\*))?")
+
+
+def parse_version(version):
+    return tuple(int(part) for part in str(version).split("+")[0].split(".")[:3])
+
+
+def _comparator_bounds(operator, parts):
+    """Turns one comparator into a list of (operator, version) checks."""
+    # Missing or wildcard parts, e.g. "0.8" or "0.8.x"
+    known = [int(p) for p in parts if p is not None and p not in ("x", "*")]
+    padded = tuple(known + [0] * (3 - len(known)))
+
+    if operator in (">=", "<=", ">", "<"):
+        return [(operator, padded)]
+    if operator == "^":
+        major, minor, patch = padded
+        if major > 0 or len(known) == 1:
+            upper = (major + 1, 0, 0)
+        elif minor > 0 or len(known) == 2:
+            upper = (0, minor + 1, 0)
+        else:
+            upper = (0, 0, patch + 1)
+        return [(">=", padded), ("<", upper)]
+    if operator == "~" or len(known) < 3:
+        if len(known) == 1:
+            upper = (padded[0] + 1, 0, 0)
+        else:
+            upper = (padded[0], padded[1] + 1, 0)
+        return [(">=", padded), ("<", upper)]
+    return [("==", padded)]
+
+
+def parse_pragma_ranges(pragma):
+    """
+    Parses the version expression of a `pragma solidity` line.
+
+    Returns:
+        list: One list of (operator, version) checks per `||` alternative.
+    """
+    ranges = []
+    for alternative in pragma.split("||"):
+        # Hyphen ranges: "0.5.0 - 0.7.6"
+        if " - " in alternative:
+            low, high = alternative.split(" - ", 1)
+            alternative = f">={low.strip()} <={high.strip()}"
+        checks = []
+        for operator, major, minor, patch in COMPARATOR_PATTERN.findall(alternative):
+            checks.extend(_comparator_bounds(operator, [major, minor or None, patch or None]))
+        if checks:
+            ranges.append(checks)
+    return ranges
+
+
+def version_matches(version, ranges):
+    version = parse_version(version)
+    checks_by_operator = {
+        ">=": lambda a, b: a >= b,
+        "<=": lambda a, b: a <= b,
+        ">": lambda a, b: a > b,
+        "<": lambda a, b: a < b,
+        "==": lambda a, b: a == b,
+    }
+    return any(
+        all(checks_by_operator[operator](version, bound) for operator, bound in checks)
+        for checks in ranges
+    )
+
+
+def strip_comments(source_code):
+    return COMMENT_PATTERN.sub(lambda match: match.group(1) or " ", source_code)
+
+
+def source_pragmas(source_code):
+    # Commented-out pragmas, e.g. left over from an older compiler version, do not count
+    return PRAGMA_PATTERN.findall(strip_comments(source_code))
+
+
+def _compile_standard_job(input_data, solc_binary):
+    # Runs in a worker process
+    return compile_standard(input_data, solc_binary=solc_binary)
+
+
+def _worker_ready():
+    return os.getpid()
+
+
+class SolcManager:
+    """
+    Picks, installs and runs solc versions based on each source's pragma.
+
+    The newest installed version that satisfies every `pragma solidity` line in
+    the source is used. Versions can be pre-installed at startup from
+    SOLC_BINARY_DIR with `warm_up`, and `compile_many` compiles several sources
+    in parallel, batching all sources that share a version into one solc
+    standard-JSON invocation.
+    """
+
+    def __init__(self, binary_path=None, default_version=DEFAULT_SOLC_VERSION, max_workers=None):
+        self.binary_path = binary_path
+        self.default_version = default_version
+        self.max_workers = max_workers or os.cpu_count() or 2
+        self._lock = threading.Lock()
+        self._installed = None
+        self._installable = None
+        self._executor = None
+
+    def installed_versions(self):
+        with self._lock:
+            if self._installed is None:
+                self._installed = sorted(
+                    (str(v) for v in solcx.get_installed_solc_versions(solcx_binary_path=self.binary_path)),
+                    key=parse_version,
+                )
+            return list(self._installed)
+
+    def installable_versions(self):
+        # Asks the solc release list online, so only once per process
+        with self._lock:
+            if self._installable is None:
+                self._installable = [str(v) for v in solcx.get_installable_solc_versions()]
+            return list(self._installable)
+
+    def ensure(self, version):
+        """Installs `version` unless it is already installed (checked once per process)."""
+        version = str(version)
+        if version in self.installed_versions():
+            return version
+        with self._lock:
+            if self._installed is not None and version in self._installed:
+                return version
+            solcx.install_solc(version, solcx_binary_path=self.binary_path)
+            self._installed = None
+        return version
+
+    def select_version(self, source_code):
+        """
+        Picks the solc version for `source_code` without installing it.
+
+        Installed versions are preferred, so the release list is only fetched
+        when none of them satisfies the pragmas.
+        """
+        ranges = [parse_pragma_ranges(pragma) for pragma in source_pragmas(source_code)]
+        ranges = [r for r in ranges if r]
+        if not ranges:
+            return self.default_version
+
+        def satisfies(version):
+            return all(version_matches(version, r) for r in ranges)
+
+        installed = [v for v in self.installed_versions() if satisfies(v)]
+        if installed:
+            return installed[-1]
+
+        installable = [v for v in self.installable_versions() if satisfies(v)]
+        if not installable:
+            raise ValueError(f"No solc version satisfies: {'; '.join(source_pragmas(source_code))}")
+        return max(installable, key=parse_version)
+
+    def warm_up(self, versions=()):
+        """Pre-installs `versions` and starts the compiler worker processes."""
+        for version in versions:
+            try:
+                self.ensure(version)
+            except Exception as e:
+                print(f"Failed to install solc {version}: {e}")
+        # Pool workers start on demand, one no-op task each starts them all now
+        executor = self._get_executor()
+        for future in [executor.submit(_worker_ready) for _ in range(self.max_workers)]:
+            future.result()
+
+    def _get_executor(self):
+        with self._lock:
+            if self._executor is None:
+                # Spawned workers do not inherit the app's threads and locks. They
+                # re-import the main module, which only creates lazy clients at import.
+                self._executor = ProcessPoolExecutor(
+                    max_workers=self.max_workers,
+                    mp_context=multiprocessing.get_context("spawn"),
+                )
+            return self._executor
+
+    def _solc_binary(self, version):
+        return get_executable(version, solcx_binary_path=self.binary_path)
+
+    @staticmethod
+    def _standard_input(sources):
+        return {
+            "language": "Solidity",
+            "sources": {name: {"content": source_code} for name, source_code in sources.items()},
+            "settings": SOLC_SETTINGS,
+        }
+
+    @staticmethod
+    def _artifacts(compiled_sol, source_name):
+        return {
+            name: {
+                "bytecode": output['evm']['bytecode']['object'],
+                "abi": output['abi']
+            }
+            for name, output in compiled_sol['contracts'][source_name].items()
+        }
+
+    def compile(self, source_code):
+        """
+        Compiles one source and returns {contract_name: {"bytecode", "abi"}}.
+
+        Artifacts come from the artifact cache when possible, the compiler is
+        only installed on a cache miss.
+        """
+        version = self.select_version(source_code)
+        cache_key = artifact_cache.key(source_code, version, SOLC_SETTINGS)
+        contracts = artifact_cache.get(cache_key)
+        if contracts is None:
+            self.ensure(version)
+            compiled_sol = compile_standard(
+                self._standard_input({"Contract.sol": source_code}),
+                solc_binary=self._solc_binary(version),
+            )
+            contracts = self._artifacts(compiled_sol, "Contract.sol")
+            artifact_cache.put(cache_key, contracts)
+        return contracts
+
+    def compile_many(self, source_codes):
+        """
+        Compiles several sources in parallel.
+
+        Returns:
+            list: One {contract_name: artifact} dict per source, or the exception
+            raised while compiling that source.
+        """
+        results = [None] * len(source_codes)
+        batches = {}  # version -> [(index, cache key)]
+        for index, source_code in enumerate(source_codes):
+            try:
+                version = self.select_version(source_code)
+            except Exception as e:
+                results[index] = e
+                continue
+            cache_key = artifact_cache.key(source_code, version, SOLC_SETTINGS)
+            contracts = artifact_cache.get(cache_key)
+            if contracts is not None:
+                results[index] = contracts
+            else:
+                batches.setdefault(version, []).append((index, cache_key))
+
+        executor = self._get_executor()
+        futures = {}
+        for version, entries in batches.items():
+            self.ensure(version)
+            sources = {f"Contract_{index}.sol": source_codes[index] for index, _ in entries}
+            future = executor.submit(_compile_standard_job, self._standard_input(sources), str(self._solc_binary(version)))
+            futures[version] = (future, entries)
+
+        for version, (future, entries) in futures.items():
+            try:
+                compiled_sol = future.result()
+            except Exception:
+                # One bad source fails the whole batch, so compile the batch one by one
+                for index, _ in entries:
+                    try:
+                        results[index] = self.compile(source_codes[index])
+                    except Exception as e:
+                        results[index] = e
+                continue
+            for index, cache_key in entries:
+                contracts = self._artifacts(compiled_sol, f"Contract_{index}.sol")
+                artifact_cache.put(cache_key, contracts)
+                results[index] = contracts
+        return results
+
+    def shutdown(self):
+        with self._lock:
+            if self._executor is not None:
+                self._executor.shutdown(wait=False)
+                self._executor = None
+
+
+solc_manager = SolcManager(
+    binary_path=os.getenv("SOLC_BINARY_DIR"),
+    max_workers=int(os.getenv("SOLC_WORKERS", 0)) or None,
+)
+
+
+def get_preinstall_versions():
+    versions = os.getenv("SOLC_PREINSTALL_VERSIONS", DEFAULT_SOLC_VERSION)
+    return [version.strip() for version in versions.split(",") if version.strip()]
@@ -1,11 +1,196 @@
+import os
+import threading
+import time
+
+import requests
+from requests.adapters import HTTPAdapter
 from web3 import Web3
 
+DEFAULT_RPC_URL = 'https://eth-sepolia.g.alchemy.com/v2/9yYPvzqaFmhxrKk7MhgRxNr4jRpt8KnO'
+
+
+def get_rpc_endpoints():
+    # Comma separated list of RPC endpoints, tried in order on failover
+    urls = os.getenv("WEB3_RPC_URLS", DEFAULT_RPC_URL)
+    return [url.strip() for url in urls.split(",") if url.strip()]
+
+
+class PooledHTTPProvider(Web3.HTTPProvider):
+    """HTTPProvider that reports transport errors to its pool, so the next get() fails over."""
+
+    def __init__(self, endpoint, on_transport_error, **kwargs):
+        super().__init__(endpoint, **kwargs)
+        self._on_transport_error = on_transport_error
+
+    def make_request(self, method, params):
+        try:
+            return super().make_request(method, params)
+        except (requests.ConnectionError, requests.Timeout):
+            self._on_transport_error(self.endpoint_uri)
+            raise
+
+    def make_batch_request(self, batch_requests):
+        try:
+            return super().make_batch_request(batch_requests)
+        except (requests.ConnectionError, requests.Timeout):
+            self._on_transport_error(self.endpoint_uri)
+            raise
+
+
+class Web3ConnectionPool:
+    """
+    Process-wide pool of Web3 connections shared by all tools.
+
+    Each RPC endpoint gets one Web3 instance backed by a keep-alive HTTP session,
+    so tool calls reuse open connections instead of doing a new handshake. Health
+    is checked lazily: only when the last successful check is older than
+    `health_check_interval` seconds. A failed check, or a connection or timeout
+    error during any request, fails over to the next endpoint.
+
+    Health checks and connects run outside the pool lock, one at a time per
+    endpoint, so a dead endpoint only delays the threads that need it checked.
+    """
+
+    def __init__(self, endpoints, health_check_interval=30, pool_maxsize=32, request_timeout=30):
+        if not endpoints:
+            raise ValueError("At least one RPC endpoint is required")
+        self.endpoints = list(endpoints)
+        self.health_check_interval = health_check_interval
+        self.pool_maxsize = pool_maxsize
+        self.request_timeout = request_timeout
+        self._lock = threading.Lock()
+        self._endpoint_locks = {endpoint: threading.Lock() for endpoint in self.endpoints}
+        self._current = 0
+        self._connections = {}  # endpoint -> Web3
+        self._last_checked = {}  # endpoint -> monotonic time of last successful health check
+        self._metrics = {"hits": 0, "misses": 0, "reconnects": 0, "failovers": 0, "health_checks": 0, "transport_errors": 0}
+
+    def _create_session(self):
+        session = requests.Session()
+        adapter = HTTPAdapter(pool_connections=1, pool_maxsize=self.pool_maxsize)
+        session.mount("https://", adapter)
+        session.mount("http://", adapter)
+        return session
+
+    def _connect(self, endpoint):
+        provider = PooledHTTPProvider(
+            endpoint,
+            self.mark_failed,
+            request_kwargs={"timeout": self.request_timeout},
+            session=self._create_session(),
+        )
+        return Web3(provider)
+
+    def _fresh(self, endpoint):
+        # Called with self._lock held
+        last_checked = self._last_checked.get(endpoint)
+        return last_checked is not None and time.monotonic() - last_checked < self.health_check_interval
+
+    def _check(self, w3):
+        with self._lock:
+            self._metrics["health_checks"] += 1
+        try:
+            return w3.is_connected()
+        except Exception:
+            return False
+
+    def _get_endpoint(self, index):
+        """Returns a healthy connection to one endpoint, or None."""
+        endpoint = self.endpoints[index]
+        with self._lock:
+            w3 = self._connections.get(endpoint)
+            if w3 is not None and self._fresh(endpoint):
+                self._metrics["hits"] += 1
+                self._select(index)
+                return w3
+
+        with self._endpoint_locks[endpoint]:
+            with self._lock:
+                # Another thread may have checked or replaced it while we waited
+                w3 = self._connections.get(endpoint)
+                if w3 is not None and self._fresh(endpoint):
+                    self._metrics["hits"] += 1
+                    self._select(index)
+                    return w3
+
+            if w3 is not None and self._check(w3):
+                with self._lock:
+                    self._last_checked[endpoint] = time.monotonic()
+                    self._metrics["hits"] += 1
+                    self._select(index)
+                return w3
+
+            with self._lock:
+                if w3 is not None:
+                    # Stale connection, drop it and build a fresh one below
+                    self._drop(endpoint)
+                    self._metrics["reconnects"] += 1
+                else:
+                    self._metrics["misses"] += 1
+            w3 = self._connect(endpoint)
+            if not self._check(w3):
+                return None
+            with self._lock:
+                self._connections[endpoint] = w3
+                self._last_checked[endpoint] = time.monotonic()
+                self._select(index)
+            print(f"Connected to RPC endpoint #{index}")
+            return w3
+
+    def get(self):
+        """Returns a healthy Web3 instance, failing over between endpoints if needed."""
+        with self._lock:
+            current = self._current
+        for offset in range(len(self.endpoints)):
+            w3 = self._get_endpoint((current + offset) % len(self.endpoints))
+            if w3 is not None:
+                return w3
+        raise ConnectionError("Failed to connect to any RPC endpoint")
+
+    def mark_failed(self, endpoint):
+        """Drops the connection to `endpoint` after a transport error so the next get() fails over."""
+        with self._lock:
+            self._metrics["transport_errors"] += 1
+            self._drop(endpoint)
+            if self.endpoints[self._current] == endpoint:
+                self._current = (self._current + 1) % len(self.endpoints)
+
+    def _select(self, index):
+        if index != self._current:
+            self._metrics["failovers"] += 1
+            self._current = index
+
+    def _drop(self, endpoint):
+        self._connections.pop(endpoint, None)
+        self._last_checked.pop(endpoint, None)
+
+    def metrics(self):
+        with self._lock:
+            return {
+                **self._metrics,
+                "endpoints": len(self.endpoints),
+                "active_endpoint": self._current,
+                "open_connections": len(self._connections),
+            }
+
+
+_pool = None
+_pool_lock = threading.Lock()
+
+
+def get_web3_pool():
+    global _pool
+    if _pool is None:
+        with _pool_lock:
+            if _pool is None:
+                _pool = Web3ConnectionPool(
+                    get_rpc_endpoints(),
+                    health_check_interval=float(os.getenv("WEB3_HEALTH_CHECK_INTERVAL", 30)),
+                )
+    return _pool
+
+
 def get_web3_connection():
-    alchemy_url = 'https://eth-sepolia.g.alchemy.com/v2/9yYPvzqaFmhxrKk7MhgRxNr4jRpt8KnO'
-    w3 = Web3(Web3.HTTPProvider(alchemy_url))
-    
-    if w3.is_connected():  # Corrected the attribute name here
-        print("Connected to Sepolia Testnet")
-        return w3
-    else:
-        raise ConnectionError("Failed to connect to Sepolia Testnet")
+    """Returns a connection to the active chain backend, the pool above unless CHAIN_BACKEND is set."""
+    from api.chain_backend import get_chain_backend
+    return get_chain_backend().web3()
@@ -1,21 +1,37 @@
-from flask import Flask, request, jsonify
+from dotenv import load_dotenv
+
+load_dotenv()  # Load environment variables from .env file, before the modules below read them
+
+from flask import Flask, Response, request, jsonify, stream_with_context
 from flask_cors import CORS
 from pymongo import MongoClient
 from datetime import datetime
-import requests
-import os
-from dotenv import load_dotenv
 import os
-import json
-from bson import ObjectId  # Import ObjectId
-from api.constants import ETHERSCAN_BASE_URL
-from schema import get_all_reports
-from api.agents.mas import create_graph, run, run_mas_workflow
-from threading import Thread
-
-load_dotenv()  # Load environment variables from .env file
+from bson import ObjectId
+from bson.errors import InvalidId
+from itertools import chain
+from schema import append_report_results, find_reports, get_all_reports, get_report as find_report, get_reports_page, render_report
+from api.agents.tools import get_abi_from_etherscan, get_source_code_from_etherscan
+from api.etherscan import EtherscanRateLimitError
+from scheduler import QueueFullError
+from schema import find_events_since, get_contract_job, get_job
+from event_bus import event_bus
+from json_provider import MongoJSONProvider
+from services import (
+    CONTRACT_SUMMARY_PROJECTION,
+    SSE_HEARTBEAT_INTERVAL,
+    audit_scheduler,
+    collect_metrics,
+    job_finished,
+    parse_addresses,
+    parse_chunk_range,
+    parse_reports_limit,
+    start_background_services,
+)
 
 app = Flask(__name__)
+# Encodes ObjectId and datetime values directly, with orjson when installed
+app.json = MongoJSONProvider(app)
 # Enable CORS
 CORS(app)
 
@@ -24,25 +40,11 @@ MONGO_URI = os.getenv("MONGO_URI")
 client = MongoClient(MONGO_URI)
 db = client.mydatabase
 
-# Etherscan API details
-ETHERSCAN_API_KEY = os.getenv("ETHERSCAN_API_KEY")
-
-# Helper function to convert ObjectId to string
-def convert_objectid(data):
-    if isinstance(data, list):
-        return [convert_objectid(item) for item in data]
-    if isinstance(data, dict):
-        return {key: convert_objectid(value) for key, value in data.items()}
-    if isinstance(data, ObjectId):
-        return str(data)
-    return data
-
 # Route 1: GET /contracts/recent
 @app.route('/contracts/recent', methods=['GET'])
 def get_recent_contracts():
     # Retrieve the 5 most recent smart contracts
-    recent_contracts = list(db.smart_contract.find().sort("created_at", -1).limit(5))
-    recent_contracts = convert_objectid(recent_contracts)  # Convert ObjectIds to strings
+    recent_contracts = list(db.smart_contract.find({}, CONTRACT_SUMMARY_PROJECTION).sort("created_at", -1).limit(5))
     return jsonify(recent_contracts), 200
 
 # Route 2: GET /contracts/<cid>
@@ -51,12 +53,9 @@ def get_contract_by_id(cid):
     # Find the contract by contract_id
     contract = db.smart_contract.find_one({"contract_id": cid})
     if contract:
-        contract = convert_objectid(contract)  # Convert ObjectIds to strings
         # Fetch related events and reports for the contract
-        events = list(db.events.find({"smart_contract_id": cid}))
-        reports = list(db.report.find({"contract_id": cid}))
-        events = convert_objectid(events)
-        reports = convert_objectid(reports)
+        events = list(db.events.find({"smart_contract_id": cid}).sort("created_at", 1))
+        reports = [render_report(report) for report in db.report.find({"contract_id": cid})]
         return jsonify({
             "contract_info": contract,
             "events": events,
@@ -76,28 +75,32 @@ def create_contract():
     if not name or not address:
         return jsonify({"error": "Name and address are required"}), 400
 
-    # Fetch the contract ABI from Etherscan
-    abi_response = requests.get(f"{ETHERSCAN_BASE_URL}?module=contract&action=getabi&address={address}&apikey={ETHERSCAN_API_KEY}")
-    abi_data = abi_response.json()
+    # Reject early instead of fetching from Etherscan for an audit that cannot be queued
+    if audit_scheduler.is_full():
+        return jsonify({"error": "Too many audits queued, try again later"}), 429
 
-    if abi_data.get("status") != "1":
-        return jsonify({"error": "Unable to fetch ABI"}), 400
-
-    # Parse the ABI JSON string into a Python list
+    tenant = request.headers.get("X-Tenant-ID", "default")
     try:
-        abi_parsed = json.loads(abi_data.get("result"))
-    except json.JSONDecodeError:
-        return jsonify({"error": "Failed to parse ABI"}), 400
+        priority = int(data.get("priority", 0))
+    except (TypeError, ValueError):
+        return jsonify({"error": "Priority must be an integer"}), 400
 
-    # Fetch the contract source code from Etherscan
-    sourcecode_response = requests.get(f"{ETHERSCAN_BASE_URL}?module=contract&action=getsourcecode&address={address}&apikey={ETHERSCAN_API_KEY}")
-    sourcecode_data = sourcecode_response.json()
+    # Fetch the contract ABI, cached so the agents' tools reuse it during the audit
+    try:
+        abi_parsed = get_abi_from_etherscan(address)
+    except EtherscanRateLimitError:
+        return jsonify({"error": "Etherscan rate limit reached, try again later"}), 503
+    except Exception:
+        return jsonify({"error": "Unable to fetch ABI"}), 400
 
-    if sourcecode_data.get("status") != "1":
+    # Fetch the contract source code, usually cached by the ABI lookup's getsourcecode call
+    try:
+        source_code_result = get_source_code_from_etherscan(address)
+    except EtherscanRateLimitError:
+        return jsonify({"error": "Etherscan rate limit reached, try again later"}), 503
+    except Exception:
         return jsonify({"error": "Unable to fetch source code"}), 400
 
-    source_code_result = sourcecode_data.get("result", [{}])[0].get("SourceCode", "")
-
     # Insert contract details into the smart_contract collection
     contract_id = f"contract_{int(datetime.timestamp(datetime.now()))}"
     right_now = datetime.now()
@@ -116,42 +119,123 @@ def create_contract():
         "contract_id": contract_id,
         "contract_name": name,
         "created_at": right_now,
-        "results": "Analysis in progress..."
+        "results_chunks": []  # Appended to as the analysis runs
     }
     db.report.insert_one(new_report)
 
-    # Start the MAS workflow in a background thread
-    Thread(target=run_mas_workflow, args=(contract_id, address)).start()
+    # Queue the MAS workflow for the audit workers
+    try:
+        job = audit_scheduler.submit(contract_id, address, tenant=tenant, priority=priority)
+    except QueueFullError as e:
+        append_report_results(contract_id, [str(e)])
+        return jsonify({"error": str(e)}), 429
 
-    # Convert ObjectIds to strings before returning
-    new_contract = convert_objectid(new_contract)
-    
     return jsonify({
         "message": "Contract created and analysis started",
-        "contract": new_contract
+        "contract": new_contract,
+        "job": {"job_id": job["job_id"], "status": job["status"]}
+    }), 201
+
+# Route 3b: POST /contracts/batch
+# Audits several addresses as one job, sharing the Etherscan lookups and compiled sources
+@app.route('/contracts/batch', methods=['POST'])
+def create_contract_batch():
+    data = request.json
+    name = data.get("name")
+    if not name:
+        return jsonify({"error": "Name is required"}), 400
+    try:
+        addresses = parse_addresses(data.get("addresses"))
+    except ValueError as e:
+        return jsonify({"error": str(e)}), 400
+
+    tenant = request.headers.get("X-Tenant-ID", "default")
+    try:
+        priority = int(data.get("priority", 0))
+    except (TypeError, ValueError):
+        return jsonify({"error": "Priority must be an integer"}), 400
+
+    contract_id = f"contract_{int(datetime.timestamp(datetime.now()))}"
+    right_now = datetime.now()
+    # ABIs and source code are fetched by the audit job, for all addresses at once
+    new_contract = {
+        "contract_id": contract_id,
+        "name": name,
+        "addresses": addresses,
+        "created_at": right_now
+    }
+    db.smart_contract.insert_one(new_contract)
+    db.report.insert_one({
+        "contract_id": contract_id,
+        "contract_name": name,
+        "created_at": right_now,
+        "results_chunks": []
+    })
+
+    try:
+        job = audit_scheduler.submit(contract_id, addresses[0], tenant=tenant, priority=priority, addresses=addresses)
+    except QueueFullError as e:
+        append_report_results(contract_id, [str(e)])
+        return jsonify({"error": str(e)}), 429
+
+    return jsonify({
+        "message": "Contracts created and analysis started",
+        "contract": new_contract,
+        "job": {"job_id": job["job_id"], "status": job["status"]}
     }), 201
 
 # Route 4: GET /reports
+# ?limit=&cursor= returns one page and the next cursor, ?summary=1 leaves out the results
 @app.route('/reports', methods=['GET'])
 def get_reports():
+    summary = request.args.get("summary") in ("1", "true")
     try:
-        # Fetch all reports from the database
-        all_reports = get_all_reports()
-        return jsonify(all_reports), 200
+        if "limit" not in request.args and "cursor" not in request.args:
+            # Fetch all reports from the database
+            all_reports = get_all_reports(summary=summary)
+            return jsonify(all_reports), 200
+
+        try:
+            limit = parse_reports_limit(request.args)
+            page, next_cursor = get_reports_page(limit, cursor=request.args.get("cursor"), summary=summary)
+        except ValueError as e:
+            return jsonify({"error": str(e)}), 400
+        return jsonify({"reports": page, "next_cursor": next_cursor}), 200
     except Exception as e:
         return jsonify({"error": str(e)}), 500
 
+# Route 4b: GET /reports/stream
+# Newline-delimited JSON, one report per line, written as documents come off the cursor
+@app.route('/reports/stream', methods=['GET'])
+def stream_reports():
+    summary = request.args.get("summary") in ("1", "true")
+    try:
+        reports_cursor = find_reports(cursor=request.args.get("cursor"), summary=summary)
+    except ValueError as e:
+        return jsonify({"error": str(e)}), 400
+
+    def generate():
+        for report in reports_cursor.batch_size(100):
+            report = render_report(report)
+            yield app.json.dumps(report) + "\n"
+
+    return Response(stream_with_context(generate()), mimetype="application/x-ndjson")
+
 
 @app.route('/report/<contract_id>', methods=['GET'])
 def get_report(contract_id):
-    print(contract_id)
-    report = db.report.find_one({"contract_id": contract_id})
+    # ?chunks=start:end returns only those result chunks
+    chunk_range = None
+    if request.args.get("chunks"):
+        try:
+            chunk_range = parse_chunk_range(request.args["chunks"])
+        except ValueError as e:
+            return jsonify({"error": str(e)}), 400
+
+    report = find_report(contract_id, chunk_range=chunk_range)
     if not report:
         return jsonify({"error": "Report not found"}), 404
     
-    # Convert ObjectIds in the report to strings
-    report = convert_objectid(report)
-    
     # Return the report data if found
     return jsonify(report), 200
     
@@ -166,21 +250,10 @@ def append_results(contract_id):
         if not new_results:
             return jsonify({"error": "No results provided"}), 400
 
-        # Find the report by contract_id
-        report = db.report.find_one({"contract_id": contract_id})
-
-        if not report:
+        # Push the new chunk server-side, concurrent appends cannot overwrite each other
+        if not append_report_results(contract_id, ["\n" + new_results]):
             return jsonify({"error": "Report not found"}), 404
 
-        # Append new results to the existing results
-        updated_results = (report.get("results", "") + "\n" + new_results).strip()
-
-        # Update the report's results field
-        db.report.update_one(
-            {"contract_id": contract_id},
-            {"$set": {"results": updated_results}}
-        )
-
         return jsonify({"message": "Results updated successfully"}), 200
 
     except Exception as e:
@@ -191,14 +264,106 @@ def append_results(contract_id):
 def get_contract_events(contract_id):
     try:
         # Fetch events related to the specific contract_id
-        events = list(db.events.find({"smart_contract_id": contract_id}))
+        events = list(db.events.find({"smart_contract_id": contract_id}).sort("created_at", 1))
         if not events:
             return jsonify({"error": "No events found for the contract"}), 404
-        # Convert ObjectIds to strings
-        events = convert_objectid(events)
         return jsonify({"events": events}), 200
     except Exception as e:
         return jsonify({"error": str(e)}), 500
 
+def audit_finished(contract_id):
+    return job_finished(get_contract_job(contract_id))
+
+def format_sse(event):
+    return f"id: {event['_id']}\nevent: event\ndata: {app.json.dumps(event)}\n\n"
+
+# GET /contracts/<contract_id>/stream
+@app.route('/contracts/<contract_id>/stream', methods=['GET'])
+def stream_contract_events(contract_id):
+    """
+    Server-Sent Events stream of an audit's events.
+
+    Replays the events after `?since=<event id>` (or the Last-Event-ID header sent
+    by a reconnecting EventSource), then pushes new events as the audit emits them.
+    Ends with a `done` event once the audit has finished.
+
+    Live events come from the event bus of this process. The stream also reads
+    new events from Mongo on every heartbeat, so it keeps up with audits run by
+    another worker process.
+    """
+    since = request.args.get("since") or request.headers.get("Last-Event-ID")
+    try:
+        since = ObjectId(since) if since else None
+    except InvalidId:
+        return jsonify({"error": "Invalid since cursor"}), 400
+
+    # Subscribe before replaying so no event falls between the replay and the live feed
+    subscription, history, closed = event_bus.subscribe(contract_id)
+
+    def generate():
+        last_id = since
+
+        def unseen(events):
+            nonlocal last_id
+            for event in events:
+                if last_id is not None and event["_id"] <= last_id:
+                    continue
+                last_id = event["_id"]
+                yield format_sse(event)
+
+        try:
+            yield "retry: 3000\n\n"
+            # Events already in Mongo, then the ones the event sink has not written yet
+            yield from unseen(chain(find_events_since(contract_id, since), history))
+
+            finished = closed or audit_finished(contract_id)
+            while not finished:
+                message = subscription.get(timeout=SSE_HEARTBEAT_INTERVAL)
+                if subscription.overflowed:
+                    # Messages were dropped, the client reconnects and resumes from Mongo
+                    return
+                if message is event_bus.DONE:
+                    break
+                if message is None:
+                    yield ": keep-alive\n\n"
+                    # Events written by an audit running in another process
+                    yield from unseen(find_events_since(contract_id, last_id))
+                    finished = audit_finished(contract_id)
+                    continue
+                yield from unseen([message])
+            yield "event: done\ndata: {}\n\n"
+        finally:
+            subscription.close()
+
+    return Response(
+        stream_with_context(generate()),
+        mimetype="text/event-stream",
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"},
+    )
+
+# Route 6: GET /jobs/<job_id>
+@app.route('/jobs/<job_id>', methods=['GET'])
+def get_audit_job(job_id):
+    job = get_job(job_id)
+    if not job:
+        return jsonify({"error": "Job not found"}), 404
+    return jsonify(job), 200
+
+# Route 7: POST /jobs/<job_id>/cancel
+@app.route('/jobs/<job_id>/cancel', methods=['POST'])
+def cancel_audit_job(job_id):
+    status = audit_scheduler.cancel(job_id)
+    if status is None:
+        return jsonify({"error": "Job not found or already finished"}), 404
+    return jsonify({"job_id": job_id, "status": status}), 200
+
+# Route 8: GET /metrics
+@app.route('/metrics', methods=['GET'])
+def get_metrics():
+    return jsonify(collect_metrics()), 200
+
 if __name__ == '__main__':
-    app.run(debug=True, port=5000)
\ No newline at end of file
+    # With the debug reloader only the child process serves requests and runs audits
+    if os.environ.get("WERKZEUG_RUN_MAIN") == "true":
+        start_background_services()
+    app.run(debug=True, port=5000)
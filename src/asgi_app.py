@@ -0,0 +1,431 @@
+# Async serving mode for the API, with the same routes and response shapes as app.py.
+#
+# Route handlers are coroutines: Mongo is queried with PyMongo's async client and
+# Etherscan through a pooled httpx.AsyncClient, so waiting on I/O does not hold a
+# worker thread. Audits still run on the audit scheduler's worker threads.
+#
+#     cd src && hypercorn asgi_app:app --bind 0.0.0.0:5000
+#
+# Requires the `asgi` optional dependencies (quart, quart-cors, hypercorn, httpx).
+from dotenv import load_dotenv
+
+load_dotenv()  # Load environment variables from .env file, before the modules below read them
+
+import asyncio
+import os
+from datetime import datetime
+
+import httpx
+from bson import ObjectId
+from bson.errors import InvalidId
+from pymongo import AsyncMongoClient
+from quart import Quart, Response, jsonify, request
+from quart_cors import cors
+
+from api.constants import CHAIN_ID
+from api.agents.tools import abi_cache, source_code_cache
+from api.etherscan import EtherscanRateLimitError, etherscan_client
+from event_bus import event_bus
+from json_provider import MongoJSONProvider
+from services import (
+    CONTRACT_SUMMARY_PROJECTION,
+    SSE_HEARTBEAT_INTERVAL,
+    audit_scheduler,
+    collect_metrics,
+    job_finished,
+    parse_addresses,
+    parse_chunk_range,
+    parse_reports_limit,
+    start_background_services,
+)
+from scheduler import QueueFullError
+from schema import (
+    REPORT_SUMMARY_PROJECTION,
+    encode_report_cursor,
+    find_reports,
+    render_report,
+    report_projection,
+    uploaded_contract_query,
+)
+
+app = cors(Quart(__name__))
+app.json = MongoJSONProvider(app)
+# Event streams stay open for the length of an audit
+app.config["RESPONSE_TIMEOUT"] = None
+
+MONGO_URI = os.getenv("MONGO_URI")
+client = AsyncMongoClient(MONGO_URI)
+db = client.mydatabase
+
+ETHERSCAN_MAX_CONNECTIONS = int(os.getenv("ETHERSCAN_MAX_CONNECTIONS", 10))
+http_client = None
+
+
+@app.before_serving
+async def startup():
+    global http_client
+    http_client = httpx.AsyncClient(
+        timeout=float(os.getenv("ETHERSCAN_TIMEOUT", 10)),
+        limits=httpx.Limits(max_connections=ETHERSCAN_MAX_CONNECTIONS, max_keepalive_connections=ETHERSCAN_MAX_CONNECTIONS),
+    )
+    await asyncio.to_thread(start_background_services)
+
+
+@app.after_serving
+async def shutdown():
+    await http_client.aclose()
+    await client.close()
+
+
+async def load_contract_data(address):
+    """
+    Async counterpart of the ABI and source code cache lookups used by app.py.
+
+    Checks the in-process caches, then the contracts already saved in Mongo, then
+    Etherscan (one getsourcecode call returns both), and stores the result in the
+    caches for the agents' tools.
+
+    Returns:
+        tuple: (abi, source_code), the ABI is None when the contract is not verified.
+    """
+    abi = abi_cache.peek(CHAIN_ID, address)
+    source_code = source_code_cache.peek(CHAIN_ID, address)
+    if abi is not None and source_code is not None:
+        return abi, source_code
+    contract = await db.smart_contract.find_one(uploaded_contract_query(address), {"abi": 1, "source_code": 1})
+    if not (contract and "abi" in contract and "source_code" in contract):
+        contract = await etherscan_client.get_contract_async(http_client, address)
+    abi, source_code = contract["abi"], contract["source_code"]
+    if abi is not None:
+        abi_cache.put(CHAIN_ID, address, abi)
+    source_code_cache.put(CHAIN_ID, address, source_code)
+    return abi, source_code
+
+
+# Route 1: GET /contracts/recent
+@app.route('/contracts/recent', methods=['GET'])
+async def get_recent_contracts():
+    cursor = db.smart_contract.find({}, CONTRACT_SUMMARY_PROJECTION).sort("created_at", -1).limit(5)
+    return jsonify(await cursor.to_list()), 200
+
+# Route 2: GET /contracts/<cid>
+@app.route('/contracts/<cid>', methods=['GET'])
+async def get_contract_by_id(cid):
+    contract = await db.smart_contract.find_one({"contract_id": cid})
+    if contract:
+        events, reports = await asyncio.gather(
+            db.events.find({"smart_contract_id": cid}).sort("created_at", 1).to_list(),
+            db.report.find({"contract_id": cid}).to_list(),
+        )
+        return jsonify({
+            "contract_info": contract,
+            "events": events,
+            "reports": [render_report(report) for report in reports]
+        }), 200
+    else:
+        return jsonify({"error": "Contract not found"}), 404
+
+# Route 3: POST /contracts
+@app.route('/contracts', methods=['POST'])
+async def create_contract():
+    data = await request.get_json()
+    name = data.get("name")
+    address = data.get("address")
+
+    if not name or not address:
+        return jsonify({"error": "Name and address are required"}), 400
+
+    # Reject early instead of fetching from Etherscan for an audit that cannot be queued
+    if await asyncio.to_thread(audit_scheduler.is_full):
+        return jsonify({"error": "Too many audits queued, try again later"}), 429
+
+    tenant = request.headers.get("X-Tenant-ID", "default")
+    try:
+        priority = int(data.get("priority", 0))
+    except (TypeError, ValueError):
+        return jsonify({"error": "Priority must be an integer"}), 400
+
+    # The ABI and source code come from a single Etherscan call
+    try:
+        abi_parsed, source_code_result = await load_contract_data(address)
+    except EtherscanRateLimitError:
+        return jsonify({"error": "Etherscan rate limit reached, try again later"}), 503
+    except Exception:
+        return jsonify({"error": "Unable to fetch source code"}), 400
+    if abi_parsed is None:
+        return jsonify({"error": "Unable to fetch ABI"}), 400
+
+    contract_id = f"contract_{int(datetime.timestamp(datetime.now()))}"
+    right_now = datetime.now()
+    new_contract = {
+        "contract_id": contract_id,
+        "name": name,
+        "addr": address,
+        "abi": abi_parsed,
+        "source_code": source_code_result,
+        "created_at": right_now
+    }
+    new_report = {
+        "contract_id": contract_id,
+        "contract_name": name,
+        "created_at": right_now,
+        "results_chunks": []
+    }
+    await asyncio.gather(db.smart_contract.insert_one(new_contract), db.report.insert_one(new_report))
+
+    try:
+        job = await asyncio.to_thread(audit_scheduler.submit, contract_id, address, tenant=tenant, priority=priority)
+    except QueueFullError as e:
+        await db.report.update_one({"contract_id": contract_id}, {"$push": {"results_chunks": str(e)}})
+        return jsonify({"error": str(e)}), 429
+
+    return jsonify({
+        "message": "Contract created and analysis started",
+        "contract": new_contract,
+        "job": {"job_id": job["job_id"], "status": job["status"]}
+    }), 201
+
+# Route 3b: POST /contracts/batch
+@app.route('/contracts/batch', methods=['POST'])
+async def create_contract_batch():
+    data = await request.get_json()
+    name = data.get("name")
+    if not name:
+        return jsonify({"error": "Name is required"}), 400
+    try:
+        addresses = parse_addresses(data.get("addresses"))
+    except ValueError as e:
+        return jsonify({"error": str(e)}), 400
+
+    tenant = request.headers.get("X-Tenant-ID", "default")
+    try:
+        priority = int(data.get("priority", 0))
+    except (TypeError, ValueError):
+        return jsonify({"error": "Priority must be an integer"}), 400
+
+    contract_id = f"contract_{int(datetime.timestamp(datetime.now()))}"
+    right_now = datetime.now()
+    new_contract = {
+        "contract_id": contract_id,
+        "name": name,
+        "addresses": addresses,
+        "created_at": right_now
+    }
+    new_report = {
+        "contract_id": contract_id,
+        "contract_name": name,
+        "created_at": right_now,
+        "results_chunks": []
+    }
+    await asyncio.gather(db.smart_contract.insert_one(new_contract), db.report.insert_one(new_report))
+
+    try:
+        job = await asyncio.to_thread(
+            audit_scheduler.submit, contract_id, addresses[0], tenant=tenant, priority=priority, addresses=addresses,
+        )
+    except QueueFullError as e:
+        await db.report.update_one({"contract_id": contract_id}, {"$push": {"results_chunks": str(e)}})
+        return jsonify({"error": str(e)}), 429
+
+    return jsonify({
+        "message": "Contracts created and analysis started",
+        "contract": new_contract,
+        "job": {"job_id": job["job_id"], "status": job["status"]}
+    }), 201
+
+# Route 4: GET /reports
+@app.route('/reports', methods=['GET'])
+async def get_reports():
+    summary = request.args.get("summary") in ("1", "true")
+    try:
+        if "limit" not in request.args and "cursor" not in request.args:
+            all_reports = await db.report.find({}, REPORT_SUMMARY_PROJECTION if summary else None).to_list()
+            return jsonify([render_report(report) for report in all_reports]), 200
+
+        try:
+            limit = parse_reports_limit(request.args)
+            cursor = find_reports(cursor=request.args.get("cursor"), summary=summary, collection=db.report)
+        except ValueError as e:
+            return jsonify({"error": str(e)}), 400
+        # Read one extra document to know whether there is a next page
+        page = await cursor.limit(limit + 1).to_list()
+        next_cursor = encode_report_cursor(page[limit - 1]) if len(page) > limit else None
+        return jsonify({"reports": [render_report(report) for report in page[:limit]], "next_cursor": next_cursor}), 200
+    except Exception as e:
+        return jsonify({"error": str(e)}), 500
+
+# Route 4b: GET /reports/stream
+@app.route('/reports/stream', methods=['GET'])
+async def stream_reports():
+    summary = request.args.get("summary") in ("1", "true")
+    try:
+        reports_cursor = find_reports(cursor=request.args.get("cursor"), summary=summary, collection=db.report)
+    except ValueError as e:
+        return jsonify({"error": str(e)}), 400
+
+    async def generate():
+        async for report in reports_cursor.batch_size(100):
+            yield app.json.dumps(render_report(report)) + "\n"
+
+    return Response(generate(), mimetype="application/x-ndjson")
+
+@app.route('/report/<contract_id>', methods=['GET'])
+async def get_report(contract_id):
+    chunk_range = None
+    if request.args.get("chunks"):
+        try:
+            chunk_range = parse_chunk_range(request.args["chunks"])
+        except ValueError as e:
+            return jsonify({"error": str(e)}), 400
+
+    report = await db.report.find_one({"contract_id": contract_id}, report_projection(chunk_range))
+    if not report:
+        return jsonify({"error": "Report not found"}), 404
+    return jsonify(render_report(report, chunk_range=chunk_range)), 200
+
+@app.route('/reports/append/<contract_id>', methods=['POST'])
+async def append_results(contract_id):
+    try:
+        data = await request.get_json()
+        new_results = data.get("results", "")
+
+        if not new_results:
+            return jsonify({"error": "No results provided"}), 400
+
+        result = await db.report.update_one(
+            {"contract_id": contract_id},
+            {"$push": {"results_chunks": "\n" + new_results}}
+        )
+        if result.matched_count == 0:
+            return jsonify({"error": "Report not found"}), 404
+
+        return jsonify({"message": "Results updated successfully"}), 200
+
+    except Exception as e:
+        return jsonify({"error": str(e)}), 500
+
+# Route 5: GET /contracts/<contract_id>/events
+@app.route('/contracts/<contract_id>/events', methods=['GET'])
+async def get_contract_events(contract_id):
+    try:
+        events = await db.events.find({"smart_contract_id": contract_id}).sort("created_at", 1).to_list()
+        if not events:
+            return jsonify({"error": "No events found for the contract"}), 404
+        return jsonify({"events": events}), 200
+    except Exception as e:
+        return jsonify({"error": str(e)}), 500
+
+def format_sse(event):
+    return f"id: {event['_id']}\nevent: event\ndata: {app.json.dumps(event)}\n\n"
+
+async def events_since(contract_id, since):
+    query = {"smart_contract_id": contract_id}
+    if since is not None:
+        query["_id"] = {"$gt": since}
+    return await db.events.find(query).sort("_id", 1).to_list()
+
+async def audit_finished(contract_id):
+    return job_finished(await db.jobs.find_one({"contract_id": contract_id}, {"status": 1}, sort=[("created_at", -1), ("_id", -1)]))
+
+# GET /contracts/<contract_id>/stream
+@app.route('/contracts/<contract_id>/stream', methods=['GET'])
+async def stream_contract_events(contract_id):
+    """
+    Server-Sent Events stream of an audit's events, see app.py.
+
+    Live events come from the event bus of this process. The stream also reads
+    new events from Mongo on every heartbeat, so it keeps up with audits run by
+    another worker process.
+    """
+    since = request.args.get("since") or request.headers.get("Last-Event-ID")
+    try:
+        since = ObjectId(since) if since else None
+    except InvalidId:
+        return jsonify({"error": "Invalid since cursor"}), 400
+
+    loop = asyncio.get_running_loop()
+    wakeup = asyncio.Event()
+    def on_message():
+        # Runs on the audit's thread, which must not fail once the loop has closed
+        try:
+            loop.call_soon_threadsafe(wakeup.set)
+        except RuntimeError:
+            pass
+
+    subscription, history, closed = event_bus.subscribe(contract_id, on_message=on_message)
+
+    async def generate():
+        last_id = since
+
+        def unseen(events):
+            nonlocal last_id
+            for event in events:
+                if last_id is not None and event["_id"] <= last_id:
+                    continue
+                last_id = event["_id"]
+                yield format_sse(event)
+
+        try:
+            yield "retry: 3000\n\n"
+            for message in unseen(await events_since(contract_id, since) + history):
+                yield message
+
+            finished = closed or await audit_finished(contract_id)
+            while not finished:
+                message = subscription.get_nowait()
+                if subscription.overflowed:
+                    return
+                if message is event_bus.DONE:
+                    break
+                if message is not None:
+                    for sse in unseen([message]):
+                        yield sse
+                    continue
+                try:
+                    await asyncio.wait_for(wakeup.wait(), SSE_HEARTBEAT_INTERVAL)
+                except asyncio.TimeoutError:
+                    yield ": keep-alive\n\n"
+                    for sse in unseen(await events_since(contract_id, last_id)):
+                        yield sse
+                    finished = await audit_finished(contract_id)
+                wakeup.clear()
+            yield "event: done\ndata: {}\n\n"
+        finally:
+            subscription.close()
+
+    response = Response(generate(), mimetype="text/event-stream")
+    response.headers["Cache-Control"] = "no-cache"
+    response.headers["X-Accel-Buffering"] = "no"
+    response.timeout = None
+    return response
+
+# Route 6: GET /jobs/<job_id>
+@app.route('/jobs/<job_id>', methods=['GET'])
+async def get_audit_job(job_id):
+    job = await db.jobs.find_one({"job_id": job_id}, {"_id": 0})
+    if not job:
+        return jsonify({"error": "Job not found"}), 404
+    return jsonify(job), 200
+
+# Route 7: POST /jobs/<job_id>/cancel
+@app.route('/jobs/<job_id>/cancel', methods=['POST'])
+async def cancel_audit_job(job_id):
+    status = await asyncio.to_thread(audit_scheduler.cancel, job_id)
+    if status is None:
+        return jsonify({"error": "Job not found or already finished"}), 404
+    return jsonify({"job_id": job_id, "status": status}), 200
+
+# Route 8: GET /metrics
+@app.route('/metrics', methods=['GET'])
+async def get_metrics():
+    # Off the event loop, creating the chain backend or RPC pool blocks
+    return jsonify(await asyncio.to_thread(collect_metrics)), 200
+
+
+if __name__ == '__main__':
+    from hypercorn.asyncio import serve
+    from hypercorn.config import Config
+
+    config = Config()
+    config.bind = [os.getenv("ASGI_BIND", "127.0.0.1:5000")]
+    asyncio.run(serve(app, config))
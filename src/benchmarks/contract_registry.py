@@ -0,0 +1,107 @@
+# Compares preparing a contract call the way the tools did before the registry,
+# w3.eth.contract(...) and getattr(contract.functions, name) on every call,
+# with the shared ContractRegistry, and web3's calldata encoding with the
+# registry's precomputed encoders. No node is needed, nothing is sent.
+#
+#     python src/benchmarks/contract_registry.py [--abi-entries 100] [--calls 2000] [--repeat 5]
+import argparse
+import os
+import sys
+import time
+
+from web3 import Web3
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from api.contract_registry import ContractRegistry
+
+ADDRESS = "0x" + "ab" * 20
+RECIPIENT = Web3.to_checksum_address("0x" + "cd" * 20)
+
+
+def make_abi(entries):
+    abi = [
+        {
+            "type": "function",
+            "name": f"function{i}",
+            "stateMutability": "nonpayable",
+            "inputs": [
+                {"name": "to", "type": "address"},
+                {"name": "amount", "type": "uint256"},
+                {"name": "data", "type": "bytes"},
+            ],
+            "outputs": [{"name": "", "type": "bool"}],
+        }
+        for i in range(entries)
+    ]
+    abi.append({
+        "type": "event",
+        "name": "Transfer",
+        "anonymous": False,
+        "inputs": [
+            {"indexed": True, "name": "from", "type": "address"},
+            {"indexed": True, "name": "to", "type": "address"},
+            {"indexed": False, "name": "value", "type": "uint256"},
+        ],
+    })
+    return abi
+
+
+def time_it(run, calls, repeat):
+    best = None
+    for _ in range(repeat):
+        start = time.perf_counter()
+        for i in range(calls):
+            run(i)
+        elapsed = time.perf_counter() - start
+        best = elapsed if best is None else min(best, elapsed)
+    return best
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--abi-entries", type=int, default=100)
+    parser.add_argument("--calls", type=int, default=2000)
+    parser.add_argument("--repeat", type=int, default=5)
+    args = parser.parse_args()
+
+    w3 = Web3()
+    abi = make_abi(args.abi_entries)
+    registry = ContractRegistry()
+    call_args = [RECIPIENT, 10 ** 18, b"\x01\x02"]
+
+    def uncached_function(i):
+        contract = w3.eth.contract(address=Web3.to_checksum_address(ADDRESS), abi=abi)
+        return getattr(contract.functions, f"function{i % args.abi_entries}")
+
+    def registry_function(i):
+        return registry.function(w3, ADDRESS, abi, f"function{i % args.abi_entries}")
+
+    def web3_encode(i):
+        return registry_function(i)(*call_args)._encode_transaction_data()
+
+    def registry_encode(i):
+        return registry.get(w3, ADDRESS, abi).encode(f"function{i % args.abi_entries}", call_args)[0]
+
+    # Both encoders must produce the same calldata
+    for i in range(args.abi_entries):
+        assert web3_encode(i) == registry_encode(i), f"function{i} encodes differently"
+
+    print(f"{args.calls} calls on a contract with {args.abi_entries} functions, best of {args.repeat}")
+    paths = {
+        "w3.eth.contract + getattr": uncached_function,
+        "ContractRegistry.function": registry_function,
+        "web3 calldata encoding": web3_encode,
+        "ContractRegistry.encode": registry_encode,
+    }
+    baseline = None
+    for index, (name, run) in enumerate(paths.items()):
+        elapsed = time_it(run, args.calls, args.repeat)
+        # Compare each registry path with the web3 path before it
+        baseline = elapsed if index % 2 == 0 else baseline
+        print(f"{name:28} {elapsed * 1000:9.2f} ms  {elapsed / args.calls * 1e6:8.1f} us/call  {baseline / elapsed:6.1f}x")
+    print(f"registry: {registry.metrics()}")
+
+
+if __name__ == "__main__":
+    main()
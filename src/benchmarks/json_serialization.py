@@ -0,0 +1,117 @@
+# Compares JSON response encoding for large contract documents:
+#   - the previous path: convert_objectid copies the document, then jsonify
+#   - MongoJSONProvider with the standard json module
+#   - MongoJSONProvider with orjson (when installed)
+#
+#     python src/benchmarks/json_serialization.py [--contracts 20] [--abi-entries 400] [--repeat 20]
+import argparse
+import os
+import sys
+import time
+from datetime import datetime
+
+from bson import ObjectId
+from flask import Flask
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from json_provider import MongoJSONProvider, orjson
+
+
+def convert_objectid(data):
+    # The helper app.py used before MongoJSONProvider
+    if isinstance(data, list):
+        return [convert_objectid(item) for item in data]
+    if isinstance(data, dict):
+        return {key: convert_objectid(value) for key, value in data.items()}
+    if isinstance(data, ObjectId):
+        return str(data)
+    return data
+
+
+def make_abi(entries):
+    return [
+        {
+            "type": "function",
+            "name": f"function{i}",
+            "stateMutability": "nonpayable",
+            "inputs": [{"internalType": "uint256", "name": f"arg{j}", "type": "uint256"} for j in range(3)],
+            "outputs": [{"internalType": "bool", "name": "", "type": "bool"}],
+        }
+        for i in range(entries)
+    ]
+
+
+def make_contract_response(abi_entries, events):
+    contract_id = str(ObjectId())
+    return {
+        "contract_info": {
+            "_id": ObjectId(),
+            "contract_id": contract_id,
+            "name": "Benchmark",
+            "addr": "0x" + "ab" * 20,
+            "abi": make_abi(abi_entries),
+            "source_code": "// SPDX-License-Identifier: MIT\n" + "contract Benchmark { uint256 value; }\n" * 200,
+            "created_at": datetime.now(),
+        },
+        "events": [
+            {
+                "_id": ObjectId(),
+                "agent": "executor",
+                "smart_contract_id": contract_id,
+                "action": "Called function with arguments " * 20,
+                "created_at": datetime.now(),
+            }
+            for _ in range(events)
+        ],
+        "reports": [],
+    }
+
+
+def time_it(encode, documents, repeat):
+    best = None
+    size = 0
+    for _ in range(repeat):
+        start = time.perf_counter()
+        for document in documents:
+            size = len(encode(document))
+        elapsed = time.perf_counter() - start
+        best = elapsed if best is None else min(best, elapsed)
+    return best, size
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--contracts", type=int, default=20)
+    parser.add_argument("--abi-entries", type=int, default=400)
+    parser.add_argument("--events", type=int, default=100)
+    parser.add_argument("--repeat", type=int, default=20)
+    args = parser.parse_args()
+
+    documents = [make_contract_response(args.abi_entries, args.events) for _ in range(args.contracts)]
+
+    legacy_app = Flask("legacy")
+    std_app = Flask("std")
+    std_app.json = MongoJSONProvider(std_app, use_orjson=False)
+    paths = {
+        "convert_objectid + jsonify": (legacy_app, lambda document: legacy_app.json.response(convert_objectid(document)).get_data()),
+        "MongoJSONProvider (json)": (std_app, lambda document: std_app.json.response(document).get_data()),
+    }
+    if orjson is not None:
+        orjson_app = Flask("orjson")
+        orjson_app.json = MongoJSONProvider(orjson_app)
+        paths["MongoJSONProvider (orjson)"] = (orjson_app, lambda document: orjson_app.json.response(document).get_data())
+    else:
+        print("orjson is not installed, skipping the orjson provider")
+
+    print(f"{args.contracts} contracts, {args.abi_entries} ABI entries and {args.events} events each, best of {args.repeat}")
+    baseline = None
+    for name, (app, encode) in paths.items():
+        with app.app_context():
+            elapsed, size = time_it(encode, documents, args.repeat)
+        baseline = baseline or elapsed
+        print(f"{name:32} {elapsed * 1000:9.2f} ms  {size / 1024:8.1f} KiB/response  {baseline / elapsed:5.2f}x")
+
+
+if __name__ == "__main__":
+    main()
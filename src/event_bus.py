@@ -0,0 +1,130 @@
+import queue
+import threading
+import time
+from collections import deque
+
+
+class Subscription:
+    """A subscriber's queue on one channel, returned by `EventBus.subscribe`."""
+
+    def __init__(self, bus, channel, maxsize, on_message=None):
+        self.bus = bus
+        self.channel = channel
+        self.queue = queue.Queue(maxsize=maxsize)
+        # Called from the publishing thread after each delivery, e.g. to wake an event loop
+        self.on_message = on_message
+        # Set when the subscriber fell behind and messages were dropped
+        self.overflowed = False
+
+    def get(self, timeout=None):
+        """Returns the next message, or None if nothing arrived within `timeout` seconds."""
+        try:
+            return self.queue.get(timeout=timeout)
+        except queue.Empty:
+            return None
+
+    def get_nowait(self):
+        try:
+            return self.queue.get_nowait()
+        except queue.Empty:
+            return None
+
+    def close(self):
+        self.bus.unsubscribe(self)
+
+
+class EventBus:
+    """
+    In-process pub/sub for live audit events, one channel per contract_id.
+
+    Each open channel keeps its last `history_size` messages, so a subscriber
+    that joins mid-audit gets the events that are not in Mongo yet (the event
+    sink writes in batches). Closed channels are kept for `closed_ttl` seconds
+    so late subscribers still see that the audit finished.
+    """
+
+    DONE = object()
+
+    def __init__(self, history_size=1000, queue_size=1000, closed_ttl=60):
+        self.history_size = history_size
+        self.queue_size = queue_size
+        self.closed_ttl = closed_ttl
+        self._lock = threading.Lock()
+        self._channels = {}  # channel -> {"history", "subscribers", "closed_at"}
+
+    def _channel(self, channel):
+        state = self._channels.get(channel)
+        if state is None:
+            state = {"history": deque(maxlen=self.history_size), "subscribers": set(), "closed_at": None}
+            self._channels[channel] = state
+        return state
+
+    def _deliver(self, subscription, message):
+        try:
+            subscription.queue.put_nowait(message)
+        except queue.Full:
+            # A slow client must not block the audit, it resyncs from Mongo instead
+            subscription.overflowed = True
+        if subscription.on_message is not None:
+            subscription.on_message()
+
+    def publish(self, channel, message):
+        with self._lock:
+            state = self._channel(channel)
+            state["history"].append(message)
+            state["closed_at"] = None
+            for subscription in state["subscribers"]:
+                self._deliver(subscription, message)
+
+    def close_channel(self, channel):
+        """Marks the channel finished and wakes every subscriber with `DONE`."""
+        with self._lock:
+            state = self._channel(channel)
+            state["closed_at"] = time.monotonic()
+            for subscription in state["subscribers"]:
+                self._deliver(subscription, self.DONE)
+            self._expire()
+
+    def subscribe(self, channel, on_message=None):
+        """
+        Subscribes to a channel.
+
+        Returns:
+            tuple: (subscription, history, closed) where history holds the
+            messages published before subscribing and closed tells whether the
+            channel already finished.
+        """
+        with self._lock:
+            self._expire()
+            subscription = Subscription(self, channel, self.queue_size, on_message=on_message)
+            # Subscribers may join before the audit publishes anything
+            state = self._channel(channel)
+            state["subscribers"].add(subscription)
+            return subscription, list(state["history"]), state["closed_at"] is not None
+
+    def unsubscribe(self, subscription):
+        with self._lock:
+            state = self._channels.get(subscription.channel)
+            if state is not None:
+                state["subscribers"].discard(subscription)
+                if not state["subscribers"] and not state["history"] and state["closed_at"] is None:
+                    del self._channels[subscription.channel]
+
+    def _expire(self):
+        now = time.monotonic()
+        expired = [
+            channel for channel, state in self._channels.items()
+            if state["closed_at"] is not None and now - state["closed_at"] > self.closed_ttl and not state["subscribers"]
+        ]
+        for channel in expired:
+            del self._channels[channel]
+
+    def metrics(self):
+        with self._lock:
+            return {
+                "channels": len(self._channels),
+                "subscribers": sum(len(state["subscribers"]) for state in self._channels.values()),
+            }
+
+
+event_bus = EventBus()
@@ -0,0 +1,115 @@
+import os
+import threading
+from datetime import datetime
+
+from bson import ObjectId
+from pymongo.errors import BulkWriteError
+
+from event_bus import event_bus
+from schema import append_report_results, insert_events
+
+
+class EventSink:
+    """
+    Buffers an audit's events and writes them to Mongo from a background thread.
+
+    `emit` only appends to an in-memory buffer, so the agent loop never waits on
+    Mongo. The writer flushes with one insert_many once `flush_size` events are
+    buffered or `flush_interval` seconds have passed. Each flush also appends the
+    new report text to the report, so the report shows progress during the run.
+    Whatever a flush could not write is kept for the next one.
+
+    Events are also published on `event_bus` as they are emitted, for the live
+    stream. Their _id is set here so the stream and Mongo agree on it.
+    """
+
+    def __init__(self, contract_id, flush_size=20, flush_interval=1.0):
+        self.contract_id = contract_id
+        self.flush_size = flush_size
+        self.flush_interval = flush_interval
+        self._condition = threading.Condition()
+        self._events = []
+        self._pending_report_chunks = []
+        self._closed = False
+        self._writer = threading.Thread(target=self._run, name=f"event-sink-{contract_id}", daemon=True)
+        self._writer.start()
+
+    def emit(self, agent, action):
+        new_event = {
+            "_id": ObjectId(),
+            "agent": agent,
+            "smart_contract_id": self.contract_id,
+            "action": action,
+            "created_at": datetime.now()
+        }
+        with self._condition:
+            self._events.append(new_event)
+            self._pending_report_chunks.append(action + "\n")
+            if len(self._events) >= self.flush_size:
+                self._condition.notify()
+        event_bus.publish(self.contract_id, new_event)
+        return new_event
+
+    def append_report(self, text):
+        with self._condition:
+            self._pending_report_chunks.append(text)
+
+    def _take(self):
+        with self._condition:
+            events, self._events = self._events, []
+            report_chunks, self._pending_report_chunks = self._pending_report_chunks, []
+        return events, report_chunks
+
+    def flush(self):
+        events, report_chunks = self._take()
+        # Written separately, so report progress is not held back by events that keep failing
+        if events:
+            try:
+                insert_events(events)
+            except BulkWriteError as e:
+                # Events inserted by an earlier, partly failed flush come back as duplicates of their _id
+                failed = {error["index"] for error in e.details.get("writeErrors", []) if error.get("code") != 11000}
+                if failed:
+                    print(f"Failed to write {len(failed)} events for {self.contract_id}: {e}")
+                self._requeue([event for index, event in enumerate(events) if index in failed], [])
+            except Exception as e:
+                print(f"Failed to write events for {self.contract_id}: {e}")
+                self._requeue(events, [])
+        if report_chunks:
+            try:
+                append_report_results(self.contract_id, report_chunks)
+            except Exception as e:
+                print(f"Failed to append to the report of {self.contract_id}: {e}")
+                self._requeue([], report_chunks)
+
+    def _requeue(self, events, report_chunks):
+        # Keep what was not written for the next flush
+        with self._condition:
+            self._events[:0] = events
+            self._pending_report_chunks[:0] = report_chunks
+
+    def _run(self):
+        while True:
+            with self._condition:
+                if not self._closed and len(self._events) < self.flush_size:
+                    self._condition.wait(self.flush_interval)
+                closed = self._closed
+            self.flush()
+            if closed:
+                return
+
+    def close(self):
+        """Stops the writer after a final flush of everything still buffered."""
+        with self._condition:
+            self._closed = True
+            self._condition.notify()
+        self._writer.join()
+        event_bus.close_channel(self.contract_id)
+
+
+def create_event_sink(contract_id):
+    return EventSink(
+        contract_id,
+        flush_size=int(os.getenv("EVENT_FLUSH_SIZE", 20)),
+        flush_interval=float(os.getenv("EVENT_FLUSH_INTERVAL", 1.0)),
+    )
@@ -0,0 +1,61 @@
+from bson import ObjectId
+from flask.json.provider import DefaultJSONProvider, _default
+
+try:
+    import orjson
+except ImportError:  # pragma: no cover - orjson is optional
+    orjson = None
+
+
+def mongo_default(o):
+    """Serializes the Mongo types the API returns, then falls back to Flask's defaults."""
+    if isinstance(o, ObjectId):
+        return str(o)
+    return _default(o)
+
+
+class MongoJSONProvider(DefaultJSONProvider):
+    """
+    JSON provider that serializes ObjectId and datetime values while encoding.
+
+    Documents from Mongo can be returned as they are, without first copying them
+    to replace ObjectIds. Uses orjson when it is installed and the standard json
+    module otherwise. Datetimes keep Flask's HTTP date format either way.
+    """
+
+    default = staticmethod(mongo_default)
+
+    def __init__(self, app, use_orjson=True):
+        super().__init__(app)
+        self.use_orjson = use_orjson and orjson is not None
+
+    def _orjson_options(self, indent=None):
+        # Hand datetimes to `default` so they match the json module output
+        options = orjson.OPT_PASSTHROUGH_DATETIME | orjson.OPT_NON_STR_KEYS
+        if self.sort_keys:
+            options |= orjson.OPT_SORT_KEYS
+        if indent:
+            options |= orjson.OPT_INDENT_2
+        return options
+
+    def dumps_bytes(self, obj, indent=None):
+        """Encodes `obj` to UTF-8 JSON bytes in one pass."""
+        if self.use_orjson:
+            return orjson.dumps(obj, default=self.default, option=self._orjson_options(indent))
+        separators = None if indent else (",", ":")
+        return super().dumps(obj, indent=indent, separators=separators).encode()
+
+    def dumps(self, obj, **kwargs):
+        if self.use_orjson and set(kwargs) <= {"indent", "separators"}:
+            return self.dumps_bytes(obj, indent=kwargs.get("indent")).decode()
+        return super().dumps(obj, **kwargs)
+
+    def loads(self, s, **kwargs):
+        if self.use_orjson and not kwargs:
+            return orjson.loads(s)
+        return super().loads(s, **kwargs)
+
+    def response(self, *args, **kwargs):
+        obj = self._prepare_response_obj(args, kwargs)
+        indent = 2 if (self.compact is None and self._app.debug) or self.compact is False else None
+        return self._app.response_class(self.dumps_bytes(obj, indent=indent) + b"\n", mimetype=self.mimetype)
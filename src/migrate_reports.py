@@ -0,0 +1,9 @@
+# Moves reports written before results were stored as chunks (a single
+# `results` string) to the `results_chunks` array. Safe to run more than once.
+#
+#     python src/migrate_reports.py
+from schema import migrate_report_results
+
+if __name__ == "__main__":
+    migrated = migrate_report_results()
+    print(f"Migrated {migrated} reports to chunked results")
@@ -0,0 +1,128 @@
+import os
+import threading
+import time
+from datetime import datetime, timedelta
+
+from schema import (
+    claim_next_job,
+    count_queued_jobs,
+    enqueue_job,
+    finish_job,
+    is_job_cancel_requested,
+    request_job_cancel,
+    requeue_stale_jobs,
+    running_jobs_by_tenant,
+    touch_jobs,
+)
+
+
+class QueueFullError(Exception):
+    pass
+
+
+class AuditScheduler:
+    """
+    Runs audit jobs from the Mongo `jobs` queue on a bounded pool of worker threads.
+
+    Jobs are claimed highest priority first, oldest first, skipping tenants that
+    already have `per_tenant_limit` jobs running. Running jobs send heartbeats,
+    so jobs left running by a crashed or restarted process go back to the queue.
+    """
+
+    def __init__(self, run_job, max_workers=4, per_tenant_limit=2, max_queued=100, poll_interval=2, heartbeat_interval=10):
+        self.run_job = run_job
+        self.max_workers = max_workers
+        self.per_tenant_limit = per_tenant_limit
+        self.max_queued = max_queued
+        self.poll_interval = poll_interval
+        self.heartbeat_interval = heartbeat_interval
+        self._wakeup = threading.Event()
+        self._claim_lock = threading.Lock()
+        self._running = set()
+        self._running_lock = threading.Lock()
+        self._started = False
+        self._start_lock = threading.Lock()
+
+    def start(self):
+        with self._start_lock:
+            if self._started:
+                return
+            self._started = True
+        self._requeue_stale()
+        for i in range(self.max_workers):
+            threading.Thread(target=self._worker, name=f"audit-worker-{i}", daemon=True).start()
+        threading.Thread(target=self._heartbeat, name="audit-heartbeat", daemon=True).start()
+
+    def is_full(self):
+        return count_queued_jobs() >= self.max_queued
+
+    def submit(self, contract_id, address, tenant="default", priority=0, addresses=None):
+        if self.is_full():
+            raise QueueFullError("Too many audits queued, try again later")
+        job = enqueue_job(contract_id=contract_id, address=address, tenant=tenant, priority=priority, addresses=addresses)
+        # Picked up once the serving process has called start()
+        self._wakeup.set()
+        return job
+
+    def cancel(self, job_id):
+        return request_job_cancel(job_id)
+
+    def _requeue_stale(self):
+        stale_before = datetime.now() - timedelta(seconds=3 * self.heartbeat_interval)
+        requeued = requeue_stale_jobs(stale_before)
+        if requeued:
+            print(f"Requeued {requeued} interrupted audit jobs")
+            self._wakeup.set()
+
+    def _claim(self):
+        with self._claim_lock:
+            saturated = [tenant for tenant, count in running_jobs_by_tenant().items() if count >= self.per_tenant_limit]
+            return claim_next_job(excluded_tenants=saturated)
+
+    def _worker(self):
+        while True:
+            try:
+                job = self._claim()
+            except Exception as e:
+                print(f"Failed to claim audit job: {e}")
+                job = None
+            if job is None:
+                self._wakeup.wait(self.poll_interval)
+                self._wakeup.clear()
+                continue
+
+            job_id = job["job_id"]
+            with self._running_lock:
+                self._running.add(job_id)
+            try:
+                self.run_job(job, should_cancel=lambda: is_job_cancel_requested(job_id))
+                status = "cancelled" if is_job_cancel_requested(job_id) else "done"
+                finish_job(job_id, status)
+            except Exception as e:
+                print(f"Audit job {job_id} failed: {e}")
+                finish_job(job_id, "failed", error=str(e))
+            finally:
+                with self._running_lock:
+                    self._running.discard(job_id)
+                # A tenant slot may have opened up for a queued job
+                self._wakeup.set()
+
+    def _heartbeat(self):
+        while True:
+            time.sleep(self.heartbeat_interval)
+            try:
+                with self._running_lock:
+                    running = list(self._running)
+                touch_jobs(running)
+                self._requeue_stale()
+            except Exception as e:
+                print(f"Audit job heartbeat failed: {e}")
+
+
+def create_scheduler(run_job):
+    return AuditScheduler(
+        run_job,
+        max_workers=int(os.getenv("AUDIT_WORKERS", 4)),
+        per_tenant_limit=int(os.getenv("AUDIT_TENANT_LIMIT", 2)),
+        max_queued=int(os.getenv("AUDIT_MAX_QUEUED", 100)),
+    )
@@ -1,6 +1,8 @@
+import base64
+import json
 import os
 from datetime import datetime
-from pymongo import MongoClient
+from pymongo import MongoClient, ReturnDocument
 from bson import ObjectId
 
 # Assuming you have a MongoDB connection string
@@ -18,10 +20,31 @@ smart_contracts = db.smart_contract
 malicious_contracts = db.malicious_contract
 events = db.events
 reports = db.report
+jobs = db.jobs
 
 def create_id(object_type: str):
     return f'{object_type}_{int(datetime.timestamp(datetime.now()))}'
 
+def ensure_indexes():
+    # Covers the lookups and sorts done by the API routes and the audit scheduler
+    smart_contracts.create_index("contract_id")
+    smart_contracts.create_index("addr")
+    smart_contracts.create_index([("created_at", -1)])
+    malicious_contracts.create_index("addr")
+    reports.create_index("contract_id")
+    reports.create_index([("created_at", -1), ("_id", -1)])
+    events.create_index([("smart_contract_id", 1), ("created_at", 1)])
+    events.create_index([("smart_contract_id", 1), ("_id", 1)])
+    job_id_index = jobs.index_information().get("job_id_1")
+    if job_id_index is not None and not job_id_index.get("unique"):
+        # Created before job ids were unique
+        jobs.drop_index("job_id_1")
+    jobs.create_index("job_id", unique=True)
+    jobs.create_index([("contract_id", 1), ("created_at", -1), ("_id", -1)])
+    jobs.create_index([("status", 1), ("priority", -1), ("created_at", 1)])
+    jobs.create_index([("status", 1), ("tenant", 1)])
+    jobs.create_index([("status", 1), ("heartbeat_at", 1)])
+
 # Schema definitions (these are not enforced by MongoDB, but serve as a guide)
 
 smart_contract_schema = {
@@ -53,6 +76,22 @@ report_schema = {
     "created_at": datetime
 }
 
+job_schema = {
+    "_id": ObjectId,
+    "job_id": str,
+    "contract_id": str,
+    "address": str,
+    "tenant": str,
+    "priority": int,
+    "status": str,  # queued, running, done, failed, cancelled
+    "cancel_requested": bool,
+    "error": str,
+    "created_at": datetime,
+    "started_at": datetime,
+    "finished_at": datetime,
+    "heartbeat_at": datetime
+}
+
 # Example of how to insert a document
 def insert_smart_contract(addr, source_code, name):
     return smart_contracts.insert_one({
@@ -65,12 +104,103 @@ def insert_smart_contract(addr, source_code, name):
 def get_smart_contract_by_id(contract_id):
     return smart_contracts.find_one({"_id": ObjectId(contract_id)})
 
+# Summary views leave out the large markdown results
+REPORT_SUMMARY_PROJECTION = {"results": 0, "results_chunks": 0}
+REPORT_PLACEHOLDER = "Analysis in progress..."
+
+def render_report(report, chunk_range=None):
+    """
+    Joins a report's result chunks into the `results` string returned by the API.
+
+    Reports store results as an array of chunks (`results_chunks`); reports written
+    before that keep a plain `results` string, which is returned first.
+    """
+    if "results" not in report and "results_chunks" not in report:
+        # Summary projection
+        return report
+    legacy_results = report.pop("results", "")
+    chunks = report.pop("results_chunks", [])
+    if chunk_range is not None:
+        report["chunk_range"] = list(chunk_range)
+        report["results"] = "".join(chunks)
+        return report
+    if not isinstance(legacy_results, str):
+        legacy_results = ""
+    results = (legacy_results + "".join(chunks)).strip()
+    report["results"] = results or REPORT_PLACEHOLDER
+    return report
+
 # You can add more helper functions for CRUD operations as needed
-def get_all_reports():
-    all_reports = list(reports.find())
-    for report in all_reports:
-        report['_id'] = str(report['_id'])
-    return all_reports
+def get_all_reports(summary=False):
+    all_reports = list(reports.find({}, REPORT_SUMMARY_PROJECTION if summary else None))
+    return [render_report(report) for report in all_reports]
+
+def report_projection(chunk_range=None):
+    if chunk_range is None:
+        return None
+    start, end = chunk_range
+    return {"results": 0, "results_chunks": {"$slice": [start, max(end - start, 0)]}}
+
+def get_report(contract_id, chunk_range=None):
+    """Returns a rendered report, optionally only the chunks in [start, end)."""
+    report = reports.find_one({"contract_id": contract_id}, report_projection(chunk_range))
+    if report is None:
+        return None
+    return render_report(report, chunk_range=chunk_range)
+
+def append_report_results(contract_id, chunks):
+    """Appends result chunks with a single atomic $push, returns False if there is no such report."""
+    result = reports.update_one(
+        {"contract_id": contract_id},
+        {"$push": {"results_chunks": {"$each": list(chunks)}}}
+    )
+    return result.matched_count > 0
+
+def migrate_report_results():
+    """Moves plain string `results` into `results_chunks`, returns the number of migrated reports."""
+    result = reports.update_many(
+        {"results": {"$type": "string"}},
+        [
+            {"$set": {"results_chunks": {"$concatArrays": [["$results"], {"$ifNull": ["$results_chunks", []]}]}}},
+            {"$unset": "results"}
+        ]
+    )
+    return result.modified_count
+
+def encode_report_cursor(report):
+    position = {"created_at": report["created_at"].isoformat(), "_id": str(report["_id"])}
+    return base64.urlsafe_b64encode(json.dumps(position).encode()).decode()
+
+def decode_report_cursor(cursor):
+    try:
+        position = json.loads(base64.urlsafe_b64decode(cursor.encode()))
+        return datetime.fromisoformat(position["created_at"]), ObjectId(position["_id"])
+    except Exception:
+        raise ValueError("Invalid cursor")
+
+def find_reports(cursor=None, summary=False, collection=None):
+    """
+    Returns a Mongo cursor over reports, newest first, starting after `cursor`.
+
+    `collection` defaults to the reports collection, the async API passes its own.
+    """
+    query = {}
+    if cursor:
+        created_at, report_id = decode_report_cursor(cursor)
+        # Keyset pagination on (created_at, _id) so pages stay stable as reports are added
+        query = {"$or": [
+            {"created_at": {"$lt": created_at}},
+            {"created_at": created_at, "_id": {"$lt": report_id}}
+        ]}
+    projection = REPORT_SUMMARY_PROJECTION if summary else None
+    collection = reports if collection is None else collection
+    return collection.find(query, projection).sort([("created_at", -1), ("_id", -1)])
+
+def get_reports_page(limit, cursor=None, summary=False):
+    # Read one extra document to know whether there is a next page
+    page = list(find_reports(cursor=cursor, summary=summary).limit(limit + 1))
+    next_cursor = encode_report_cursor(page[limit - 1]) if len(page) > limit else None
+    return [render_report(report) for report in page[:limit]], next_cursor
 
 def create_report(text: str, created_at: datetime):
     report_id = create_id('report')
@@ -89,12 +219,26 @@ def create_report(text: str, created_at: datetime):
         "created_at": created_at
     }
 
+def uploaded_contract_query(contract_address: str):
+    # Addresses are stored as submitted, so match the common spellings
+    candidates = list({contract_address, contract_address.lower()})
+    return {"addr": {"$in": candidates}}
+
+def find_uploaded_contract(contract_address: str, projection=None):
+    return smart_contracts.find_one(uploaded_contract_query(contract_address), projection)
+
 def get_uploaded_contract_address_abi(contract_address: str):
-    contract = smart_contracts.find_one({"addr": contract_address})
+    contract = find_uploaded_contract(contract_address, {"abi": 1})
     if contract and "abi" in contract:
         return contract["abi"]
     return None
 
+def get_uploaded_contract_source_code(contract_address: str):
+    contract = find_uploaded_contract(contract_address, {"source_code": 1})
+    if contract and "source_code" in contract:
+        return contract["source_code"]
+    return None
+
 def get_uploaded_malicious_contract_abi(contract_address: str):
     contract = malicious_contracts.find_one({"addr": contract_address})
     if contract and "abi" in contract:
@@ -112,9 +256,19 @@ def insert_malicious_contract(addr, source_code, abi, bytecode):
 def update_report(contract_id, final_result):
     reports.update_one(
         {"contract_id": contract_id},
-        {"$set": {"results": final_result}}
+        {"$set": {"results_chunks": [final_result]}, "$unset": {"results": ""}}
     )
 
+def insert_events(new_events):
+    return events.insert_many(new_events, ordered=False)
+
+def find_events_since(contract_id, since=None):
+    """Events of a contract in insertion order, only those after the `since` event _id if given."""
+    query = {"smart_contract_id": contract_id}
+    if since is not None:
+        query["_id"] = {"$gt": since}
+    return events.find(query).sort("_id", 1)
+
 def insert_event(contract_id, agent, action):
     new_event = {
         "agent": agent,
@@ -123,3 +277,80 @@ def insert_event(contract_id, agent, action):
         "created_at": datetime.now()
     }
     return events.insert_one(new_event)
+
+def enqueue_job(contract_id, address, tenant, priority=0, addresses=None):
+    new_job = {
+        # Unlike create_id, unique for jobs queued within the same second
+        "job_id": f"job_{ObjectId()}",
+        "contract_id": contract_id,
+        "address": address,
+        "tenant": tenant,
+        "priority": priority,
+        "status": "queued",
+        "cancel_requested": False,
+        "created_at": datetime.now()
+    }
+    if addresses:
+        # A multi-address audit, run as one fan-out job
+        new_job["addresses"] = addresses
+    jobs.insert_one(new_job)
+    return new_job
+
+def get_job(job_id):
+    return jobs.find_one({"job_id": job_id}, {"_id": 0})
+
+def get_contract_job(contract_id):
+    # The latest audit job of a contract
+    return jobs.find_one({"contract_id": contract_id}, {"_id": 0}, sort=[("created_at", -1), ("_id", -1)])
+
+def count_queued_jobs():
+    return jobs.count_documents({"status": "queued"})
+
+def running_jobs_by_tenant():
+    counts = jobs.aggregate([
+        {"$match": {"status": "running"}},
+        {"$group": {"_id": "$tenant", "count": {"$sum": 1}}}
+    ])
+    return {item["_id"]: item["count"] for item in counts}
+
+def claim_next_job(excluded_tenants=()):
+    # Atomically move the highest priority, oldest queued job to running
+    now = datetime.now()
+    return jobs.find_one_and_update(
+        {"status": "queued", "tenant": {"$nin": list(excluded_tenants)}},
+        {"$set": {"status": "running", "started_at": now, "heartbeat_at": now}},
+        sort=[("priority", -1), ("created_at", 1)],
+        return_document=ReturnDocument.AFTER
+    )
+
+def finish_job(job_id, status, error=None):
+    jobs.update_one(
+        {"job_id": job_id},
+        {"$set": {"status": status, "error": error, "finished_at": datetime.now()}}
+    )
+
+def touch_jobs(job_ids):
+    if job_ids:
+        jobs.update_many({"job_id": {"$in": list(job_ids)}}, {"$set": {"heartbeat_at": datetime.now()}})
+
+def requeue_stale_jobs(stale_before):
+    # Running jobs whose worker stopped sending heartbeats, e.g. after a restart
+    result = jobs.update_many(
+        {"status": "running", "heartbeat_at": {"$lt": stale_before}},
+        {"$set": {"status": "queued"}}
+    )
+    return result.modified_count
+
+def request_job_cancel(job_id):
+    # Queued jobs are cancelled right away, running ones stop at their next event
+    result = jobs.update_one({"job_id": job_id, "status": "queued"}, {"$set": {"status": "cancelled", "finished_at": datetime.now()}})
+    if result.modified_count:
+        return "cancelled"
+    result = jobs.update_one({"job_id": job_id, "status": "running"}, {"$set": {"cancel_requested": True}})
+    if result.matched_count:
+        return "cancelling"
+    return None
+
+def is_job_cancel_requested(job_id):
+    return jobs.count_documents({"job_id": job_id, "cancel_requested": True}, limit=1) > 0
+
@@ -0,0 +1,111 @@
+# Shared by the Flask app (app.py) and the async app (asgi_app.py): the audit
+# scheduler, request parsing helpers, the metrics and the startup of background
+# services.
+# Kept apart from both so neither server imports the other's routes, clients
+# and side effects.
+import os
+from threading import Thread
+
+from api.agents.llm_cache import get_llm_cache
+from api.agents.mas import graph_stats, run_mas_fanout_workflow, run_mas_workflow, warm_up_graph
+from api.agents.tools import abi_cache, source_code_cache
+from api.chain_backend import get_chain_backend
+from api.compile_cache import artifact_cache
+from api.contract_registry import contract_registry
+from api.etherscan import etherscan_client
+from api.receipt_tracker import receipt_tracker_metrics
+from api.sandbox import exploit_sandbox
+from api.solc_manager import get_preinstall_versions, solc_manager
+from api.web3_connection import get_web3_pool
+from event_bus import event_bus
+from scheduler import create_scheduler
+from schema import ensure_indexes
+
+
+def run_audit_job(job, should_cancel):
+    if job.get("addresses"):
+        run_mas_fanout_workflow(job["contract_id"], job["addresses"], should_cancel=should_cancel)
+    else:
+        run_mas_workflow(job["contract_id"], job["address"], should_cancel=should_cancel)
+
+# Audits run on a bounded worker pool fed from the Mongo jobs queue
+audit_scheduler = create_scheduler(run_audit_job)
+
+# Most addresses one POST /contracts/batch audits
+BATCH_MAX_ADDRESSES = int(os.getenv("AUDIT_BATCH_MAX_ADDRESSES", 20))
+
+# Seconds between keep-alive comments on idle event streams
+SSE_HEARTBEAT_INTERVAL = float(os.getenv("SSE_HEARTBEAT_INTERVAL", 15))
+
+# List views leave out the large ABI and source code fields
+CONTRACT_SUMMARY_PROJECTION = {"abi": 0, "source_code": 0}
+
+REPORTS_PAGE_SIZE = 50
+REPORTS_MAX_PAGE_SIZE = 200
+
+def parse_reports_limit(args):
+    try:
+        limit = min(int(args.get("limit", REPORTS_PAGE_SIZE)), REPORTS_MAX_PAGE_SIZE)
+    except ValueError:
+        raise ValueError("limit must be an integer")
+    if limit < 1:
+        raise ValueError("limit must be positive")
+    return limit
+
+def parse_addresses(value):
+    if not isinstance(value, list) or not all(isinstance(address, str) for address in value):
+        raise ValueError("addresses must be a list of contract addresses")
+    addresses = list(dict.fromkeys(address.strip() for address in value if address.strip()))
+    if not addresses:
+        raise ValueError("addresses must not be empty")
+    if len(addresses) > BATCH_MAX_ADDRESSES:
+        raise ValueError(f"At most {BATCH_MAX_ADDRESSES} addresses can be audited together")
+    return addresses
+
+def parse_chunk_range(value):
+    # "start:end", e.g. "0:10"
+    try:
+        start, end = value.split(":", 1)
+        chunk_range = (int(start or 0), int(end))
+    except ValueError:
+        raise ValueError("chunks must be start:end")
+    # An empty range would become a $slice with a count of 0, which MongoDB rejects
+    if chunk_range[0] < 0 or chunk_range[1] <= chunk_range[0]:
+        raise ValueError("chunks must be start:end with end greater than start")
+    return chunk_range
+
+def collect_metrics():
+    # Blocking: creates the chain backend, RPC pool and LLM cache on first use
+    return {
+        "web3_pool": get_web3_pool().metrics(),
+        "chain": get_chain_backend().metrics(),
+        "sandbox": exploit_sandbox.metrics(),
+        "receipt_tracker": receipt_tracker_metrics(),
+        "abi_cache": abi_cache.metrics(),
+        "source_code_cache": source_code_cache.metrics(),
+        "etherscan": etherscan_client.metrics(),
+        "llm_cache": get_llm_cache().metrics() if get_llm_cache() else None,
+        "artifact_cache": artifact_cache.metrics(),
+        "contract_registry": contract_registry.metrics(),
+        "graph": graph_stats(),
+        "event_bus": event_bus.metrics(),
+    }
+
+def job_finished(job):
+    # Contracts submitted before the jobs queue have no job
+    return job is None or job["status"] in ("done", "failed", "cancelled")
+
+def start_background_services():
+    """
+    Starts what the serving process runs besides the routes: the MongoDB indexes,
+    the solc installs and compiler workers, the agent graph and the audit workers.
+    Queued audits only run once this has been called.
+    """
+    try:
+        ensure_indexes()
+    except Exception as e:
+        print(f"Failed to create MongoDB indexes: {e}")
+    # Install the configured solc versions and start the compiler workers in the background
+    Thread(target=solc_manager.warm_up, args=(get_preinstall_versions(),), daemon=True).start()
+    warm_up_graph()
+    audit_scheduler.start()
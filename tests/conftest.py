@@ -0,0 +1,43 @@
+import mongomock
+import pytest
+from web3 import Web3
+
+import schema
+from api.chain_backend import EthTesterBackend
+
+WALLET_PRIVATE_KEY = "0x" + "11" * 32
+
+# Keeps ether sent to it and sends its whole balance to the caller on any call
+# without value, whatever the calldata:
+#   if callvalue: stop
+#   call(gas, caller, selfbalance, 0, 0, 0, 0)
+DRAIN_BYTECODE = "0x601480600b6000396000f3" + "34601257600060006000600047335af150005b00"
+DRAIN_ABI = [
+    {"type": "function", "name": "drain", "inputs": [], "outputs": [], "stateMutability": "nonpayable"},
+    {"type": "function", "name": "deposit", "inputs": [], "outputs": [], "stateMutability": "payable"},
+]
+
+
+@pytest.fixture
+def chain():
+    """A fresh in-process chain with the wallet funded."""
+    backend = EthTesterBackend()
+    backend.fund(Web3().eth.account.from_key(WALLET_PRIVATE_KEY).address, Web3.to_wei(100, "ether"))
+    return backend
+
+
+@pytest.fixture
+def drain_contract(chain):
+    w3 = chain.web3()
+    txn_hash = w3.eth.send_transaction({"from": w3.eth.accounts[0], "data": DRAIN_BYTECODE, "value": Web3.to_wei(5, "ether")})
+    return w3.eth.get_transaction_receipt(txn_hash).contractAddress
+
+
+@pytest.fixture
+def db(monkeypatch):
+    """An in-memory Mongo database behind the schema module's collections."""
+    db = mongomock.MongoClient().mydatabase
+    for name, collection in (("smart_contracts", "smart_contract"), ("malicious_contracts", "malicious_contract"),
+                             ("events", "events"), ("reports", "report"), ("jobs", "jobs")):
+        monkeypatch.setattr(schema, name, db[collection])
+    return db
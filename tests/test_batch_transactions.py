@@ -0,0 +1,65 @@
+import pytest
+from hexbytes import HexBytes
+from web3 import Web3
+
+import api.agents.tools as tools_module
+from api.agents.tools import submit_batch_transactions
+from api.nonce_manager import nonce_manager
+from conftest import DRAIN_ABI, WALLET_PRIVATE_KEY
+
+WALLET = Web3().eth.account.from_key(WALLET_PRIVATE_KEY).address
+
+
+@pytest.fixture(autouse=True)
+def fresh_nonces():
+    nonce_manager.reset(WALLET)
+    yield
+    nonce_manager.reset(WALLET)
+
+
+def test_batch_lands_in_nonce_order(chain, drain_contract):
+    w3 = chain.web3()
+    results = submit_batch_transactions(
+        w3, WALLET_PRIVATE_KEY, drain_contract, DRAIN_ABI, [("drain", [])] * 3, wait=True, timeout=10,
+    )
+
+    assert [result["error"] for result in results] == [None, None, None]
+    assert [result["receipt"].status for result in results] == [1, 1, 1]
+    assert [w3.eth.get_transaction(result["txn_hash"]).nonce for result in results] == [0, 1, 2]
+    assert nonce_manager.allocate(w3, WALLET) == 3
+
+
+def test_rejected_transaction_stops_the_rest_and_rewinds(chain, drain_contract, monkeypatch):
+    w3 = chain.web3()
+    send_raw_transaction = w3.eth.send_raw_transaction
+    sent = []
+
+    def reject_second(raw_txn):
+        sent.append(raw_txn)
+        if len(sent) == 2:
+            raise ValueError("transaction underpriced")
+        return send_raw_transaction(raw_txn)
+
+    monkeypatch.setattr(w3.eth, "send_raw_transaction", reject_second)
+    results = submit_batch_transactions(w3, WALLET_PRIVATE_KEY, drain_contract, DRAIN_ABI, [("drain", [])] * 3)
+
+    assert results[0]["txn_hash"] is not None and results[0]["error"] is None
+    assert results[1]["txn_hash"] is None and "underpriced" in results[1]["error"]
+    assert results[2]["txn_hash"] is None and results[2]["error"]
+    assert len(sent) == 2
+    # Only the nonces that did not land are handed out again
+    assert nonce_manager.allocate(w3, WALLET) == 1
+
+
+def test_accepted_after_rejected_resyncs(chain, drain_contract, monkeypatch):
+    w3 = chain.web3()
+    resynced = []
+    monkeypatch.setattr(nonce_manager, "resync", lambda w3, address: resynced.append(address))
+    # A JSON-RPC batch reports on every transaction, even after a rejected one
+    monkeypatch.setattr(tools_module, "send_raw_transactions", lambda w3, raw_txns: [
+        (None, "nonce too high"), (HexBytes("0x01"), None), (None, "nonce too high"),
+    ])
+    results = submit_batch_transactions(w3, WALLET_PRIVATE_KEY, drain_contract, DRAIN_ABI, [("drain", [])] * 3)
+
+    assert [result["error"] for result in results] == ["nonce too high", None, "nonce too high"]
+    assert resynced == [WALLET]
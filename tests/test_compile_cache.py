@@ -0,0 +1,40 @@
+import os
+
+from api.compile_cache import ArtifactCache
+
+SETTINGS = {"outputSelection": {"*": {"*": ["abi", "evm.bytecode"]}}}
+ARTIFACT = {"Token": {"abi": [], "bytecode": "6080"}}
+
+
+def test_key_depends_on_source_version_and_settings():
+    key = ArtifactCache.key("contract A {}", "0.8.0", SETTINGS)
+
+    assert key == ArtifactCache.key("contract A {}", "0.8.0", dict(SETTINGS))
+    assert key != ArtifactCache.key("contract B {}", "0.8.0", SETTINGS)
+    assert key != ArtifactCache.key("contract A {}", "0.8.1", SETTINGS)
+    assert key != ArtifactCache.key("contract A {}", "0.8.0", {**SETTINGS, "optimizer": {"enabled": True}})
+
+
+def test_round_trip_and_miss(tmp_path):
+    cache = ArtifactCache(str(tmp_path))
+    cache.put("a" * 64, ARTIFACT)
+
+    assert cache.get("a" * 64) == ARTIFACT
+    assert cache.get("b" * 64) is None
+    assert cache.metrics() == {"hits": 1, "misses": 1, "evictions": 0}
+    assert [name for name in os.listdir(tmp_path) if name.endswith(".tmp")] == []
+
+
+def test_least_recently_used_entries_are_evicted(tmp_path):
+    cache = ArtifactCache(str(tmp_path))
+    for index, key in enumerate(("old", "used", "new")):
+        cache.put(key, ARTIFACT)
+        os.utime(tmp_path / f"{key}.json", (1000 + index, 1000 + index))
+    entry_size = os.path.getsize(tmp_path / "old.json")
+
+    cache.get("old")  # Touched, so now the most recently used
+    cache.max_bytes = 2 * entry_size
+    cache.put("newest", ARTIFACT)
+
+    assert sorted(os.listdir(tmp_path)) == ["newest.json", "old.json"]
+    assert cache.metrics()["evictions"] == 2
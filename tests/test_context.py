@@ -0,0 +1,57 @@
+from langchain_core.messages import AIMessage, HumanMessage, ToolMessage
+
+from api.agents.context import ArtifactStore, compact_messages
+
+
+def tool_turn(call_id, output):
+    return [
+        AIMessage("", tool_calls=[{"name": "get_abi", "args": {}, "id": call_id}]),
+        ToolMessage(output, tool_call_id=call_id),
+    ]
+
+
+def test_short_conversations_are_unchanged():
+    messages = [HumanMessage("Audit 0x1"), *tool_turn("call_1", "[]"), AIMessage("done")]
+
+    assert compact_messages(messages, max_prompt_chars=10000, store=ArtifactStore()) == messages
+
+
+def test_older_tool_outputs_are_cut_and_kept_in_the_store():
+    store = ArtifactStore()
+    source = "contract A {}" * 100
+    messages = [HumanMessage("Audit 0x1"), *tool_turn("call_1", source), *tool_turn("call_2", "x" * 500)]
+
+    compacted = compact_messages(messages, max_prompt_chars=100000, max_tool_chars=50, max_recent_tool_chars=1000, store=store)
+
+    older, latest = compacted[2], compacted[4]
+    assert older.content.startswith(source[:50]) and len(older.content) < len(source)
+    reference = older.content.split("stored as ")[1].split(",")[0]
+    assert store.get(reference) == source
+    assert older.tool_call_id == "call_1"
+    assert latest.content == "x" * 500
+
+
+def test_oldest_turns_are_left_out_without_splitting_tool_calls():
+    turns = [tool_turn(f"call_{i}", "y" * 100) for i in range(5)]
+    messages = [HumanMessage("Audit 0x1")] + [message for turn in turns for message in turn]
+
+    compacted = compact_messages(messages, max_prompt_chars=350, max_tool_chars=1000, store=ArtifactStore())
+
+    assert compacted[0] == messages[0]
+    assert "earlier messages were left out" in compacted[1].content
+    kept = compacted[2:]
+    assert kept == messages[-len(kept):]
+    assert isinstance(kept[0], AIMessage) and len(kept) % 2 == 0
+    # Every tool result still follows the call that produced it
+    assert [message.tool_call_id for message in kept if isinstance(message, ToolMessage)] == [
+        message.tool_calls[0]["id"] for message in kept if isinstance(message, AIMessage)
+    ]
+
+
+def test_artifact_references_are_stable():
+    store = ArtifactStore(max_entries=1)
+    reference = store.put("abi")
+
+    assert store.put("abi") == reference
+    store.put("source")
+    assert store.get(reference) is None
@@ -0,0 +1,79 @@
+import threading
+import time
+
+import pytest
+
+from api.contract_cache import ContractDataCache
+
+ADDRESS = "0x" + "Ab" * 20
+
+
+def test_fetches_once_and_matches_any_address_case():
+    calls = []
+    cache = ContractDataCache(lambda address: calls.append(address) or ["abi"])
+
+    assert cache.get(1, ADDRESS) == ["abi"]
+    assert cache.get(1, ADDRESS.lower()) == ["abi"]
+    assert calls == [ADDRESS]
+    assert cache.metrics() == {"hits": 1, "store_hits": 0, "misses": 1, "coalesced": 0, "size": 1}
+
+
+def test_store_is_checked_before_fetching():
+    cache = ContractDataCache(lambda address: pytest.fail("fetched"), store_lookup=lambda address: "stored")
+
+    assert cache.get(1, ADDRESS) == "stored"
+    assert cache.metrics()["store_hits"] == 1
+
+
+def test_least_recently_used_entry_is_evicted():
+    calls = []
+    cache = ContractDataCache(lambda address: calls.append(address) or address, maxsize=2)
+    cache.get(1, "0x1")
+    cache.get(1, "0x2")
+    cache.get(1, "0x1")
+    cache.get(1, "0x3")
+
+    assert cache.peek(1, "0x2") is None
+    assert cache.peek(1, "0x1") == "0x1"
+    cache.get(1, "0x2")
+    assert calls == ["0x1", "0x2", "0x3", "0x2"]
+
+
+def test_failed_fetches_are_not_cached():
+    results = iter([RuntimeError("rate limited"), "abi"])
+
+    def fetch(address):
+        result = next(results)
+        if isinstance(result, Exception):
+            raise result
+        return result
+
+    cache = ContractDataCache(fetch)
+    with pytest.raises(RuntimeError):
+        cache.get(1, ADDRESS)
+    assert cache.get(1, ADDRESS) == "abi"
+
+
+def test_concurrent_lookups_share_one_fetch():
+    release = threading.Event()
+    calls = []
+
+    def fetch(address):
+        calls.append(address)
+        release.wait(5)
+        return "abi"
+
+    cache = ContractDataCache(fetch)
+    results = []
+    threads = [threading.Thread(target=lambda: results.append(cache.get(1, ADDRESS))) for _ in range(4)]
+    for thread in threads:
+        thread.start()
+    deadline = time.monotonic() + 5
+    while cache.metrics()["coalesced"] < 3 and time.monotonic() < deadline:
+        time.sleep(0.01)
+    release.set()
+    for thread in threads:
+        thread.join()
+
+    assert results == ["abi"] * 4
+    assert len(calls) == 1
@@ -0,0 +1,42 @@
+import time
+
+from dotenv import load_dotenv
+
+from api.etherscan import EtherscanClient, TokenBucket, etherscan_client
+
+
+def test_token_bucket_allows_a_burst_then_spaces_requests():
+    bucket = TokenBucket(rate=10, capacity=2)
+
+    assert bucket.reserve() == 0.0
+    assert bucket.reserve() == 0.0
+    # Each further reservation waits for one more refill
+    assert abs(bucket.reserve() - 0.1) < 0.01
+    assert abs(bucket.reserve() - 0.2) < 0.01
+
+
+def test_token_bucket_refills_over_time():
+    bucket = TokenBucket(rate=100, capacity=1)
+    bucket.reserve()
+    time.sleep(0.02)
+
+    assert bucket.reserve() == 0.0
+
+
+def test_api_key_loaded_from_dotenv_after_import(tmp_path, monkeypatch):
+    monkeypatch.delenv("ETHERSCAN_API_KEY", raising=False)
+    assert etherscan_client.api_key is None
+
+    env_file = tmp_path / ".env"
+    env_file.write_text("ETHERSCAN_API_KEY=FROM_DOTENV\n")
+    load_dotenv(env_file)
+    try:
+        assert etherscan_client._params({"action": "getabi"})["apikey"] == "FROM_DOTENV"
+    finally:
+        monkeypatch.delenv("ETHERSCAN_API_KEY")
+
+
+def test_explicit_api_key_wins_over_environment(monkeypatch):
+    monkeypatch.setenv("ETHERSCAN_API_KEY", "FROM_ENV")
+
+    assert EtherscanClient("https://example.invalid", "EXPLICIT").api_key == "EXPLICIT"
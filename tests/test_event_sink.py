@@ -0,0 +1,45 @@
+import pytest
+
+import event_sink as event_sink_module
+import schema
+from event_sink import EventSink
+
+
+@pytest.fixture
+def sink(db):
+    db.report.insert_one({"contract_id": "contract_1", "results_chunks": []})
+    # Flushed by hand, the writer thread only flushes on close
+    sink = EventSink("contract_1", flush_size=1000, flush_interval=60)
+    yield sink
+    sink.close()
+
+
+def test_events_written_by_an_earlier_flush_are_not_retried(db, sink):
+    first = sink.emit("planner", "plan")
+    second = sink.emit("executor", "execute")
+    # A flush that timed out after the first event was stored
+    db.events.insert_one(dict(first))
+
+    sink.flush()
+
+    assert [event["_id"] for event in db.events.find().sort("_id", 1)] == [first["_id"], second["_id"]]
+    assert sink._events == []
+    assert db.report.find_one()["results_chunks"] == ["plan\n", "execute\n"]
+
+
+def test_report_chunks_are_written_while_events_fail(db, sink, monkeypatch):
+    def fail(events):
+        raise ConnectionError("timed out")
+
+    monkeypatch.setattr(event_sink_module, "insert_events", fail)
+    event = sink.emit("planner", "plan")
+    sink.flush()
+
+    assert db.report.find_one()["results_chunks"] == ["plan\n"]
+    assert db.events.count_documents({}) == 0
+
+    monkeypatch.setattr(event_sink_module, "insert_events", schema.insert_events)
+    sink.flush()
+
+    assert [stored["_id"] for stored in db.events.find()] == [event["_id"]]
+    assert db.report.find_one()["results_chunks"] == ["plan\n"]
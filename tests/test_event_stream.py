@@ -0,0 +1,21 @@
+from datetime import datetime
+
+import app as app_module
+
+
+def test_stream_picks_up_events_written_by_another_process(db, monkeypatch):
+    monkeypatch.setattr(app_module, "SSE_HEARTBEAT_INTERVAL", 0.01)
+    db.jobs.insert_one({"contract_id": "streamed_contract", "status": "running", "created_at": datetime.now()})
+    response = app_module.app.test_client().get("/contracts/streamed_contract/stream", buffered=False)
+    chunks = iter(response.response)
+
+    assert next(chunks) == b"retry: 3000\n\n"
+    assert next(chunks) == b": keep-alive\n\n"
+    # Nothing on this process's event bus, only in Mongo
+    db.events.insert_one({"smart_contract_id": "streamed_contract", "agent": "executor", "action": "drain()"})
+    db.jobs.update_one({"contract_id": "streamed_contract"}, {"$set": {"status": "done"}})
+    rest = b"".join(chunks).decode()
+    response.close()
+
+    assert "drain()" in rest
+    assert rest.endswith("event: done\ndata: {}\n\n")
@@ -0,0 +1,59 @@
+import pytest
+
+import api.agents.mas as mas
+import app as app_module
+import services
+
+
+@pytest.fixture
+def audited(monkeypatch):
+    audited = []
+    monkeypatch.setattr(mas, "prefetch_contract_data", lambda addresses: None)
+    monkeypatch.setattr(mas, "get_graph", lambda: pytest.fail("the given graph was not used"))
+
+    def audit_address(graph, address, thread_id, on_message=None, should_cancel=None):
+        audited.append((graph, address, thread_id))
+        return {"address": address, "report": f"report of {address}", "cancelled": False}
+
+    monkeypatch.setattr(mas, "audit_address", audit_address)
+    return audited
+
+
+def test_each_call_gets_its_own_threads(audited):
+    graph = object()
+    mas.audit_addresses(["0x1", "0x2"], graph=graph, max_workers=1)
+    mas.audit_addresses(["0x1"], graph=graph)
+
+    assert all(used is graph for used, _, _ in audited)
+    thread_ids = [thread_id for _, _, thread_id in audited]
+    assert len(set(thread_ids)) == 3
+    assert thread_ids[0].split(":")[:2] == thread_ids[1].split(":")[:2] != thread_ids[2].split(":")[:2]
+
+
+def test_multi_address_jobs_fan_out(monkeypatch):
+    runs = []
+    monkeypatch.setattr(services, "run_mas_fanout_workflow", lambda *args, **kwargs: runs.append(("fanout", args)))
+    monkeypatch.setattr(services, "run_mas_workflow", lambda *args, **kwargs: runs.append(("single", args)))
+    services.run_audit_job({"contract_id": "c1", "address": "0x1", "addresses": ["0x1", "0x2"]}, should_cancel=None)
+    services.run_audit_job({"contract_id": "c2", "address": "0x3"}, should_cancel=None)
+
+    assert runs == [("fanout", ("c1", ["0x1", "0x2"])), ("single", ("c2", "0x3"))]
+
+
+def test_parse_addresses():
+    assert services.parse_addresses([" 0x1", "0x2", "0x1", ""]) == ["0x1", "0x2"]
+    for value in (None, "0x1", [], [""], [1], ["0x1"] * 2 + [f"0x{i}" for i in range(2, services.BATCH_MAX_ADDRESSES + 2)]):
+        with pytest.raises(ValueError):
+            services.parse_addresses(value)
+
+
+def test_batch_route_queues_one_job(db, monkeypatch):
+    monkeypatch.setattr(app_module, "db", db)
+    client = app_module.app.test_client()
+    response = client.post("/contracts/batch", json={"name": "pair", "addresses": ["0x1", "0x2"]})
+
+    assert response.status_code == 201
+    job = db.jobs.find_one({"job_id": response.json["job"]["job_id"]})
+    assert job["addresses"] == ["0x1", "0x2"] and job["status"] == "queued"
+    assert db.report.find_one({"contract_id": job["contract_id"]})["results_chunks"] == []
+    assert client.post("/contracts/batch", json={"name": "none", "addresses": []}).status_code == 400
@@ -0,0 +1,27 @@
+from types import SimpleNamespace
+
+from api.fee_oracle import FeeOracle
+
+
+class FakeCall:
+    address = "0x00000000000000000000000000000000000000aa"
+    selector = "0xabcdef01"
+
+    def __init__(self, gas):
+        self.gas = gas
+        self.estimates = 0
+
+    def estimate_gas(self, txn):
+        self.estimates += 1
+        return self.gas
+
+
+def test_gas_estimates_are_kept_per_provider():
+    oracle = FeeOracle(gas_margin=1.0)
+    mainnet, sepolia = SimpleNamespace(provider="mainnet"), SimpleNamespace(provider="sepolia")
+    mainnet_call, sepolia_call = FakeCall(50000), FakeCall(90000)
+
+    assert oracle.estimate_gas(mainnet, mainnet_call, {}) == 50000
+    assert oracle.estimate_gas(sepolia, sepolia_call, {}) == 90000
+    assert oracle.estimate_gas(mainnet, mainnet_call, {}) == 50000
+    assert (mainnet_call.estimates, sepolia_call.estimates) == (1, 1)
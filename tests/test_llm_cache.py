@@ -0,0 +1,75 @@
+import json
+
+from langchain_core.load import dumps
+from langchain_core.messages import AIMessage, HumanMessage, ToolMessage
+from langchain_core.outputs import Generation
+
+import api.agents.llm_cache as llm_cache_module
+from api.agents.llm_cache import SQLiteLLMCache, address_placeholders, normalize_prompt
+
+ADDRESS = "0x" + "ab" * 20
+OTHER_ADDRESS = "0x" + "cd" * 20
+
+
+def conversation(call_id, message_id, address=ADDRESS):
+    return dumps([
+        HumanMessage(f"Audit {address}", id=message_id),
+        AIMessage(
+            "",
+            id=f"run-{message_id}",
+            tool_calls=[{"name": "get_abi", "args": {"address": address}, "id": call_id}],
+            additional_kwargs={"tool_calls": [{"id": call_id, "type": "function"}]},
+            response_metadata={"model_name": "gpt-4o", "system_fingerprint": message_id},
+        ),
+        ToolMessage("[]", tool_call_id=call_id),
+    ])
+
+
+def test_normalize_prompt_ignores_run_ids_and_metadata():
+    assert normalize_prompt(conversation("call_abc", "1")) == normalize_prompt(conversation("call_xyz", "2"))
+
+
+def test_normalize_prompt_keeps_the_conversation():
+    normalized = json.loads(normalize_prompt(conversation("call_abc", "1")))
+
+    assert normalized[0]["kwargs"]["content"] == f"Audit {ADDRESS}"
+    assert normalized[1]["kwargs"]["tool_calls"][0]["id"] == "call_0"
+    assert normalized[2]["kwargs"]["tool_call_id"] == "call_0"
+    assert normalize_prompt(conversation("call_abc", "1")) != normalize_prompt(conversation("call_abc", "1", OTHER_ADDRESS))
+
+
+def test_normalize_prompt_collapses_whitespace_of_text_prompts():
+    assert normalize_prompt("  Human:  audit\n this ") == "Human: audit this"
+
+
+def test_address_placeholders_follow_order_of_appearance():
+    text = f"{OTHER_ADDRESS} calls 0x{'AB' * 20} then {OTHER_ADDRESS}"
+
+    assert address_placeholders(text) == {OTHER_ADDRESS: "0xADDRESS0", ADDRESS: "0xADDRESS1"}
+
+
+def test_cache_hit_across_runs(tmp_path):
+    cache = SQLiteLLMCache(str(tmp_path / "cache.sqlite3"))
+    cache.update(conversation("call_abc", "1"), "gpt-4o", [Generation(text="reentrancy")])
+
+    assert cache.lookup(conversation("call_xyz", "2"), "gpt-4o")[0].text == "reentrancy"
+    assert cache.lookup(conversation("call_xyz", "2"), "gpt-4o-mini") is None
+    assert cache.metrics() == {"hits": 1, "misses": 1, "evictions": 0}
+
+
+def test_normalized_addresses_are_filled_back_in(tmp_path):
+    cache = SQLiteLLMCache(str(tmp_path / "cache.sqlite3"), normalize_addresses=True)
+    cache.update(conversation("call_abc", "1"), "gpt-4o", [Generation(text=f"{ADDRESS} is vulnerable")])
+
+    cached = cache.lookup(conversation("call_abc", "1", OTHER_ADDRESS), "gpt-4o")
+    assert cached[0].text == f"{OTHER_ADDRESS} is vulnerable"
+
+
+def test_cache_is_opt_in(monkeypatch, tmp_path):
+    monkeypatch.setattr(llm_cache_module, "_llm_cache", None)
+    monkeypatch.setenv("LLM_CACHE_PATH", str(tmp_path / "llm_cache.sqlite3"))
+    monkeypatch.delenv("LLM_CACHE", raising=False)
+    assert llm_cache_module.get_llm_cache() is None
+
+    monkeypatch.setenv("LLM_CACHE", "1")
+    assert llm_cache_module.get_llm_cache() is not None
@@ -0,0 +1,94 @@
+from types import SimpleNamespace
+
+import pytest
+from web3 import Web3
+
+from api.agents.tools import sign_and_send
+from api.nonce_manager import NonceManager, is_nonce_error, nonce_manager
+from conftest import WALLET_PRIVATE_KEY
+
+WALLET = Web3().eth.account.from_key(WALLET_PRIVATE_KEY).address
+
+
+def fake_web3(chain_id, pending):
+    eth = SimpleNamespace(chain_id=chain_id, get_transaction_count=lambda address, block: pending)
+    return SimpleNamespace(provider=f"provider of chain {chain_id}", eth=eth)
+
+
+@pytest.fixture
+def fresh_nonces():
+    nonce_manager.reset(WALLET)
+    yield
+    nonce_manager.reset(WALLET)
+
+
+def test_nonces_are_kept_per_chain():
+    manager = NonceManager()
+    mainnet, sepolia = fake_web3(1, 7), fake_web3(11155111, 0)
+
+    assert manager.allocate(mainnet, WALLET) == 7
+    assert manager.allocate(sepolia, WALLET) == 0
+    assert manager.allocate(mainnet, WALLET) == 8
+
+    manager.rewind(sepolia, WALLET, 0)
+    assert manager.allocate(mainnet, WALLET) == 9
+    assert manager.allocate(sepolia, WALLET) == 0
+
+
+def test_underpriced_is_not_a_nonce_error():
+    assert is_nonce_error("replacement transaction underpriced")
+    assert not is_nonce_error("transaction underpriced")
+
+
+def test_failed_build_rewinds_without_asking_the_node(chain, fresh_nonces, monkeypatch):
+    w3 = chain.web3()
+    nonce_manager.allocate(w3, WALLET)
+
+    def failing_build(from_address, nonce):
+        raise ValueError("cannot build")
+
+    with pytest.raises(ValueError):
+        sign_and_send(w3, WALLET_PRIVATE_KEY, failing_build)
+    monkeypatch.setattr(w3.eth, "get_transaction_count", lambda *args: pytest.fail("resynced"))
+    assert nonce_manager.allocate(w3, WALLET) == 1
+
+
+def transfer_to_self(w3):
+    def build_txn(from_address, nonce):
+        return {
+            "chainId": w3.eth.chain_id, "from": from_address, "to": from_address, "nonce": nonce,
+            "value": 0, "gas": 21000, "gasPrice": w3.eth.gas_price,
+        }
+    return build_txn
+
+
+def test_rejected_send_rewinds(chain, fresh_nonces, monkeypatch):
+    w3 = chain.web3()
+
+    def reject(raw_txn):
+        raise ValueError("insufficient funds for gas * price + value")
+
+    monkeypatch.setattr(w3.eth, "send_raw_transaction", reject)
+
+    with pytest.raises(ValueError):
+        sign_and_send(w3, WALLET_PRIVATE_KEY, transfer_to_self(w3))
+    assert nonce_manager.allocate(w3, WALLET) == 0
+
+
+def test_nonce_error_resyncs_and_retries(chain, fresh_nonces, monkeypatch):
+    w3 = chain.web3()
+    send_raw_transaction = w3.eth.send_raw_transaction
+    sent = []
+
+    def reject_first(raw_txn):
+        sent.append(raw_txn)
+        if len(sent) == 1:
+            raise ValueError("nonce too low")
+        return send_raw_transaction(raw_txn)
+
+    monkeypatch.setattr(w3.eth, "send_raw_transaction", reject_first)
+    txn_hash = sign_and_send(w3, WALLET_PRIVATE_KEY, transfer_to_self(w3))
+
+    assert len(sent) == 2
+    assert w3.eth.get_transaction(txn_hash).nonce == 0
+    assert nonce_manager.allocate(w3, WALLET) == 1
@@ -0,0 +1,108 @@
+from datetime import datetime, timedelta
+
+import pytest
+from bson import ObjectId
+
+from schema import (
+    REPORT_PLACEHOLDER,
+    decode_report_cursor,
+    encode_report_cursor,
+    get_report,
+    get_reports_page,
+    render_report,
+)
+from services import parse_chunk_range
+
+START = datetime(2024, 1, 1)
+
+
+def add_reports(db, count, created_at=None):
+    reports = [
+        {"_id": ObjectId(), "contract_id": f"contract_{i}", "created_at": created_at or START + timedelta(minutes=i),
+         "results_chunks": [f"report {i}"]}
+        for i in range(count)
+    ]
+    db.report.insert_many(reports)
+    return reports
+
+
+def read_all_pages(limit, **kwargs):
+    pages, cursor = [], None
+    while True:
+        page, cursor = get_reports_page(limit, cursor=cursor, **kwargs)
+        pages.append(page)
+        if cursor is None:
+            return pages
+
+
+def test_pages_cover_every_report_newest_first(db):
+    reports = add_reports(db, 5)
+    pages = read_all_pages(2)
+
+    assert [len(page) for page in pages] == [2, 2, 1]
+    assert [report["_id"] for page in pages for report in page] == [report["_id"] for report in reversed(reports)]
+
+
+def test_reports_created_at_the_same_time_are_not_skipped(db):
+    reports = add_reports(db, 5, created_at=START)
+    pages = read_all_pages(2)
+
+    assert sorted(report["_id"] for page in pages for report in page) == sorted(report["_id"] for report in reports)
+
+
+def test_new_reports_do_not_shift_later_pages(db):
+    add_reports(db, 4)
+    first_page, cursor = get_reports_page(2)
+    db.report.insert_one({"contract_id": "newest", "created_at": START + timedelta(days=1), "results_chunks": []})
+    second_page, _ = get_reports_page(2, cursor=cursor)
+
+    assert [report["contract_id"] for report in first_page + second_page] == [f"contract_{i}" for i in (3, 2, 1, 0)]
+
+
+def test_summary_pages_leave_out_results(db):
+    add_reports(db, 1)
+    page, _ = get_reports_page(10, summary=True)
+
+    assert "results" not in page[0] and "results_chunks" not in page[0]
+
+
+def test_cursor_round_trip():
+    report = {"_id": ObjectId(), "created_at": START}
+
+    assert decode_report_cursor(encode_report_cursor(report)) == (START, report["_id"])
+    with pytest.raises(ValueError):
+        decode_report_cursor("not a cursor")
+
+
+def test_render_joins_legacy_results_and_chunks():
+    report = render_report({"results": "Legacy\n", "results_chunks": ["first\n", "second\n"]})
+
+    assert report == {"results": "Legacy\nfirst\nsecond"}
+
+
+def test_render_empty_report_shows_placeholder():
+    assert render_report({"results_chunks": []})["results"] == REPORT_PLACEHOLDER
+    assert render_report({"results": None, "results_chunks": []})["results"] == REPORT_PLACEHOLDER
+
+
+def test_render_leaves_summaries_alone():
+    assert render_report({"contract_id": "contract_1"}) == {"contract_id": "contract_1"}
+
+
+def test_get_report_returns_only_the_requested_chunks(db):
+    db.report.insert_one({"contract_id": "contract_1", "results": "legacy", "results_chunks": ["a", "b", "c", "d"]})
+    report = get_report("contract_1", chunk_range=(1, 3))
+
+    assert report["results"] == "bc"
+    assert report["chunk_range"] == [1, 3]
+    assert get_report("missing") is None
+
+
+@pytest.mark.parametrize("value", ["3:3", "4:2", "-1:2", "a:b", "3"])
+def test_invalid_chunk_ranges_are_rejected(value):
+    with pytest.raises(ValueError):
+        parse_chunk_range(value)
+
+
+def test_chunk_range_start_defaults_to_zero():
+    assert parse_chunk_range(":2") == (0, 2)
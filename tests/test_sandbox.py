@@ -0,0 +1,72 @@
+import threading
+
+from web3 import Web3
+
+import api.sandbox as sandbox_module
+from api.chain_backend import chain_state_guard, chain_state_lock
+from api.nonce_manager import nonce_manager
+from api.sandbox import ExploitSandbox
+from conftest import DRAIN_ABI, WALLET_PRIVATE_KEY
+
+WALLET = Web3().eth.account.from_key(WALLET_PRIVATE_KEY).address
+ETHER = Web3.to_wei(1, "ether")
+
+
+def test_attempts_start_from_the_same_state(chain, drain_contract):
+    w3 = chain.web3()
+    block_number = w3.eth.block_number
+    results = ExploitSandbox(backend=chain).run(
+        WALLET_PRIVATE_KEY, drain_contract, DRAIN_ABI,
+        [[("drain", [])], [("deposit", [], ETHER)], [("missing", [])]],
+    )
+
+    assert [result["success"] for result in results] == [True, True, False]
+    # The second attempt still found the 5 ether the first one drained
+    assert results[0]["balance_deltas"][drain_contract] == -5 * ETHER
+    assert results[1]["balance_deltas"][drain_contract] == ETHER
+    assert results[2]["balance_deltas"][drain_contract] == 0
+    assert w3.eth.get_balance(drain_contract) == 5 * ETHER
+    assert w3.eth.block_number == block_number
+
+
+def test_revert_resets_the_shared_nonce(chain, drain_contract):
+    w3 = chain.web3()
+    nonce_manager.allocate(w3, WALLET)
+    ExploitSandbox(backend=chain).run(WALLET_PRIVATE_KEY, drain_contract, DRAIN_ABI, [[("drain", [])]])
+
+    assert nonce_manager.allocate(w3, WALLET) == w3.eth.get_transaction_count(WALLET, "pending")
+    nonce_manager.reset(WALLET)
+
+
+def test_shared_node_is_locked_during_attempts(chain, drain_contract, monkeypatch):
+    locked = []
+    run_steps = sandbox_module.run_steps
+
+    def checking_run_steps(*args, **kwargs):
+        # Another thread sending a transaction would have to wait
+        thread = threading.Thread(target=lambda: locked.append(not chain_state_lock.acquire(blocking=False)))
+        thread.start()
+        thread.join()
+        return run_steps(*args, **kwargs)
+
+    monkeypatch.setattr(sandbox_module, "run_steps", checking_run_steps)
+    ExploitSandbox(backend=chain).run(WALLET_PRIVATE_KEY, drain_contract, DRAIN_ABI, [[("drain", [])], [("drain", [])]])
+
+    assert locked == [True, True]
+
+
+def test_unreadable_balances_have_no_delta(chain, drain_contract, monkeypatch):
+    monkeypatch.setattr(
+        sandbox_module, "batch_read",
+        lambda w3, balances: {"balances": {address: None for address in balances}},
+    )
+    results = ExploitSandbox(backend=chain).run(WALLET_PRIVATE_KEY, drain_contract, DRAIN_ABI, [[("drain", [])]])
+
+    assert results[0]["success"]
+    assert set(results[0]["balance_deltas"].values()) == {None}
+
+
+def test_only_the_shared_node_serializes_sends(chain):
+    assert chain_state_guard(chain.web3()) is chain_state_lock
+    # Remote and anvil nodes are never reverted under the tools
+    assert chain_state_guard(Web3(Web3.HTTPProvider("http://127.0.0.1:8545"))) is not chain_state_lock
@@ -0,0 +1,71 @@
+import pytest
+from pymongo.errors import DuplicateKeyError
+
+import schema
+from scheduler import AuditScheduler, QueueFullError
+
+
+@pytest.fixture
+def jobs(db):
+    return db.jobs
+
+
+def make_scheduler(**kwargs):
+    return AuditScheduler(lambda job, should_cancel: None, **kwargs)
+
+
+def test_jobs_submitted_together_get_their_own_ids(jobs):
+    scheduler = make_scheduler()
+    first = scheduler.submit("contract_1", "0x1")
+    second = scheduler.submit("contract_1", "0x1")
+
+    assert first["job_id"] != second["job_id"]
+    assert schema.get_contract_job("contract_1")["job_id"] == second["job_id"]
+
+
+def test_job_ids_are_unique(jobs):
+    schema.ensure_indexes()
+    job = make_scheduler().submit("contract_1", "0x1")
+
+    with pytest.raises(DuplicateKeyError):
+        jobs.insert_one({"job_id": job["job_id"]})
+
+
+def test_submit_does_not_start_the_workers(jobs):
+    scheduler = make_scheduler()
+    scheduler.submit("contract_1", "0x1")
+
+    assert not scheduler._started
+    assert schema.get_contract_job("contract_1")["status"] == "queued"
+
+
+def test_claim_skips_tenants_at_their_limit(jobs):
+    scheduler = make_scheduler(per_tenant_limit=2)
+    for i in range(3):
+        scheduler.submit(f"busy_{i}", "0x1", tenant="busy", priority=1)
+    scheduler.submit("quiet_0", "0x1", tenant="quiet")
+
+    claimed = [scheduler._claim()["contract_id"] for _ in range(3)]
+
+    # The third busy job waits for a slot even though it has the higher priority
+    assert claimed == ["busy_0", "busy_1", "quiet_0"]
+    assert scheduler._claim() is None
+
+
+def test_finished_job_frees_its_tenant_slot(jobs):
+    scheduler = make_scheduler(per_tenant_limit=1)
+    scheduler.submit("contract_1", "0x1")
+    scheduler.submit("contract_2", "0x1")
+    first = scheduler._claim()
+
+    assert scheduler._claim() is None
+    schema.finish_job(first["job_id"], "done")
+    assert scheduler._claim()["contract_id"] == "contract_2"
+
+
+def test_submit_rejects_when_the_queue_is_full(jobs):
+    scheduler = make_scheduler(max_queued=1)
+    scheduler.submit("contract_1", "0x1")
+
+    with pytest.raises(QueueFullError):
+        scheduler.submit("contract_2", "0x1")
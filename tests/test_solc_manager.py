@@ -0,0 +1,127 @@
+from concurrent.futures import ThreadPoolExecutor
+
+import pytest
+
+import api.solc_manager as solc_manager_module
+from api.compile_cache import ArtifactCache
+from api.solc_manager import SolcManager, parse_pragma_ranges, source_pragmas, version_matches
+
+
+def matches(version, pragma):
+    return version_matches(version, parse_pragma_ranges(pragma))
+
+
+@pytest.mark.parametrize("pragma, matching, not_matching", [
+    ("^0.8.0", ["0.8.0", "0.8.26"], ["0.7.6", "0.9.0"]),
+    ("^0.4.24", ["0.4.24", "0.4.26"], ["0.4.23", "0.5.0"]),
+    ("~0.6.2", ["0.6.2", "0.6.12"], ["0.6.1", "0.7.0"]),
+    (">=0.6.0 <0.8.0", ["0.6.0", "0.7.6"], ["0.5.17", "0.8.0"]),
+    ("0.8.19", ["0.8.19"], ["0.8.18", "0.8.20"]),
+    ("0.8.x", ["0.8.0", "0.8.26"], ["0.7.6", "0.9.0"]),
+    ("0.5.0 - 0.7.6", ["0.5.0", "0.7.6"], ["0.4.26", "0.8.0"]),
+    ("^0.5.0 || ^0.8.0", ["0.5.17", "0.8.1"], ["0.6.0", "0.7.6"]),
+])
+def test_pragma_ranges(pragma, matching, not_matching):
+    assert all(matches(version, pragma) for version in matching)
+    assert not any(matches(version, pragma) for version in not_matching)
+
+
+def test_commented_out_pragmas_are_ignored():
+    source = """
+    // pragma solidity ^0.4.24;
+    /* pragma solidity 0.5.0;
+       pragma solidity 0.6.0; */
+    pragma solidity ^0.8.0; // was ^0.7.0
+    contract A { string url = "https://example.com/*"; }
+    pragma solidity >=0.8.4;
+    """
+
+    assert source_pragmas(source) == ["^0.8.0", ">=0.8.4"]
+
+
+@pytest.fixture
+def manager(monkeypatch):
+    manager = SolcManager(default_version="0.8.0")
+    manager._installed = ["0.6.12", "0.8.10", "0.8.19"]
+    installs = []
+    monkeypatch.setattr(manager, "ensure", lambda version: installs.append(version) or version)
+    monkeypatch.setattr(solc_manager_module.solcx, "get_installable_solc_versions", lambda: ["0.8.26", "0.8.25", "0.7.6", "0.4.26"])
+    manager.installs = installs
+    return manager
+
+
+def test_newest_installed_version_satisfying_every_pragma(manager):
+    source = "pragma solidity ^0.8.0;\npragma solidity <0.8.15;"
+
+    assert manager.select_version(source) == "0.8.10"
+    assert manager.installs == []
+
+
+def test_newest_installable_version_when_none_is_installed(manager):
+    assert manager.select_version("pragma solidity >=0.7.0 <0.8.0;") == "0.7.6"
+    # Installed on a cache miss only
+    assert manager.installs == []
+
+
+def test_default_version_without_pragma(manager):
+    assert manager.select_version("// pragma solidity ^0.4.24;\ncontract A {}") == "0.8.0"
+
+
+def test_unsatisfiable_pragma(manager):
+    with pytest.raises(ValueError):
+        manager.select_version("pragma solidity ^0.3.0;")
+
+
+@pytest.fixture
+def compiling_manager(manager, monkeypatch, tmp_path):
+    # Threads instead of processes so the fake compiler below is used
+    manager._executor = ThreadPoolExecutor(max_workers=2)
+    monkeypatch.setattr(solc_manager_module, "artifact_cache", ArtifactCache(str(tmp_path)))
+    monkeypatch.setattr(manager, "_solc_binary", lambda version: f"solc-{version}")
+    invocations = []
+
+    def compile_standard(input_data, solc_binary):
+        invocations.append((solc_binary, sorted(input_data["sources"])))
+        if any("broken" in source["content"] for source in input_data["sources"].values()):
+            raise RuntimeError("ParserError")
+        return {"contracts": {
+            name: {"A": {"abi": [], "evm": {"bytecode": {"object": solc_binary}}}}
+            for name in input_data["sources"]
+        }}
+
+    monkeypatch.setattr(solc_manager_module, "compile_standard", compile_standard)
+    manager.invocations = invocations
+    yield manager
+    manager._executor.shutdown()
+
+
+def test_compile_many_batches_sources_by_version(compiling_manager):
+    sources = ["pragma solidity ^0.8.0; contract A {}", "pragma solidity ^0.6.0; contract A {}", "pragma solidity ^0.8.0; contract A { }"]
+    results = compiling_manager.compile_many(sources)
+
+    assert [result["A"]["bytecode"] for result in results] == ["solc-0.8.19", "solc-0.6.12", "solc-0.8.19"]
+    assert sorted(compiling_manager.invocations) == [
+        ("solc-0.6.12", ["Contract_1.sol"]),
+        ("solc-0.8.19", ["Contract_0.sol", "Contract_2.sol"]),
+    ]
+    # Compiled artifacts are cached
+    assert compiling_manager.compile_many(sources[:1]) == results[:1]
+    assert len(compiling_manager.invocations) == 2
+
+
+def test_compile_many_isolates_a_broken_source(compiling_manager):
+    results = compiling_manager.compile_many(["pragma solidity ^0.8.0; contract A {}", "pragma solidity ^0.8.0; broken"])
+
+    assert results[0]["A"]["bytecode"] == "solc-0.8.19"
+    assert isinstance(results[1], RuntimeError)
+
+
+def test_cached_artifacts_do_not_install_a_compiler(compiling_manager):
+    source = "pragma solidity >=0.7.0 <0.8.0; contract A {}"
+    compiled = compiling_manager.compile(source)
+    assert compiling_manager.installs == ["0.7.6"]
+
+    assert compiling_manager.compile(source) == compiled
+    assert compiling_manager.compile_many([source]) == [compiled]
+    assert compiling_manager.installs == ["0.7.6"]
+    assert len(compiling_manager.invocations) == 1
@@ -0,0 +1,70 @@
+import threading
+import time
+
+import pytest
+import requests
+
+from api.web3_connection import PooledHTTPProvider, Web3ConnectionPool
+
+
+class FakeWeb3:
+    def __init__(self, healthy=True, gate=None):
+        self.healthy = healthy
+        self.gate = gate
+
+    def is_connected(self):
+        if self.gate is not None:
+            self.gate.wait(5)
+        return self.healthy
+
+
+@pytest.fixture
+def pool(monkeypatch):
+    pool = Web3ConnectionPool(["http://a", "http://b"], health_check_interval=60)
+    pool.nodes = {"http://a": FakeWeb3(), "http://b": FakeWeb3()}
+    monkeypatch.setattr(pool, "_connect", lambda endpoint: pool.nodes[endpoint])
+    return pool
+
+
+def test_reuses_the_checked_connection(pool):
+    assert pool.get() is pool.get() is pool.nodes["http://a"]
+    assert pool.metrics()["health_checks"] == 1
+
+
+def test_fails_over_to_the_next_healthy_endpoint(pool):
+    pool.nodes["http://a"].healthy = False
+
+    assert pool.get() is pool.nodes["http://b"]
+    assert pool.metrics()["active_endpoint"] == 1
+
+
+def test_health_checks_do_not_hold_the_pool_lock(pool):
+    gate = threading.Event()
+    pool.nodes["http://a"] = FakeWeb3(healthy=False, gate=gate)
+    thread = threading.Thread(target=pool.get)
+    thread.start()
+    deadline = time.monotonic() + 5
+    while pool.metrics()["health_checks"] == 0 and time.monotonic() < deadline:
+        time.sleep(0.01)
+
+    # The check of the dead endpoint is still running, the pool stays usable
+    started = time.monotonic()
+    pool.metrics()
+    assert time.monotonic() - started < 1
+    gate.set()
+    thread.join()
+    assert pool.metrics()["active_endpoint"] == 1
+
+
+def test_transport_errors_mark_the_endpoint_failed(pool):
+    pool.get()
+    failed = []
+    provider = PooledHTTPProvider("http://127.0.0.1:9", failed.append, exception_retry_configuration=None)
+
+    with pytest.raises(requests.ConnectionError):
+        provider.make_request("eth_blockNumber", [])
+    assert failed == ["http://127.0.0.1:9"]
+
+    pool.mark_failed("http://a")
+    assert pool.metrics()["active_endpoint"] == 1
+    assert pool.get() is pool.nodes["http://b"]
@@ -1,6 +1,5 @@
 import React, { useEffect, useState } from 'react';
 import { useParams } from 'react-router-dom';
-import axios from 'axios';  // Use axios for API calls
 
 interface Event {
     _id: string;
@@ -24,22 +23,25 @@ const ContractDetails: React.FC = () => {
     const [loading, setLoading] = useState<boolean>(true);
     const [error, setError] = useState<string | null>(null);
 
-    // Fetch contract events from MongoDB via an API every 3 seconds
+    // Stream contract events from the API as the audit emits them
     useEffect(() => {
-        const fetchContractEvents = async () => {
-            try {
-                const response = await axios.get(`http://127.0.0.1:5000/contracts/${contract_id}/events`);
-                setEvents(response.data.events);
-            } catch (err) {
-                console.error('Failed to fetch contract events', err);  // Log the error but don't update state
-            }
-        };
+        setEvents([]);
+        // EventSource reconnects on its own and resumes after the last event id
+        const source = new EventSource(`http://127.0.0.1:5000/contracts/${contract_id}/stream`);
 
-        // Set interval to call fetchContractEvents every 3 seconds
-        const intervalId = setInterval(fetchContractEvents, 3000);
+        source.addEventListener('event', (message) => {
+            const event: Event = JSON.parse((message as MessageEvent).data);
+            setEvents((previous) => [...previous, event]);
+        });
+
+        source.addEventListener('done', () => source.close());
+
+        source.onerror = (err) => {
+            console.error('Contract event stream error', err);  // Log the error, EventSource retries
+        };
 
-        // Clean up the interval when the component unmounts
-        return () => clearInterval(intervalId);
+        // Close the stream when the component unmounts
+        return () => source.close();
     }, [contract_id]);
 
     // Fetch contract data on page load (runs once)
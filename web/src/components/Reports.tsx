@@ -3,7 +3,7 @@ import { useGetReports } from '../hooks/useReports';
 import { useNavigate } from 'react-router-dom'; // Import the useNavigate hook
 
 export default function Reports() {
-    const reports = useGetReports();
+    const { reports, hasMore, loadMore, loading } = useGetReports();
     const navigate = useNavigate(); // Initialize the navigate hook
 
     const handleRowClick = (contractId: string) => {
@@ -44,6 +44,15 @@ export default function Reports() {
                     </tbody>
                 </table>
             </div>
+            {hasMore && (
+                <button
+                    className="mt-4 py-2 px-4 border border-gray-300 rounded text-gray-600 hover:bg-gray-100 disabled:opacity-50"
+                    onClick={loadMore}
+                    disabled={loading}
+                >
+                    {loading ? 'Loading...' : 'Load more'}
+                </button>
+            )}
         </div>
     );
 }
\ No newline at end of file
@@ -1,18 +1,43 @@
-import { useEffect, useState } from "react"
+import { useCallback, useEffect, useState } from "react"
 import { AttackReport } from "../types"
 import { BASE_API_URL } from "../constants"
 
+const PAGE_SIZE = 50
+
 export const useGetReports = () => {
     const [reports, setReports] = useState<AttackReport[]>([])
-    useEffect(() => {
-        fetch(`${BASE_API_URL}/reports`, {
+    const [nextCursor, setNextCursor] = useState<string | null>(null)
+    const [loading, setLoading] = useState(false)
+
+    // Summary mode leaves out the report markdown, which the list does not show
+    const fetchPage = useCallback((cursor: string | null) => {
+        const params = new URLSearchParams({ summary: "1", limit: String(PAGE_SIZE) })
+        if (cursor) {
+            params.set("cursor", cursor)
+        }
+        setLoading(true)
+        fetch(`${BASE_API_URL}/reports?${params}`, {
             headers: {
                 'Content-Type': 'application/json',
             }
         })
         .then(res => res.json())
-        .then(data => setReports(data))
+        .then(data => {
+            setReports(prev => cursor ? [...prev, ...data.reports] : data.reports)
+            setNextCursor(data.next_cursor)
+        })
+        .finally(() => setLoading(false))
     }, [])
 
-    return reports
-}
\ No newline at end of file
+    useEffect(() => {
+        fetchPage(null)
+    }, [fetchPage])
+
+    const loadMore = useCallback(() => {
+        if (nextCursor && !loading) {
+            fetchPage(nextCursor)
+        }
+    }, [fetchPage, nextCursor, loading])
+
+    return { reports, hasMore: nextCursor !== null, loadMore, loading }
+}